@@ -15,6 +15,17 @@ from typing import List, Optional, Tuple
 import html  # <-- for HTML-escaping when sending Serene questions
 import urllib.parse  # <-- NEW: for parsing sendBeacon text payloads
 
+from cogs.utils.chat_hub import ChatHub
+from cogs.utils.gif_cache import GifCache, GifFetchError, GIF_RESULTS_PER_QUERY
+from cogs.utils.serene_scheduler import SereneScheduler
+from cogs.utils.metrics import REGISTRY as METRICS
+from cogs.utils.room_config import ROOM_CONFIGS
+from cogs.utils.presence import PresenceIndex
+from cogs.utils.loop_monitor import LOOP_MONITOR
+from cogs.utils.tick_profile import TICK_PROFILER
+from cogs.utils.mod_config import MOD_CONFIGS
+from cogs.utils.jeopardy_bank import JEOPARDY_BANK
+
 # Load env vars
 load_dotenv()
 
@@ -50,13 +61,27 @@ intents.presences = True
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# --- Access logging middleware (logs ALL HTTP requests, including 404s) ---
+def _route_label(request) -> str:
+    """Route template (not the raw path) so metrics labels stay bounded."""
+    try:
+        resource = request.match_info.route.resource
+        if resource is not None:
+            return resource.canonical
+    except Exception:
+        pass
+    return "unmatched"
+
+# --- Access logging middleware (logs ALL HTTP requests, including 404s) + latency metrics ---
 @web.middleware
 async def access_log_mw(request, handler):
     start = time.time()
+    route = _route_label(request)
+    status = 500
+    loop_tag = LOOP_MONITOR.tag(route=route)  # stalls inside this handler are attributed to the route
     try:
         resp = await handler(request)
     except web.HTTPException as ex:
+        status = ex.status
         elapsed = (time.time() - start) * 1000
         logging.info(f"HTTP {request.method} {request.path_qs} -> {ex.status} in {elapsed:.1f}ms from {request.remote}")
         raise
@@ -69,6 +94,12 @@ async def access_log_mw(request, handler):
         status = getattr(resp, "status", 0)
         logging.info(f"HTTP {request.method} {request.path_qs} -> {status} in {elapsed:.1f}ms from {request.remote}")
         return resp
+    finally:
+        LOOP_MONITOR.untag(loop_tag)
+        # WS upgrades land here when the socket closes; that is connection lifetime, not latency
+        METRICS.inc("http_requests_total", method=request.method, route=route, status=status)
+        if status != 101:
+            METRICS.observe("http_request_duration_seconds", time.time() - start, route=route)
 
 bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents)
 
@@ -84,6 +115,13 @@ bot.serene_group = serene_group
 # --- WebSocket room registries (game state & chat) ---
 bot.ws_rooms = {}
 bot.chat_ws_rooms = {}
+bot.ws_presence = PresenceIndex()  # room -> player_id -> game sockets (O(1) liveness checks)
+
+# --- Shared chat hub: owns chat_ws_rooms membership + fan-out for BOTH /chat_ws handlers ---
+bot.chat_hub = ChatHub(bot.chat_ws_rooms)
+
+# --- Shared GIF query cache (TTL + negative caching + single-flight) ---
+bot.gif_cache = GifCache()
 
 # --- Registry for gamelist_info websocket clients (NEW) ---
 bot.gamelist_ws = set()
@@ -215,88 +253,104 @@ def _merge_role_overwrite(existing: Optional[discord.PermissionOverwrite], **kwa
         setattr(ow, k, v)
     return ow
 
-async def _enforce_quarantine_visibility(
+# Quarantine overwrites for the quarantine role, by channel kind (only these keys are touched)
+QUARANTINE_CATEGORY_DENY = {"view_channel": False}
+QUARANTINE_CHANNEL_ALLOW = {"view_channel": True, "send_messages": True, "read_message_history": True, "add_reactions": True}
+QUARANTINE_TEXT_DENY = {
+    "view_channel": False, "send_messages": False, "add_reactions": False,
+    "create_public_threads": False, "create_private_threads": False, "send_messages_in_threads": False,
+    "attach_files": False, "embed_links": False,
+}
+QUARANTINE_VOICE_DENY = {"view_channel": False, "connect": False, "speak": False, "stream": False}
+
+# set_permissions is bucketed per channel; this caps how many channels we edit at once so
+# a big server stays well under the global request limit (discord.py still handles any 429).
+QUARANTINE_EDIT_CONCURRENCY = 8
+
+def _plan_quarantine_overwrites(
     guild: discord.Guild,
     quarantine_role: discord.Role,
     quarantine_channel: discord.TextChannel
-):
+) -> Tuple[list, int]:
+    """
+    Desired overwrite for the quarantine role on every category/channel.
+    Returns ([(channel, overwrite, reason), ...] for channels that need an edit, compliant_count).
+    """
+    targets = [(cat, QUARANTINE_CATEGORY_DENY, "Serene quarantine: hide categories") for cat in guild.categories]
+    for ch in guild.text_channels:
+        if ch.id == quarantine_channel.id:
+            targets.append((ch, QUARANTINE_CHANNEL_ALLOW, "Serene quarantine: allow quarantine channel"))
+        else:
+            targets.append((ch, QUARANTINE_TEXT_DENY, "Serene quarantine: deny non-quarantine channel"))
+    for vch in guild.voice_channels + guild.stage_channels:
+        targets.append((vch, QUARANTINE_VOICE_DENY, "Serene quarantine: deny voice/stage"))
+
+    edits, compliant = [], 0
+    for ch, wanted, reason in targets:
+        current = ch.overwrites_for(quarantine_role)
+        if all(getattr(current, k) == v for k, v in wanted.items()):
+            compliant += 1
+            continue
+        edits.append((ch, _merge_role_overwrite(current, **wanted), reason))
+    return edits, compliant
+
+async def _enforce_quarantine_visibility(
+    guild: discord.Guild,
+    quarantine_role: discord.Role,
+    quarantine_channel: discord.TextChannel,
+    progress=None
+) -> dict:
     """
     Lock the server down for the quarantine role:
       • DENY view/send/etc on EVERY category/channel,
       • EXCEPT explicitly ALLOW in the quarantine channel.
     This overrides @everyone allows on a fresh server.
+
+    Only channels whose overwrite would actually change are edited, up to
+    QUARANTINE_EDIT_CONCURRENCY at a time. `progress(summary)` (async, optional)
+    is awaited after each edit. Returns {"total","compliant","applied","failed"}.
     """
-    # 1) Categories: deny view_channel for the quarantine role
-    for cat in guild.categories:
-        try:
-            current = cat.overwrites_for(quarantine_role)
-            new_ow = _merge_role_overwrite(current, view_channel=False)
-            await cat.set_permissions(quarantine_role, overwrite=new_ow, reason="Serene quarantine: hide categories")
-        except discord.Forbidden:
-            logger.warning(f"Missing perms to edit category {cat} for quarantine overwrites.")
-        except Exception as e:
-            logger.error(f"Error setting category overwrite {cat}: {e}", exc_info=True)
+    edits, compliant = _plan_quarantine_overwrites(guild, quarantine_role, quarantine_channel)
+    summary = {"total": len(edits) + compliant, "compliant": compliant, "applied": 0, "failed": 0}
+    logger.info(f"Quarantine plan for guild {guild.id}: {len(edits)} edit(s), {compliant} already compliant")
+    if progress is not None:
+        await progress(dict(summary))
+    if not edits:
+        return summary
 
-    # 2) Text channels: deny everywhere except quarantine channel
-    for ch in guild.text_channels:
-        try:
-            if ch.id == quarantine_channel.id:
-                # Explicitly allow in the quarantine channel
-                current = ch.overwrites_for(quarantine_role)
-                new_ow = _merge_role_overwrite(
-                    current,
-                    view_channel=True,
-                    send_messages=True,
-                    read_message_history=True,
-                    add_reactions=True
-                )
-                await ch.set_permissions(quarantine_role, overwrite=new_ow, reason="Serene quarantine: allow quarantine channel")
-            else:
-                current = ch.overwrites_for(quarantine_role)
-                new_ow = _merge_role_overwrite(
-                    current,
-                    view_channel=False,
-                    send_messages=False,
-                    add_reactions=False,
-                    create_public_threads=False,
-                    create_private_threads=False,
-                    send_messages_in_threads=False,
-                    attach_files=False,
-                    embed_links=False,
-                )
-                await ch.set_permissions(quarantine_role, overwrite=new_ow, reason="Serene quarantine: deny non-quarantine channel")
-        except discord.Forbidden:
-            logger.warning(f"Missing perms to edit channel {ch} for quarantine overwrites.")
-        except Exception as e:
-            logger.error(f"Error setting channel overwrite {ch}: {e}", exc_info=True)
+    slots = asyncio.Semaphore(QUARANTINE_EDIT_CONCURRENCY)
 
-    # 3) Voice/Stage channels: deny view/connect just in case
-    for vch in guild.voice_channels + guild.stage_channels:
-        try:
-            current = vch.overwrites_for(quarantine_role)
-            new_ow = _merge_role_overwrite(
-                current,
-                view_channel=False,
-                connect=False,
-                speak=False,
-                stream=False
-            )
-            await vch.set_permissions(quarantine_role, overwrite=new_ow, reason="Serene quarantine: deny voice/stage")
-        except discord.Forbidden:
-            logger.warning(f"Missing perms to edit voice/stage channel {vch} for quarantine overwrites.")
-        except Exception as e:
-            logger.error(f"Error setting voice/stage overwrite {vch}: {e}", exc_info=True)
+    async def apply(ch, overwrite, reason):
+        async with slots:
+            try:
+                await ch.set_permissions(quarantine_role, overwrite=overwrite, reason=reason)
+                summary["applied"] += 1
+            except discord.Forbidden:
+                summary["failed"] += 1
+                logger.warning(f"Missing perms to edit {ch} for quarantine overwrites.")
+            except Exception as e:
+                summary["failed"] += 1
+                logger.error(f"Error setting quarantine overwrite on {ch}: {e}", exc_info=True)
+        if progress is not None:
+            try:
+                await progress(dict(summary))
+            except Exception:
+                pass
+
+    await asyncio.gather(*(apply(*e) for e in edits))
+    return summary
 
 async def _db_connect_dict():
-    return await aiomysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        db="serene_users",
-        charset='utf8mb4',
-        autocommit=True,
-        cursorclass=aiomysql.cursors.DictCursor
-    )
+    with METRICS.timer("db_seconds", source="bot", op="connect"):
+        return await aiomysql.connect(
+            host=DB_HOST,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            db="serene_users",
+            charset='utf8mb4',
+            autocommit=True,
+            cursorclass=aiomysql.cursors.DictCursor
+        )
 
 # ---------------- (NEW) GAME LIST + PRUNING HELPERS ----------------
 
@@ -439,7 +493,15 @@ async def _summarize_rooms_and_prune() -> tuple[list[dict], list[str]]:
                                 # Also clean in-memory registries
                                 try:
                                     bot.ws_rooms.pop(room_id, None)
-                                    bot.chat_ws_rooms.pop(room_id, None)
+                                    bot.chat_hub.drop_room(room_id)
+                                    METRICS.forget(room=room_id)
+                                    ROOM_CONFIGS.invalidate(room_id)
+                                    TICK_PROFILER.forget(room_id)
+                                    for cog_name in ("MechanicsMain", "MechanicsMain2"):
+                                        cog = bot.get_cog(cog_name)
+                                        if cog is not None and hasattr(cog, "_projections"):
+                                            cog._projections.forget(room_id)
+                                    bot.ws_presence.drop_room(room_id)
                                 except Exception:
                                     pass
                                 deleted_ids.append(room_id)
@@ -494,14 +556,17 @@ async def _broadcast_gamelist(payload: dict):
     """
     msg = json.dumps(payload)
     dead = []
-    for ws in list(bot.gamelist_ws):
-        try:
-            if ws.closed:
+    clients = list(bot.gamelist_ws)
+    METRICS.inc("broadcast_recipients_total", len(clients), kind="gamelist")
+    with METRICS.timer("broadcast_seconds", kind="gamelist"):
+        for ws in clients:
+            try:
+                if ws.closed:
+                    dead.append(ws)
+                    continue
+                await ws.send_str(msg)
+            except Exception:
                 dead.append(ws)
-                continue
-            await ws.send_str(msg)
-        except Exception:
-            dead.append(ws)
     for ws in dead:
         try:
             bot.gamelist_ws.discard(ws)
@@ -635,28 +700,12 @@ async def gamelist_refresh_loop():
 async def _fetch_quarantine_options(guild_id: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Returns (role_name, channel_name) from bot_flag_action_options, or (None, None)
+    (read through the per-guild moderation config cache).
     """
     if not all([DB_USER, DB_PASSWORD, DB_HOST]):
         return (None, None)
-    conn = None
-    try:
-        conn = await _db_connect_dict()
-        async with conn.cursor() as cursor:
-            await cursor.execute(
-                "SELECT quarantine_channel_name, quarantine_role_name "
-                "FROM bot_flag_action_options WHERE guild_id = %s",
-                (str(guild_id),)
-            )
-            row = await cursor.fetchone()
-            if not row:
-                return (None, None)
-            return (row.get("quarantine_role_name"), row.get("quarantine_channel_name"))
-    except Exception as e:
-        logger.error(f"_fetch_quarantine_options error for guild {guild_id}: {e}")
-        return (None, None)
-    finally:
-        if conn:
-            conn.close()
+    cfg = await MOD_CONFIGS.get(guild_id, DB_USER, DB_PASSWORD, DB_HOST)
+    return (cfg["quarantine_role_name"], cfg["quarantine_channel_name"])
 
 async def _fetch_rules_embed_for_guild(guild_id: str) -> Optional[discord.Embed]:
     """
@@ -898,6 +947,10 @@ async def settings_saved_handler(request):
 
         logger.info(f"Received signal: '{action}' for guild ID: {guild_id}")
 
+        # Any settings save may touch flag reasons/actions/quarantine names
+        if guild_id:
+            MOD_CONFIGS.invalidate(guild_id)
+
         if not all([DB_USER, DB_PASSWORD, DB_HOST]):
             logger.error("Missing DB credentials for fetching settings.")
             return web.Response(text="Internal Server Error: DB credentials missing", status=500, headers=CORS_HEADERS)
@@ -999,6 +1052,39 @@ async def settings_saved_handler(request):
 async def health(_):
     return web.json_response({"ok": True, "ts": int(time.time())})
 
+async def metrics_handler(_):
+    """GET /metrics — Prometheus text exposition of the in-process registry."""
+    return web.Response(text=METRICS.render(), content_type="text/plain", charset="utf-8",
+                        headers={"Cache-Control": "no-store"})
+
+async def loop_health_handler(request):
+    """GET /loop_health?bot_entry=... — event-loop lag percentiles and the worst stalls (?n=20, ?reset=1)."""
+    if (request.headers.get("X-Bot-Entry") or request.query.get("bot_entry")) != BOT_ENTRY or not BOT_ENTRY:
+        return web.json_response({"ok": False, "error": "unauthorized"}, status=401)
+    try:
+        n = max(1, min(100, int(request.query.get("n", 10))))
+    except ValueError:
+        n = 10
+    snap = LOOP_MONITOR.snapshot(n)
+    if request.query.get("reset"):
+        LOOP_MONITOR.reset()
+    return web.json_response(snap, headers={"Cache-Control": "no-store"})
+
+async def tick_profile_handler(request):
+    """
+    GET /admin/tick_profile?bot_entry=...&n=10&by=p95&game=holdem
+    Slowest rooms in the timer loops with a per-step breakdown (load/reap/transition/save/broadcast).
+    """
+    if (request.headers.get("X-Bot-Entry") or request.query.get("bot_entry")) != BOT_ENTRY or not BOT_ENTRY:
+        return web.json_response({"ok": False, "error": "unauthorized"}, status=401)
+    try:
+        n = max(1, min(200, int(request.query.get("n", 10))))
+    except ValueError:
+        n = 10
+    rooms = TICK_PROFILER.top(n, by=request.query.get("by", "p95"), game=request.query.get("game"))
+    return web.json_response({"ok": True, "passes": TICK_PROFILER.passes(), "rooms": rooms},
+                             headers={"Cache-Control": "no-store"})
+
 async def game_was_probe(_):
     return web.Response(text="game_was endpoint is here; use WebSocket upgrade.", status=426)
 
@@ -1117,15 +1203,15 @@ async def _serene_get(params: dict) -> Optional[str]:
 
 # --- Tenor GIF helpers ---
 
-async def _fetch_gif_url_from_tenor(query: str) -> Optional[str]:
-    """Return a GIF URL from Tenor for the query, or None if not found/error."""
+async def _fetch_gif_urls_from_tenor(query: str) -> List[str]:
+    """Return up to GIF_RESULTS_PER_QUERY GIF URLs from Tenor ([] if none; GifFetchError if Tenor failed)."""
     if not TENOR_API_KEY:
-        return None
+        return []
 
     params = {
         "q": query,
         "key": TENOR_API_KEY,
-        "limit": 1,
+        "limit": GIF_RESULTS_PER_QUERY,
         "media_filter": "gif",
         "random": "true",
     }
@@ -1133,37 +1219,45 @@ async def _fetch_gif_url_from_tenor(query: str) -> Optional[str]:
         session = _get_serene_http()
         async with session.get(TENOR_ENDPOINT, params=params, allow_redirects=True) as resp:
             if resp.status != 200:
-                return None
+                raise GifFetchError(f"Tenor HTTP {resp.status}")
             data = await resp.json(content_type=None)
-    except Exception:
-        return None
+    except GifFetchError:
+        raise
+    except Exception as e:
+        raise GifFetchError(f"Tenor request failed: {e!r}") from e
 
+    urls = []
     try:
-        results = data.get("results") or []
-        if not results:
-            return None
-        r0 = results[0]
-        fmts = r0.get("media_formats") or {}
-        # Prefer true GIFs, then smaller renditions
-        for key in ("gif", "mediumgif", "tinygif"):
-            fmt = fmts.get(key)
-            if fmt and "url" in fmt:
-                return fmt["url"]
-        # Fallback to Tenor page URL if no direct media URL
-        return r0.get("url")
+        for r in data.get("results") or []:
+            fmts = r.get("media_formats") or {}
+            # Prefer true GIFs, then smaller renditions
+            for key in ("gif", "mediumgif", "tinygif"):
+                fmt = fmts.get(key)
+                if fmt and "url" in fmt:
+                    urls.append(fmt["url"])
+                    break
+            else:
+                # Fallback to Tenor page URL if no direct media URL
+                if r.get("url"):
+                    urls.append(r["url"])
     except Exception:
-        return None
+        pass
+    return urls
 
 async def _fetch_gif_url_fallback(query: str) -> Optional[str]:
-    """Fallback to your crawler page if Tenor yields nothing."""
+    """Fallback to your crawler page if Tenor yields nothing (GifFetchError if it never answered)."""
     base = "https://serenekeks.com/crawl.php"
     session = _get_serene_http()
+    answered = False
+    last_error = None
     for param in ("q", "query"):
         try:
             async with session.get(base, params={param: query}, allow_redirects=True) as resp:
                 if resp.status != 200:
+                    last_error = f"crawler HTTP {resp.status}"
                     continue
                 body = await resp.text()
+            answered = True
             # Try to pull a src from an <img>, else any image-like URL on the page
             m = IMG_TAG_SRC_RE.search(body)
             if m:
@@ -1171,19 +1265,38 @@ async def _fetch_gif_url_fallback(query: str) -> Optional[str]:
             m2 = IMAGE_URL_IN_TEXT_RE.search(body)
             if m2:
                 return m2.group(1)
-        except Exception:
+        except Exception as e:
+            last_error = f"crawler request failed: {e!r}"
             continue
+    if not answered:
+        raise GifFetchError(last_error or "crawler unavailable")
     return None
 
+async def _fetch_gif_candidates(query: str) -> List[str]:
+    """
+    Upstream lookup used on a gif_cache miss: Tenor list, else the crawler's single hit.
+    Raises GifFetchError only when no source gave a real answer, so failures aren't cached as misses.
+    """
+    tenor_error = None
+    try:
+        urls = await _fetch_gif_urls_from_tenor(query)
+    except GifFetchError as e:
+        urls, tenor_error = [], e
+    if not urls:
+        url = await _fetch_gif_url_fallback(query)
+        if url:
+            urls = [url]
+        elif tenor_error is not None:
+            raise tenor_error
+    return urls
+
 async def _resolve_and_send_gif(room_id: str, display_name: str, query: str):
     """
-    Resolve a GIF via Tenor (with fallback) and broadcast it as a chat image.
-    Runs in the background so it never blocks the WS read loop.
+    Resolve a GIF via the shared cache (Tenor with fallback on a miss) and
+    broadcast it as a chat image. Runs in the background so it never blocks the WS read loop.
     """
     try:
-        url = await _fetch_gif_url_from_tenor(query)
-        if not url:
-            url = await _fetch_gif_url_fallback(query)
+        url = await bot.gif_cache.resolve(query, _fetch_gif_candidates)
 
         if url:
             payload = _build_message_payload(room_id, display_name, url, sender_type="user")
@@ -1197,42 +1310,13 @@ async def _resolve_and_send_gif(room_id: str, display_name: str, query: str):
     except Exception:
         logger.exception("GIF resolve/send failed for query %r", query)
 
-# --- UPDATED broadcaster: gentle + time-limited sends ---
+# --- Broadcaster: delegates to the shared chat hub (serialize once, concurrent, time-limited) ---
 async def _broadcast_room_json(room_id: str, payload: dict):
     """
-    Broadcast dict JSON to the room (uses send_str). Each send is time-limited
-    so slow clients don't stall the event loop that must keep reading pings.
+    Broadcast dict JSON to the room via bot.chat_hub. Slow or dead clients are
+    pruned by the hub so they don't stall the event loop that must keep reading pings.
     """
-    try:
-        room = bot.chat_ws_rooms.get(room_id) or set()
-        msg = json.dumps(payload)
-
-        async def _safe_send(client_ws):
-            if client_ws.closed:
-                return False
-            try:
-                # prevent head-of-line blocking on slow/remotely stalled clients
-                await asyncio.wait_for(client_ws.send_str(msg), timeout=1.0)
-                return True
-            except (asyncio.TimeoutError, ConnectionError, RuntimeError):
-                return False
-            except Exception:
-                return False
-
-        clients = list(room)
-        if not clients:
-            return
-
-        results = await asyncio.gather(*[_safe_send(ws) for ws in clients], return_exceptions=True)
-        for ws, ok in zip(clients, results):
-            # treat exceptions / False / closed as dead
-            if ok is False or isinstance(ok, Exception) or getattr(ws, "closed", False):
-                try:
-                    room.discard(ws)
-                except Exception:
-                    pass
-    except Exception:
-        logger.exception("Broadcast error for room %s", room_id)
+    await bot.chat_hub.broadcast(room_id, payload)
 
 # >>> NEW: helper to pretty-name rooms in notices
 def _pretty_room(name_or_id: Optional[str]) -> str:
@@ -1255,49 +1339,38 @@ async def _broadcast_cross_room_presence(old_room: Optional[str], new_room: str,
     pretty_to = _pretty_room(to_name or new_room)
 
     try:
+        jobs = [bot.chat_hub.notice(new_room, f"{display_name} entered {pretty_to}.")]
         if old_room:
-            await _broadcast_room_json(old_room, {
-                "type": "system_notice",
-                "room_id": old_room,
-                "message": f"{display_name} left {pretty_from} → {pretty_to}."
-            })
-        await _broadcast_room_json(new_room, {
-            "type": "system_notice",
-            "room_id": new_room,
-            "message": f"{display_name} entered {pretty_to}."
-        })
+            jobs.append(bot.chat_hub.notice(old_room, f"{display_name} left {pretty_from} → {pretty_to}."))
+        await asyncio.gather(*jobs, return_exceptions=True)
     except Exception:
         logger.exception("Error broadcasting cross-room presence notice")
 
-async def _delayed_serene_message(room_id: str, message_text: str):
+async def _deliver_serene_message(room_id: str, message_text: str):
     """
-    Humanize Serene: wait 2s then send; wrap image if needed.
+    Called by the scheduler once the 2s humanization delay has elapsed; wrap image if needed.
     """
-    try:
-        await asyncio.sleep(2.0)
-    except Exception:
-        pass
     payload = _build_message_payload(room_id, "Serene", message_text, sender_type="bot", bot_id="serene")
     await _broadcast_room_json(room_id, payload)
 
-async def _serene_start(room_id: str, display_name: str):
-    reply = await _serene_get({"start": "true", "player": display_name})
-    if reply:
-        asyncio.create_task(_delayed_serene_message(room_id, reply))
+# --- Serene pipeline: bounded workers, rate limits, coalescing, reply cache, delay queue ---
+bot.serene_scheduler = SereneScheduler(_serene_get, _deliver_serene_message)
 
-async def _serene_question(room_id: str, display_name: str, question_raw: str):
+def _serene_start(room_id: str, display_name: str) -> bool:
+    return bot.serene_scheduler.submit("start", room_id, display_name,
+                                       {"start": "true", "player": display_name})
+
+def _serene_question(room_id: str, display_name: str, question_raw: str) -> bool:
     safe_q = html.escape(question_raw or "", quote=True)
-    reply = await _serene_get({"question": safe_q, "player": display_name})
-    if reply:
-        asyncio.create_task(_delayed_serene_message(room_id, reply))
+    return bot.serene_scheduler.submit("question", room_id, display_name,
+                                       {"question": safe_q, "player": display_name})
 
-async def _serene_hail(room_id: str, display_name: str, hail_phrase: str):
+def _serene_hail(room_id: str, display_name: str, hail_phrase: str) -> bool:
     """
     Handle 'hail serene' phrase: GET with hail=<matched phrase>&player=<display name>
     """
-    reply = await _serene_get({"hail": hail_phrase, "player": display_name})
-    if reply:
-        asyncio.create_task(_delayed_serene_message(room_id, reply))
+    return bot.serene_scheduler.submit("hail", room_id, display_name,
+                                       {"hail": hail_phrase, "player": display_name})
 
 # ---------------------- CHAT WS: /chat_ws (persistent, robust) ----------------------
 async def chat_websocket_handler(request):
@@ -1403,33 +1476,34 @@ async def chat_websocket_handler(request):
                 room_id = room_id or jd.get('room_id')
                 display_name = display_name or jd.get('displayName')
 
-        # Register in-memory
-        if room_id not in bot.chat_ws_rooms:
-            bot.chat_ws_rooms[room_id] = set()
-        bot.chat_ws_rooms[room_id].add(ws)
+        # Register in-memory (hub owns the bucket)
+        bot.chat_hub.join(ws, room_id)
+        LOOP_MONITOR.tag(room=room_id)
         logger.info(f"'{display_name}' connected to chat room '{room_id}'.")
 
+        # Catch-up: recent chat lines as ONE batched {"type":"history"} frame
+        await bot.chat_hub.send_history(ws, room_id)
+
         # Announce join + >>> NEW: friendly "entered ..." system notice on first join
-        await _broadcast_room_json(room_id, {
-            "type": "user_joined",
-            "displayName": display_name,
-            "room_id": room_id
-        })
+        await bot.chat_hub.announce_join(room_id, display_name)
         try:
             # Only send the entry system line for the first registration
-            await _broadcast_room_json(room_id, {
-                "type": "system_notice",
-                "room_id": room_id,
-                "message": f"{display_name} entered {_pretty_room(room_id)}."
-            })
+            await bot.chat_hub.notice(room_id, f"{display_name} entered {_pretty_room(room_id)}.")
         except Exception:
             pass
 
         # --- Main receive loop ---
+        frame_t0 = None
         while True:
+            if frame_t0 is not None:
+                # a TEXT frame's handling ends when the loop comes back for the next one
+                METRICS.observe("ws_frame_seconds", time.perf_counter() - frame_t0, endpoint="/chat_ws")
+                frame_t0 = None
             msg = await ws.receive()
 
             if msg.type == web.WSMsgType.TEXT:
+                METRICS.inc("ws_frames_total", endpoint="/chat_ws")
+                frame_t0 = time.perf_counter()
                 # 1) handle a raw "ping" string (not JSON)
                 if isinstance(msg.data, str) and msg.data.strip().lower() == "ping":
                     try:
@@ -1460,43 +1534,17 @@ async def chat_websocket_handler(request):
                         from_name = data.get('from_name')  # optional pretty labels sent by frontend
                         to_name = data.get('to_name')
 
-                        # Move this socket between buckets
+                        # Move this socket between buckets + user_left/user_joined + history catch-up (hub, concurrent)
                         try:
-                            # remove from old bucket
-                            try:
-                                if old_room in bot.chat_ws_rooms:
-                                    bot.chat_ws_rooms[old_room].discard(ws)
-                                    if not bot.chat_ws_rooms[old_room]:
-                                        del bot.chat_ws_rooms[old_room]
-                            except Exception:
-                                pass
-
-                            # add to new bucket
-                            if new_room not in bot.chat_ws_rooms:
-                                bot.chat_ws_rooms[new_room] = set()
-                            bot.chat_ws_rooms[new_room].add(ws)
-
-                            # Broadcast presence to both rooms (concurrently so we don't block the loop)
-                            tasks = [
-                                _broadcast_room_json(old_room, {
-                                    "type": "user_left",
-                                    "displayName": display_name,
-                                    "room_id": old_room
-                                }),
-                                _broadcast_room_json(new_room, {
-                                    "type": "user_joined",
-                                    "displayName": display_name,
-                                    "room_id": new_room
-                                }),
-                                _broadcast_cross_room_presence(
-                                    old_room, new_room, display_name,
-                                    from_name=from_name, to_name=to_name
-                                ),
-                            ]
-                            await asyncio.gather(*tasks, return_exceptions=True)
+                            await bot.chat_hub.rebind(ws, new_room, display_name)
+                            await _broadcast_cross_room_presence(
+                                old_room, new_room, display_name,
+                                from_name=from_name, to_name=to_name
+                            )
 
                             # Update room_id
                             room_id = new_room
+                            LOOP_MONITOR.tag(room=room_id)
                             logger.info(f"[/chat_ws] {display_name} re-bound to room '{room_id}'")
 
                         except Exception as e:
@@ -1527,14 +1575,14 @@ async def chat_websocket_handler(request):
                     # Serene flows
                     if awaiting_serene_question:
                         awaiting_serene_question = False
-                        asyncio.create_task(_serene_question(room_id, display_name, user_text))
+                        _serene_question(room_id, display_name, user_text)
 
                     m_hail = HAIL_SERENE_RE.search(lowered)
                     if m_hail:
-                        asyncio.create_task(_serene_hail(room_id, display_name, m_hail.group(0)))
+                        _serene_hail(room_id, display_name, m_hail.group(0))
                     elif SERENE_WORD_RE.search(lowered):
-                        awaiting_serene_question = True
-                        asyncio.create_task(_serene_start(room_id, display_name))
+                        # only wait for a question if Serene actually greeted (not coalesced / rate-limited)
+                        awaiting_serene_question = _serene_start(room_id, display_name)
 
             elif msg.type in (web.WSMsgType.PING, web.WSMsgType.PONG):
                 continue
@@ -1558,18 +1606,11 @@ async def chat_websocket_handler(request):
     finally:
         # Gentle unregister (don’t send a leave event if the room bucket is gone)
         try:
-            if room_id and ws in bot.chat_ws_rooms.get(room_id, set()):
-                bot.chat_ws_rooms[room_id].discard(ws)
-                if not bot.chat_ws_rooms[room_id]:
-                    del bot.chat_ws_rooms[room_id]
-
-                logger.info(f"'{display_name}' disconnected from chat room '{room_id}'.")
-                if room_id in bot.chat_ws_rooms:
-                    await _broadcast_room_json(room_id, {
-                        "type": "user_left",
-                        "displayName": display_name,
-                        "room_id": room_id
-                    })
+            left_room = bot.chat_hub.leave(ws)
+            if left_room:
+                logger.info(f"'{display_name}' disconnected from chat room '{left_room}'.")
+                if left_room in bot.chat_ws_rooms:
+                    await bot.chat_hub.announce_leave(left_room, display_name)
         finally:
             return ws
 
@@ -1647,6 +1688,7 @@ async def game_was_handler(request):
 
         # --- 3) Add to in-memory presence registry immediately (normalized) ---
         mechanics_cog = bot.get_cog('MechanicsMain')
+        LOOP_MONITOR.tag(room=room_id)
         if mechanics_cog:
             registered_in_bucket = mechanics_cog.register_ws_connection(ws, room_id)
             if not registered_in_bucket:
@@ -1659,8 +1701,8 @@ async def game_was_handler(request):
             try:
                 state = await mechanics_cog._load_game_state(room_id)
                 if state:
-                    envelope = {"type": "state", "game_state": state, "room_id": room_id, "server_ts": int(time.time())}
-                    await ws.send_str(json.dumps(envelope))
+                    # projected for this viewer (no deck, other players' hole cards masked)
+                    await ws.send_str(mechanics_cog._encode_state_envelope(room_id, state, sender_id))
                     logger.info(f"Sent initial game_state for room '{room_id}' to new client {sender_id}.")
             except Exception as e:
                 logger.error(f"Failed to send initial game state for room '{room_id}': {e}", exc_info=True)
@@ -1688,6 +1730,8 @@ async def game_was_handler(request):
 
                 if isinstance(data, dict) and "action" in data:
                     if mechanics_cog:
+                        METRICS.inc("ws_frames_total", endpoint="/game_was")
+                        frame_t0 = time.perf_counter()
                         try:
                             data.setdefault("room_id", room_id)
                             data.setdefault("sender_id", sender_id)
@@ -1696,6 +1740,7 @@ async def game_was_handler(request):
                             await mechanics_cog.handle_websocket_game_action(data)
                         except Exception as e:
                             logger.error(f"[/game_was] Dispatch error for action={data.get('action')} r={room_id}: {e}", exc_info=True)
+                        METRICS.observe("ws_frame_seconds", time.perf_counter() - frame_t0, endpoint="/game_was")
 
             elif msg.type in (web.WSMsgType.CLOSE, web.WSMsgType.CLOSING, web.WSMsgType.CLOSED):
                 logger.info(f"[/game_was] Closing for player {sender_id} in room {room_id}. Reason: {msg.type.name}")
@@ -1791,6 +1836,7 @@ async def blackjack_ws_handler(request: web.Request):
 
         # --- 3) Add to in-memory presence bucket for BJ ---
         bj_cog = bot.get_cog("MechanicsMain2")
+        LOOP_MONITOR.tag(room=room_id)
         if bj_cog:
             registered_in_bucket = bj_cog.register_ws_connection(ws, room_id)
             if not registered_in_bucket:
@@ -1807,8 +1853,12 @@ async def blackjack_ws_handler(request: web.Request):
                     load_fn = getattr(bj_cog, "_load_state", None)
                 state = await load_fn(room_id) if load_fn else None
                 if state:
-                    envelope = {"type": "state", "game_state": state, "room_id": room_id, "server_ts": int(time.time())}
-                    await ws.send_str(json.dumps(envelope))
+                    encode_fn = getattr(bj_cog, "_encode_state_envelope", None)
+                    if callable(encode_fn):
+                        await ws.send_str(encode_fn(room_id, state, sender_id))
+                    else:
+                        envelope = {"type": "state", "game_state": state, "room_id": room_id, "server_ts": int(time.time())}
+                        await ws.send_str(json.dumps(envelope))
                     logger.info(f"Sent initial game_state for BJ room '{room_id}' to new client {sender_id}.")
             except Exception as e:
                 logger.error(f"[/blackjack_ws] Failed to send initial game state for room '{room_id}': {e}", exc_info=True)
@@ -1836,6 +1886,8 @@ async def blackjack_ws_handler(request: web.Request):
 
                 if isinstance(data, dict) and "action" in data:
                     if bj_cog:
+                        METRICS.inc("ws_frames_total", endpoint="/blackjack_ws")
+                        frame_t0 = time.perf_counter()
                         try:
                             data.setdefault("room_id", room_id)
                             data.setdefault("sender_id", sender_id)
@@ -1844,6 +1896,7 @@ async def blackjack_ws_handler(request: web.Request):
                             await bj_cog.handle_websocket_game_action(data)
                         except Exception as e:
                             logger.error(f"[/blackjack_ws] Dispatch error for action={data.get('action')} r={room_id}: {e}", exc_info=True)
+                        METRICS.observe("ws_frame_seconds", time.perf_counter() - frame_t0, endpoint="/blackjack_ws")
 
             elif msg.type in (web.WSMsgType.CLOSE, web.WSMsgType.CLOSING, web.WSMsgType.CLOSED):
                 logger.info(f"[/blackjack_ws] Closing for player {sender_id} in room {room_id}. Reason: {msg.type.name}")
@@ -2050,8 +2103,8 @@ async def avatar_ws_handler(request):
 
 # ---------------------- ADMIN WS: /admin_ws ----------------------
 
-async def ensure_quarantine_objects(guild_id: str, role_name: str, channel_name: str) -> bool:
-    """Create or update the quarantine role & channel for the guild."""
+async def ensure_quarantine_objects(guild_id: str, role_name: str, channel_name: str, progress=None) -> bool:
+    """Create or update the quarantine role & channel for the guild (progress: see _enforce_quarantine_visibility)."""
     try:
         guild = bot.get_guild(int(guild_id))
         if not guild:
@@ -2091,12 +2144,12 @@ async def ensure_quarantine_objects(guild_id: str, role_name: str, channel_name:
             )
             created = True
             logger.info(f"Created channel '{channel.name}' in guild {guild_id}")
-        else:
+        elif any(channel.overwrites_for(target) != ow for target, ow in overwrites.items()):
             await channel.edit(overwrites=overwrites, reason="Ensure quarantine channel permissions")
             logger.info(f"Updated channel '{channel.name}' overwrites in guild {guild_id}")
 
         # Global deny elsewhere
-        await _enforce_quarantine_visibility(guild, role, channel)
+        await _enforce_quarantine_visibility(guild, role, channel, progress=progress)
 
         # If newly created, seed the Read Me message with Accept button
         if created and isinstance(channel, discord.TextChannel):
@@ -2118,6 +2171,10 @@ async def admin_ws_handler(request):
     Expects JSON frames like:
       {"op":"provision_quarantine","bot_entry":"<BOT_ENTRY>","guild_id":"123",
        "quarantine_channel_name":"oops","quarantine_role_name":"Rule-Breaker"}
+    Add "stream": true to receive progress frames before the final {"ok": ...}:
+      {"op":"provision_progress","guild_id":"123","total":N,"compliant":N,"applied":N,"failed":N}
+    Also:
+      {"op":"invalidate_mod_config","bot_entry":"...","guild_id":"123"}  (omit guild_id for all guilds)
     """
     ws = web.WebSocketResponse()
     await ws.prepare(request)
@@ -2147,8 +2204,24 @@ async def admin_ws_handler(request):
                     await ws.send_json({"ok": False, "error": "missing_fields"})
                     continue
 
-                ok = await ensure_quarantine_objects(guild_id, rl_name, ch_name)
+                last_sent = [0.0]
+
+                async def _stream_progress(summary, guild_id=guild_id, last_sent=last_sent):
+                    # at most ~4 frames/s, but always the plan and the final count
+                    done = summary["applied"] + summary["failed"] + summary["compliant"]
+                    now = time.monotonic()
+                    if done < summary["total"] and now - last_sent[0] < 0.25 and last_sent[0]:
+                        return
+                    last_sent[0] = now
+                    if not ws.closed:
+                        await ws.send_json({"op": "provision_progress", "guild_id": guild_id, **summary})
+
+                ok = await ensure_quarantine_objects(guild_id, rl_name, ch_name,
+                                                     progress=_stream_progress if data.get("stream") else None)
                 await ws.send_json({"ok": ok})
+            elif op == "invalidate_mod_config":
+                MOD_CONFIGS.invalidate(data.get("guild_id") or None)
+                await ws.send_json({"ok": True})
             else:
                 await ws.send_json({"ok": False, "error": "unknown_op"})
 
@@ -2198,6 +2271,14 @@ async def start_web_server():
     bot.web_app.router.add_get('/game_was_probe', game_was_probe)
     logger.info("🛠️  Registered GET route: /game_was_probe")
 
+    # Metrics (Prometheus text format)
+    bot.web_app.router.add_get('/metrics', metrics_handler)
+    logger.info("🛠️  Registered GET route: /metrics")
+    bot.web_app.router.add_get('/loop_health', loop_health_handler)
+    logger.info("🛠️  Registered GET route: /loop_health")
+    bot.web_app.router.add_get('/admin/tick_profile', tick_profile_handler)
+    logger.info("🛠️  Registered GET route: /admin/tick_profile")
+
     # WS endpoints
     bot.web_app.router.add_get('/game_was', game_was_handler)
     logger.info("🛠️  Registered WebSocket route: /game_was")
@@ -2206,8 +2287,13 @@ async def start_web_server():
     bot.web_app.router.add_get('/blackjack_ws', blackjack_ws_handler)
     logger.info("🛠️  Registered WebSocket route: /blackjack_ws")
 
-    bot.web_app.router.add_get('/chat_ws', chat_websocket_handler)  # Chat WS
-    logger.info("🛠️  Registered WebSocket route: /chat_ws")
+    # Chat WS (ChatMain may already own it; both handlers share bot.chat_hub)
+    if not getattr(bot, "_chat_route_added", False):
+        bot.web_app.router.add_get('/chat_ws', chat_websocket_handler)
+        bot._chat_route_added = True
+        logger.info("🛠️  Registered WebSocket route: /chat_ws")
+    else:
+        logger.info("🛠️  /chat_ws already registered by ChatMain; skipping bot.py handler")
 
     bot.web_app.router.add_get('/admin_ws', admin_ws_handler)
     logger.info("🛠️  Registered WebSocket route: /admin_ws")
@@ -2616,7 +2702,13 @@ async def main():
     if not TOKEN:
         logger.error("BOT_TOKEN missing")
         return
-    await bot.start(TOKEN)
+    LOOP_MONITOR.start()
+    JEOPARDY_BANK.start()  # have boards ready before the first /serene game jeopardy
+    try:
+        await bot.start(TOKEN)
+    finally:
+        # don't lose the last HISTORY_FLUSH_SECS of chat lines
+        await bot.chat_hub.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
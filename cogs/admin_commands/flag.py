@@ -7,9 +7,20 @@ import aiomysql
 from typing import List, Optional, Tuple, Dict
 from datetime import timedelta
 import re
+import time
+import asyncio
+
+from cogs.utils.mod_config import MOD_CONFIGS
+from cogs.utils.warnings_store import record_offenses
 
 logger = logging.getLogger(__name__)
 
+# Member edits / bans share per-guild rate-limit buckets; discord.py waits out any 429,
+# this just keeps a 25-user flag from queueing everything at once.
+FLAG_ACTION_CONCURRENCY = 5
+FLAG_PROGRESS_SECS = 1.0     # min gap between progress edits of the results message
+FLAG_MESSAGE_LIMIT = 1900    # Discord caps message content at 2000 chars
+
 # ---------- Small name-matching helpers (space/hyphen tolerant) ----------
 
 def _normalize_role_variants(name: str) -> List[str]:
@@ -54,118 +65,31 @@ def _find_role_fuzzy(guild: discord.Guild, role_name: str) -> Optional[discord.R
 
 async def fetch_flag_reasons(db_user: str, db_password: str, db_host: str, guild_id: int | str) -> List[str]:
     """
-    Fetch the latest reasons right before building the view.
-
-    Logic:
-      1) Look up bot_use_custom.use_custom for this guild_id.
-      2) If use_custom = 1 -> SELECT reason FROM rule_flagging WHERE guild_id = %s
-      3) Else -> SELECT reason FROM rule_flagging WHERE guild_id = 'DEFAULT'
+    Flag reasons for the guild (the guild's own if bot_use_custom.use_custom = 1,
+    else the 'DEFAULT' set), from the per-guild moderation config cache. The
+    site's /settings_saved signal invalidates it, so the menu is never stale.
     """
-    if not all([db_user, db_password, db_host]):
-        logger.error("Missing DB credentials; cannot fetch flag reasons.")
-        return []
-
-    reasons: List[str] = []
-    conn = None
-    try:
-        conn = await aiomysql.connect(
-            host=db_host,
-            user=db_user,
-            password=db_password,
-            db="serene_users",
-            charset='utf8mb4',
-            autocommit=True
-        )
-        async with conn.cursor() as cursor:
-            # 1) Check if this guild uses custom flags
-            use_custom = 0
-            try:
-                await cursor.execute(
-                    "SELECT use_custom FROM bot_use_custom WHERE guild_id = %s",
-                    (str(guild_id),)
-                )
-                row = await cursor.fetchone()
-                if row is not None:
-                    use_custom = int(row[0]) if row[0] is not None else 0
-            except Exception as e:
-                logger.error(f"Failed to read bot_use_custom for guild {guild_id}: {e}", exc_info=True)
-                use_custom = 0  # fallback to default
-
-            # 2) Load reasons based on flag mode
-            if use_custom == 1:
-                await cursor.execute(
-                    "SELECT reason FROM rule_flagging WHERE guild_id = %s ORDER BY rule_class ASC, id ASC",
-                    (str(guild_id),)
-                )
-            else:
-                await cursor.execute(
-                    "SELECT reason FROM rule_flagging WHERE guild_id = 'DEFAULT' ORDER BY rule_class ASC, id ASC"
-                )
-
-            rows = await cursor.fetchall()
-            seen = set()
-            for r in rows or []:
-                reason = r[0]
-                if reason and reason not in seen:
-                    seen.add(reason)
-                    reasons.append(reason)
-
-    except Exception as e:
-        logger.error(f"Failed to fetch reasons: {e}", exc_info=True)
-    finally:
-        if conn:
-            conn.close()
-    return reasons
-
-async def _fetch_actions_config(cursor, guild_id: int | str) -> Dict[str, str]:
-    """
-    Returns dict with keys: first_flag, second_flag, final_flag, instant_ban_behavior.
-    Applies same defaults as your PHP.
-    """
-    defaults = {
-        "first_flag": "show_rules_disable_chat",
-        "second_flag": "timeout_1h",
-        "final_flag": "ban",
-        "instant_ban_behavior": "none",
-    }
-    try:
-        await cursor.execute(
-            "SELECT first_flag, second_flag, final_flag, instant_ban_behavior "
-            "FROM bot_flag_actions WHERE guild_id = %s",
-            (str(guild_id),)
-        )
-        row = await cursor.fetchone()
-        if not row:
-            return defaults
-        return {
-            "first_flag": row[0] or defaults["first_flag"],
-            "second_flag": row[1] or defaults["second_flag"],
-            "final_flag": row[2] or defaults["final_flag"],
-            "instant_ban_behavior": row[3] or defaults["instant_ban_behavior"],
-        }
-    except Exception as e:
-        logger.error(f"_fetch_actions_config failed for guild {guild_id}: {e}", exc_info=True)
-    return defaults
+    cfg = await MOD_CONFIGS.get(guild_id, db_user, db_password, db_host)
+    return list(cfg["reasons"])
+
+async def _known_user_ids(cursor, guild_id: int | str, user_ids: List[int]) -> set:
+    """discord_ids (as str) of the given users that have a discord_users row."""
+    if not user_ids:
+        return set()
+    marks = ", ".join(["%s"] * len(user_ids))
+    await cursor.execute(
+        f"SELECT discord_id FROM discord_users WHERE guild_id = %s AND discord_id IN ({marks})",
+        (str(guild_id), *[str(u) for u in user_ids])
+    )
+    return {str(r[0]) for r in await cursor.fetchall() or []}
 
-async def _fetch_quarantine_options(cursor, guild_id: int | str) -> Tuple[Optional[str], Optional[str]]:
-    """
-    Returns (quarantine_role_name, quarantine_channel_name) from bot_flag_action_options.
-    """
-    try:
-        await cursor.execute(
-            "SELECT quarantine_role_name, quarantine_channel_name FROM bot_flag_action_options WHERE guild_id = %s",
-            (str(guild_id),)
-        )
-        row = await cursor.fetchone()
-        if not row:
-            return (None, None)
-        # Row might be tuple; handle dict cursor too just in case
-        role_name = row[0] if isinstance(row, tuple) else row.get("quarantine_role_name")
-        ch_name = row[1] if isinstance(row, tuple) else row.get("quarantine_channel_name")
-        return (role_name, ch_name)
-    except Exception as e:
-        logger.error(f"_fetch_quarantine_options error for guild {guild_id}: {e}", exc_info=True)
-    return (None, None)
+def _tier_for(offense_number: int, actions_cfg: dict) -> Tuple[str, str]:
+    """Per-reason escalation: 1st -> first action, 2nd -> second, 3rd+ -> final."""
+    if offense_number <= 1:
+        return "first", actions_cfg["first_flag"]
+    if offense_number == 2:
+        return "second", actions_cfg["second_flag"]
+    return "final", actions_cfg["final_flag"]
 
 # ---------- Components ----------
 
@@ -200,7 +124,7 @@ class FlagUserSelect(UserSelect):
         super().__init__(
             placeholder="Select user(s) to flag",
             min_values=1,
-            max_values=5,
+            max_values=25,
             custom_id="flag_users"
         )
         self.current_selected_users = current_selections if current_selections is not None else []
@@ -256,34 +180,22 @@ async def _apply_ban(member: discord.Member, pm_behavior: str):
         logger.error(f"Ban error for {member}: {e}", exc_info=True)
         return "error"
 
-async def _apply_show_rules_disable_chat(
-    cursor,
-    bot: discord.Client,
-    member: discord.Member,
-    guild_id: int | str,
-    quarantine_role_name: Optional[str],
-    quarantine_channel_name: Optional[str]
-):
+def _saved_roles_row(member: discord.Member, guild_id: int | str) -> tuple:
+    """(role_data, guild_id, discord_id) for the batched discord_users.role_data UPDATE."""
+    role_ids = [str(r.id) for r in member.roles if not r.is_default()]
+    return (json.dumps({"roles": role_ids}), str(guild_id), str(member.id))
+
+async def _apply_show_rules_disable_chat(member: discord.Member, qrole: Optional[discord.Role]):
     """
-    Save current roles -> clear manageable roles -> assign quarantine role (by name)
-    -> enforce quarantine visibility across the guild (hide everything except the quarantine channel).
+    Clear manageable roles -> assign the quarantine role.
+    The caller saves the current roles to discord_users.role_data first (batched)
+    and enforces quarantine visibility once for the whole batch afterwards.
     """
     guild = member.guild
     if not guild:
         return "no-guild"
 
-    # 1) Save current roles into discord_users.role_data
-    role_ids = [str(r.id) for r in member.roles if not r.is_default()]
-    try:
-        role_data_json = json.dumps({"roles": role_ids})
-        await cursor.execute(
-            "UPDATE discord_users SET role_data = %s WHERE guild_id = %s AND discord_id = %s",
-            (role_data_json, str(guild_id), str(member.id))
-        )
-    except Exception as e:
-        logger.error(f"Failed updating role_data for {member}: {e}", exc_info=True)
-
-    # 2) Remove all manageable roles
+    # 1) Remove all manageable roles
     me = guild.me
     removable = []
     for r in member.roles:
@@ -305,10 +217,8 @@ async def _apply_show_rules_disable_chat(
         logger.error(f"Error removing roles from {member}: {e}", exc_info=True)
         return "error"
 
-    # 3) Assign quarantine role by name (fuzzy)
-    qrole = _find_role_fuzzy(guild, quarantine_role_name or "")
+    # 2) Assign the quarantine role (resolved by name by the caller)
     if not qrole:
-        logger.warning(f"Quarantine role '{quarantine_role_name}' not found in guild {guild_id}")
         return "no-quarantine-role"
 
     try:
@@ -320,7 +230,11 @@ async def _apply_show_rules_disable_chat(
         logger.error(f"Error adding quarantine role to {member}: {e}", exc_info=True)
         return "error"
 
-    # 4) Enforce server-wide visibility: only see quarantine channel
+    return "quarantined"
+
+async def _enforce_quarantine(bot, guild: discord.Guild, quarantine_role_name: Optional[str],
+                              quarantine_channel_name: Optional[str]):
+    """Server-wide visibility: quarantined members only see the quarantine channel."""
     try:
         # We rely on bot.ensure_quarantine_objects (added/exposed in bot.py)
         if hasattr(bot, "ensure_quarantine_objects") and callable(getattr(bot, "ensure_quarantine_objects")):
@@ -328,9 +242,189 @@ async def _apply_show_rules_disable_chat(
         else:
             logger.warning("bot.ensure_quarantine_objects not available; cannot enforce channel denies.")
     except Exception as e:
-        logger.error(f"Failed to enforce quarantine visibility for guild {guild_id}: {e}", exc_info=True)
+        logger.error(f"Failed to enforce quarantine visibility for guild {guild.id}: {e}", exc_info=True)
 
-    return "quarantined"
+# ---------- Bulk flag executor ----------
+
+async def _resolve_members(guild: discord.Guild, user_ids: List[int]) -> Dict[int, Optional[discord.Member]]:
+    """
+    user_id -> Member (None if not in the guild). Cache first, then one gateway
+    member query for the rest, then concurrent fetch_member for any stragglers.
+    """
+    members = {uid: guild.get_member(uid) for uid in user_ids}
+    missing = [uid for uid, m in members.items() if m is None]
+    if missing:
+        try:
+            for m in await guild.query_members(user_ids=missing[:100], limit=min(100, len(missing)), cache=True):
+                members[m.id] = m
+        except Exception as e:
+            logger.debug(f"query_members failed for guild {guild.id}: {e}")
+    still_missing = [uid for uid in missing if members.get(uid) is None]
+    if still_missing:
+        slots = asyncio.Semaphore(FLAG_ACTION_CONCURRENCY)
+
+        async def fetch(uid: int):
+            async with slots:
+                try:
+                    members[uid] = await guild.fetch_member(uid)
+                except Exception:
+                    members[uid] = None
+
+        await asyncio.gather(*(fetch(uid) for uid in still_missing))
+    return members
+
+class FlagProgress:
+    """
+    Keeps one result line per user (in selection order) and streams them to the
+    moderator: the original ephemeral message is edited at most every
+    FLAG_PROGRESS_SECS, and lines that don't fit in it go out as followups.
+    """
+    def __init__(self, interaction: discord.Interaction, users: List[discord.User], reason: str):
+        self.interaction = interaction
+        self.reason = reason
+        self.order = [u.id for u in users]
+        self.lines = {u.id: f"• {u.mention}: ⏳" for u in users}
+        self.done = 0
+        self._last_edit = 0.0
+
+    def set(self, user: discord.User, line: str):
+        if self.lines.get(user.id, "").endswith("⏳"):
+            self.done += 1
+        self.lines[user.id] = f"• {user.mention}: {line}"
+
+    def _render(self, final: bool) -> Tuple[str, List[str]]:
+        head = "🚩 **Flag results**" if final else f"🚩 Flagging for **{self.reason}** — {self.done}/{len(self.order)} done"
+        body, overflow = [head], []
+        size = len(head)
+        for uid in self.order:
+            line = self.lines[uid]
+            if size + len(line) + 1 > FLAG_MESSAGE_LIMIT:
+                overflow.append(line)
+            else:
+                body.append(line)
+                size += len(line) + 1
+        return "\n".join(body), overflow
+
+    async def update(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_edit < FLAG_PROGRESS_SECS:
+            return
+        self._last_edit = now
+        text, _ = self._render(final=False)
+        try:
+            await self.interaction.edit_original_response(content=text, view=None, embed=None)
+        except Exception as e:
+            logger.debug(f"flag progress edit failed: {e}")
+
+    async def finish(self):
+        text, overflow = self._render(final=True)
+        try:
+            await self.interaction.edit_original_response(content=text, view=None, embed=None)
+            chunk = []
+            for line in overflow:
+                if sum(len(x) + 1 for x in chunk) + len(line) > FLAG_MESSAGE_LIMIT:
+                    await self.interaction.followup.send("\n".join(chunk), ephemeral=True)
+                    chunk = []
+                chunk.append(line)
+            if chunk:
+                await self.interaction.followup.send("\n".join(chunk), ephemeral=True)
+        except Exception as e:
+            logger.error(f"Failed to send flag results: {e}", exc_info=True)
+
+async def execute_bulk_flag(bot, guild: discord.Guild, users: List[discord.User], reason: str,
+                            db: dict, progress: FlagProgress):
+    """
+    Flag `users` for `reason`:
+      1) resolve members (concurrently) while making sure every user has a DB row
+      2) one COUNT + one INSERT for all offenses, one UPDATE for all saved roles
+      3) Discord actions concurrently (FLAG_ACTION_CONCURRENCY at a time)
+      4) quarantine visibility enforced once for the batch
+    """
+    guild_id = guild.id
+    mod_cfg = await MOD_CONFIGS.get(guild_id, db["user"], db["password"], db["host"])
+    actions_cfg = mod_cfg["actions"]
+
+    conn = await aiomysql.connect(
+        host=db["host"],
+        user=db["user"],
+        password=db["password"],
+        db="serene_users",
+        charset='utf8mb4',
+        autocommit=True
+    )
+    try:
+        async def ensure_rows() -> set:
+            async with conn.cursor() as cursor:
+                known = await _known_user_ids(cursor, guild_id, [u.id for u in users])
+                missing = [u for u in users if str(u.id) not in known]
+                if missing and hasattr(bot, "add_user_to_db_if_not_exists"):
+                    # each bootstrap uses its own connection, so these can overlap
+                    await asyncio.gather(*(bot.add_user_to_db_if_not_exists(guild_id, u.display_name, u.id)
+                                           for u in missing), return_exceptions=True)
+                    known |= await _known_user_ids(cursor, guild_id, [u.id for u in missing])
+            return known
+
+        known, members = await asyncio.gather(ensure_rows(), _resolve_members(guild, [u.id for u in users]))
+
+        offenses = await record_offenses(conn, str(guild_id), reason, [u.id for u in users if str(u.id) in known])
+
+        # Plan every user's action
+        plan = []  # (user, member, tier, action)
+        for user in users:
+            if str(user.id) not in offenses:
+                progress.set(user, "not in DB; skipped.")
+                continue
+            tier, action = _tier_for(offenses[str(user.id)], actions_cfg)
+            member = members.get(user.id)
+            if member is None:
+                progress.set(user, f"{tier} flag for **{reason}** → {action} (recorded).")
+            elif member.guild_permissions.administrator:
+                progress.set(user, f"{tier} flag for **{reason}** → {action} (skipped (admin)).")
+            else:
+                plan.append((user, member, tier, action))
+        await progress.update(force=True)
+
+        # Save current roles of everyone about to be quarantined in one statement
+        quarantining = [m for _, m, _, action in plan if action == "show_rules_disable_chat"]
+        qrole = None
+        if quarantining:
+            qrole = _find_role_fuzzy(guild, mod_cfg["quarantine_role_name"] or "")
+            if not qrole:
+                logger.warning(f"Quarantine role '{mod_cfg['quarantine_role_name']}' not found in guild {guild_id}")
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.executemany(
+                        "UPDATE discord_users SET role_data = %s WHERE guild_id = %s AND discord_id = %s",
+                        [_saved_roles_row(m, guild_id) for m in quarantining]
+                    )
+            except Exception as e:
+                logger.error(f"Failed saving role_data before quarantine: {e}", exc_info=True)
+    finally:
+        conn.close()
+
+    slots = asyncio.Semaphore(FLAG_ACTION_CONCURRENCY)
+
+    async def apply(user, member, tier, action):
+        async with slots:
+            try:
+                if action == "show_rules_disable_chat":
+                    applied = await _apply_show_rules_disable_chat(member, qrole)
+                elif action.startswith("timeout_"):
+                    applied = await _apply_timeout(member, action)
+                elif action == "ban":
+                    applied = await _apply_ban(member, actions_cfg.get("instant_ban_behavior", "none"))
+                else:
+                    applied = "no-op"
+                progress.set(user, f"{tier} flag for **{reason}** → {action} ({applied}).")
+            except Exception as e:
+                logger.error(f"Failed to process {user} ({user.id}) for flagging: {e}", exc_info=True)
+                progress.set(user, "error while flagging.")
+        await progress.update()
+
+    await asyncio.gather(*(apply(*p) for p in plan))
+
+    if quarantining and qrole:
+        await _enforce_quarantine(bot, guild, mod_cfg["quarantine_role_name"], mod_cfg["quarantine_channel_name"])
 
 # ---------- Confirm button ----------
 
@@ -370,158 +464,26 @@ class FlagConfirmButton(Button):
             await interaction.response.send_message("This must be used in a server.", ephemeral=True)
             return
 
-        guild_id = interaction.guild_id
-        selected_reason = view.selected_reason
+        users = list(view.selected_users)
+        # Acknowledge right away; results stream into this message as they land
+        progress = FlagProgress(interaction, users, view.selected_reason)
+        text, _ = progress._render(final=False)
+        await interaction.response.edit_message(content=text, view=None, embed=None)
 
-        results_lines = []
-        conn = None
         try:
-            conn = await aiomysql.connect(
-                host=db_host,
-                user=db_user,
-                password=db_password,
-                db="serene_users",
-                charset='utf8mb4',
-                autocommit=True
+            await execute_bulk_flag(
+                bot, guild, users, view.selected_reason,
+                {"user": db_user, "password": db_password, "host": db_host},
+                progress,
             )
-
-            async with conn.cursor() as cursor:
-                # Fetch action config + quarantine options once
-                actions_cfg = await _fetch_actions_config(cursor, guild_id)
-                quarantine_role_name, quarantine_channel_name = await _fetch_quarantine_options(cursor, guild_id)
-
-                for user in view.selected_users:
-                    # Convert to Member (we need roles/permissions)
-                    member: Optional[discord.Member] = guild.get_member(user.id)
-                    if member is None:
-                        try:
-                            member = await guild.fetch_member(user.id)
-                        except Exception:
-                            member = None
-
-                    # Ensure user exists in DB
-                    try:
-                        await cursor.execute(
-                            "SELECT json_data FROM discord_users WHERE guild_id = %s AND discord_id = %s",
-                            (str(guild_id), str(user.id))
-                        )
-                        row = await cursor.fetchone()
-                        if not row:
-                            # Let the bot bootstrap the user
-                            if hasattr(bot, "add_user_to_db_if_not_exists"):
-                                await bot.add_user_to_db_if_not_exists(guild_id, user.display_name, user.id)
-                                await cursor.execute(
-                                    "SELECT json_data FROM discord_users WHERE guild_id = %s AND discord_id = %s",
-                                    (str(guild_id), str(user.id))
-                                )
-                                row = await cursor.fetchone()
-                        if not row:
-                            results_lines.append(f"• {user.mention}: not in DB; skipped.")
-                            continue
-
-                        json_data = {}
-                        raw = row[0]
-                        if isinstance(raw, (bytes, bytearray)):
-                            raw = raw.decode("utf-8", errors="ignore")
-                        try:
-                            json_data = json.loads(raw) if raw else {}
-                        except Exception:
-                            json_data = {}
-
-                        warnings = json_data.setdefault("warnings", {})
-                        flags = warnings.setdefault("flags", [])
-                        strikes = warnings.setdefault("strikes", [])
-
-                        # Compute current counts per reason
-                        has_flag = any(f.get("reason") == selected_reason for f in flags)
-                        strikes_for_reason = sum(1 for s in strikes if s.get("reason") == selected_reason)
-
-                        # Update data: first time -> add flag; else add a new strike
-                        if not has_flag:
-                            flags.append({
-                                "reason": selected_reason,
-                                "seen": False,
-                                "timestamp": discord.utils.utcnow().isoformat()
-                            })
-                            new_offense_count = 1
-                        else:
-                            new_strike_num = strikes_for_reason + 1
-                            strikes.append({
-                                "reason": selected_reason,
-                                "strike_number": new_strike_num,
-                                "timestamp": discord.utils.utcnow().isoformat()
-                            })
-                            new_offense_count = 1 + new_strike_num  # 2 or 3+
-
-                        json_data["warnings"] = {"flags": flags, "strikes": strikes}
-                        await cursor.execute(
-                            "UPDATE discord_users SET json_data = %s WHERE guild_id = %s AND discord_id = %s",
-                            (json.dumps(json_data), str(guild_id), str(user.id))
-                        )
-
-                        # Decide punishment tier (per-reason)
-                        if new_offense_count == 1:
-                            action_to_apply = actions_cfg["first_flag"]
-                            tier = "first"
-                        elif new_offense_count == 2:
-                            action_to_apply = actions_cfg["second_flag"]
-                            tier = "second"
-                        else:
-                            action_to_apply = actions_cfg["final_flag"]
-                            tier = "final"
-
-                        # Only apply punishment to non-admins
-                        applied = "recorded"
-                        if member and not member.guild_permissions.administrator:
-                            if action_to_apply == "show_rules_disable_chat":
-                                applied = await _apply_show_rules_disable_chat(
-                                    cursor,
-                                    bot,
-                                    member,
-                                    guild_id,
-                                    quarantine_role_name,
-                                    quarantine_channel_name
-                                )
-                            elif action_to_apply.startswith("timeout_"):
-                                applied = await _apply_timeout(member, action_to_apply)
-                            elif action_to_apply == "ban":
-                                applied = await _apply_ban(member, actions_cfg.get("instant_ban_behavior", "none"))
-                            else:
-                                applied = "no-op"
-                        else:
-                            if member and member.guild_permissions.administrator:
-                                applied = "skipped (admin)"
-
-                        results_lines.append(f"• {user.mention}: {tier} flag for **{selected_reason}** → {action_to_apply} ({applied}).")
-
-                    except Exception as e:
-                        logger.error(f"Failed to process {user} ({user.id}) for flagging: {e}", exc_info=True)
-                        results_lines.append(f"• {user.mention}: error while flagging.")
-
-            # Respond with a compact summary
-            text = "🚩 **Flag results**\n" + "\n".join(results_lines) if results_lines else "No users processed."
-            if interaction.response.is_done():
-                await interaction.edit_original_response(content=text, view=None, embed=None)
-            else:
-                await interaction.response.edit_message(content=text, view=None, embed=None)
-
+            await progress.finish()
         except Exception as e:
             logger.error(f"DB connection or general error during flagging: {e}", exc_info=True)
-            if interaction.response.is_done():
-                await interaction.edit_original_response(
-                    content="An error occurred while attempting to flag users.",
-                    view=None,
-                    embed=None
-                )
-            else:
-                await interaction.response.edit_message(
-                    content="An error occurred while attempting to flag users.",
-                    view=None,
-                    embed=None
-                )
-        finally:
-            if conn:
-                conn.close()
+            await interaction.edit_original_response(
+                content="An error occurred while attempting to flag users.",
+                view=None,
+                embed=None
+            )
 
 class FlagCancelButton(Button):
     def __init__(self):
@@ -560,7 +522,7 @@ class FlagView(View):
 async def start(serene_group, bot, interaction: discord.Interaction):
     """
     Called when the admin opens the flag UI.
-    We fetch the latest reasons at this moment so dropdowns are never stale.
+    Reasons come from the moderation config cache (invalidated when the site saves settings).
     """
     db_user = getattr(bot, "db_user", None)
     db_password = getattr(bot, "db_password", None)
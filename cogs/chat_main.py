@@ -12,6 +12,11 @@ import html  # for HTML-escaping the question text
 from typing import Optional, Tuple
 from urllib.parse import urlsplit
 
+from cogs.utils.chat_hub import ChatHub
+from cogs.utils.gif_cache import GifCache, GifFetchError, GIF_RESULTS_PER_QUERY
+from cogs.utils.serene_scheduler import SereneScheduler
+from cogs.utils.metrics import REGISTRY as METRICS
+
 logger = logging.getLogger(__name__)
 
 SOUND_NAME_RE = re.compile(r'^\s*([A-Za-z0-9_-]{1,64})(?:\s+(\d{2,3}))?\s*$')
@@ -53,6 +58,16 @@ class ChatMain(commands.Cog):
             self.bot.chat_ws_rooms = {}
         self.bot.chat_ws_rooms.setdefault("lobby", set())
 
+        # Shared hub (created by bot.py; fall back to our own for standalone loads)
+        if getattr(self.bot, "chat_hub", None) is None:
+            self.bot.chat_hub = ChatHub(self.bot.chat_ws_rooms)
+        self.hub = self.bot.chat_hub
+
+        # Shared GIF cache (same fallback rule as the hub)
+        if getattr(self.bot, "gif_cache", None) is None:
+            self.bot.gif_cache = GifCache()
+        self.gif_cache = self.bot.gif_cache
+
         # Track which client’s next message should be treated as a Serene question
         self._awaiting_serene_question = set()
 
@@ -60,6 +75,9 @@ class ChatMain(commands.Cog):
         self.http_timeout = aiohttp.ClientTimeout(total=5)
         self.http_session = aiohttp.ClientSession(timeout=self.http_timeout)
 
+        # Serene pipeline: bounded workers, rate limits, coalescing, reply cache, delay queue
+        self.serene = SereneScheduler(self._serene_request_get, self._deliver_serene)
+
         # Add the WebSocket route once
         if hasattr(self.bot, "web_app"):
             if not getattr(self.bot, "_chat_route_added", False):
@@ -72,6 +90,7 @@ class ChatMain(commands.Cog):
             logger.error("Bot has no 'web_app' attribute. Cannot add chat WebSocket route.")
 
     def cog_unload(self):
+        self.serene.stop()
         try:
             if not self.http_session.closed:
                 asyncio.create_task(self.http_session.close())
@@ -92,15 +111,8 @@ class ChatMain(commands.Cog):
         return s
 
     async def _broadcast_room_json(self, room_id: str, payload: dict):
-        """Send to all sockets in a room (gentle failure handling)."""
-        for client_ws in list(self.bot.chat_ws_rooms.get(room_id, set())):
-            try:
-                if client_ws.closed:
-                    continue
-                await client_ws.send_json(payload)
-            except Exception:
-                # Do not hard-remove; leave cleanup to disconnect path
-                logger.warning("Could not send payload to a client in room %s.", room_id)
+        """Send to all sockets in a room via the shared hub (serialize once, concurrent)."""
+        await self.hub.broadcast(room_id, payload)
 
     async def _presence_move_messages(
         self,
@@ -119,40 +131,25 @@ class ChatMain(commands.Cog):
         pretty_from = self._pretty_room(from_name or old_room)
         pretty_to = self._pretty_room(to_name or new_room)
 
+        ts = int(time.time())
+        jobs = []
+
         # Old room notice
         if old_room:
             if str(old_room).lower() == "lobby":
                 # Moving out of lobby (optional line; can keep this subtle or omit)
-                await self._broadcast_room_json(old_room, {
-                    "type": "system_notice",
-                    "room_id": old_room,
-                    "message": f"{display_name} left the lobby.",
-                    "timestamp": int(time.time()),
-                })
+                jobs.append(self.hub.notice(old_room, f"{display_name} left the lobby.", ts))
             else:
                 # Leaving a game
-                await self._broadcast_room_json(old_room, {
-                    "type": "system_notice",
-                    "room_id": old_room,
-                    "message": f"{display_name} left the game.",
-                    "timestamp": int(time.time()),
-                })
+                jobs.append(self.hub.notice(old_room, f"{display_name} left the game.", ts))
 
         # New room notice
         if str(new_room).lower() == "lobby":
-            await self._broadcast_room_json(new_room, {
-                "type": "system_notice",
-                "room_id": new_room,
-                "message": f"{display_name} joined the lobby",
-                "timestamp": int(time.time()),
-            })
+            jobs.append(self.hub.notice(new_room, f"{display_name} joined the lobby", ts))
         else:
-            await self._broadcast_room_json(new_room, {
-                "type": "system_notice",
-                "room_id": new_room,
-                "message": f"{display_name} joined the game",
-                "timestamp": int(time.time()),
-            })
+            jobs.append(self.hub.notice(new_room, f"{display_name} joined the game", ts))
+
+        await asyncio.gather(*jobs, return_exceptions=True)
 
     # -------------------------
     # Sound helpers
@@ -328,42 +325,45 @@ class ChatMain(commands.Cog):
     # GIF helpers
     # -------------------------
 
-    async def _fetch_gif_url_from_tenor(self, query: str) -> Optional[str]:
-        """Get a single GIF URL from Tenor v2."""
+    async def _fetch_gif_urls_from_tenor(self, query: str) -> list:
+        """Get up to GIF_RESULTS_PER_QUERY GIF URLs from Tenor v2 ([] if none; GifFetchError if Tenor failed)."""
         if not TENOR_API_KEY:
-            return None
+            return []
         params = {
             "q": query,
             "key": TENOR_API_KEY,
-            "limit": 1,
+            "limit": GIF_RESULTS_PER_QUERY,
             "media_filter": "gif",
             "random": "true",
         }
         try:
             async with self.http_session.get(TENOR_ENDPOINT, params=params, allow_redirects=True) as resp:
                 if resp.status != 200:
-                    return None
+                    raise GifFetchError(f"Tenor HTTP {resp.status}")
                 data = await resp.json(content_type=None)
+        except GifFetchError:
+            raise
         except Exception as e:
-            logger.warning("Tenor request failed: %s", e)
-            return None
+            raise GifFetchError(f"Tenor request failed: {e!r}") from e
 
+        urls = []
         try:
-            results = data.get("results") or []
-            if not results:
-                return None
-            r0 = results[0]
-            media_formats = r0.get("media_formats") or {}
-            for key in ("gif", "mediumgif", "tinygif"):
-                fmt = media_formats.get(key)
-                if fmt and "url" in fmt:
-                    return fmt["url"]
-            return r0.get("url")
+            for r in data.get("results") or []:
+                media_formats = r.get("media_formats") or {}
+                for key in ("gif", "mediumgif", "tinygif"):
+                    fmt = media_formats.get(key)
+                    if fmt and "url" in fmt:
+                        urls.append(fmt["url"])
+                        break
+                else:
+                    if r.get("url"):
+                        urls.append(r["url"])
         except Exception:
-            return None
+            pass
+        return urls
 
     async def _fetch_gif_url_fallback(self, query: str) -> Optional[str]:
-        """Fallback to your crawler page with the correct params (kw, total, api)."""
+        """Fallback to your crawler page with the correct params (kw, total, api); GifFetchError if it failed."""
         if not TENOR_API_KEY:
             return None
 
@@ -371,7 +371,7 @@ class ChatMain(commands.Cog):
         try:
             async with self.http_session.get("https://serenekeks.com/crawl.php", params=params, allow_redirects=True) as resp:
                 if resp.status != 200:
-                    return None
+                    raise GifFetchError(f"crawler HTTP {resp.status}")
                 body = (await resp.text()).strip()
                 m = URL_IN_TEXT_RE.search(body)
                 if not m:
@@ -381,8 +381,28 @@ class ChatMain(commands.Cog):
                 if classified and classified[0] == "image":
                     return candidate
                 return None
-        except Exception:
-            return None
+        except GifFetchError:
+            raise
+        except Exception as e:
+            raise GifFetchError(f"crawler request failed: {e!r}") from e
+
+    async def _fetch_gif_candidates(self, query: str) -> list:
+        """
+        Upstream lookup used on a gif_cache miss: Tenor list, else the crawler's hit.
+        Raises GifFetchError only when no source gave a real answer, so failures aren't cached as misses.
+        """
+        tenor_error = None
+        try:
+            urls = await self._fetch_gif_urls_from_tenor(query)
+        except GifFetchError as e:
+            urls, tenor_error = [], e
+        if not urls:
+            url = await self._fetch_gif_url_fallback(query)
+            if url:
+                urls = [url]
+            elif tenor_error is not None:
+                raise tenor_error
+        return urls
 
     async def _handle_gif_command(self, room_id: str, display_name: str, raw_text: str) -> bool:
         """Return True if handled. Triggers when FIRST token is 'gif' and a query follows."""
@@ -397,9 +417,7 @@ class ChatMain(commands.Cog):
         query = parts[1].strip()
         logger.info("GIF command by %s in %s | query=%r", display_name, room_id, query)
 
-        url = await self._fetch_gif_url_from_tenor(query)
-        if not url:
-            url = await self._fetch_gif_url_fallback(query)
+        url = await self.gif_cache.resolve(query, self._fetch_gif_candidates)
 
         if url:
             payload = self._build_message_payload(
@@ -467,12 +485,8 @@ class ChatMain(commands.Cog):
             logger.exception("[Serene] Unexpected error on GET request.")
             return None
 
-    async def _delayed_broadcast_serene(self, room_id: str, message: str):
-        """Apply a human-like delay before broadcasting Serene's message."""
-        try:
-            await asyncio.sleep(2.0)
-        except Exception:
-            pass
+    async def _deliver_serene(self, room_id: str, message: str):
+        """Broadcast Serene's message (the scheduler already applied the human-like delay)."""
         payload = self._build_message_payload(
             room_id=room_id,
             display_name=SERENE_DISPLAY_NAME,
@@ -482,24 +496,18 @@ class ChatMain(commands.Cog):
         )
         await self._broadcast_room_json(room_id, payload)
 
-    async def _serene_start(self, room_id: str, display_name: str):
+    def _serene_start(self, room_id: str, display_name: str) -> bool:
         logger.info("[Serene] START triggered by %s in room %s", display_name, room_id)
-        reply = await self._serene_request_get({"start": "true", "player": display_name})
-        if reply:
-            await self._delayed_broadcast_serene(room_id, reply)
+        return self.serene.submit("start", room_id, display_name, {"start": "true", "player": display_name})
 
-    async def _serene_question(self, room_id: str, display_name: str, question_raw: str):
+    def _serene_question(self, room_id: str, display_name: str, question_raw: str) -> bool:
         safe_q = html.escape(question_raw or "", quote=True)
         logger.info("[Serene] QUESTION from %s in room %s", display_name, room_id)
-        reply = await self._serene_request_get({"question": safe_q, "player": display_name})
-        if reply:
-            await self._delayed_broadcast_serene(room_id, reply)
+        return self.serene.submit("question", room_id, display_name, {"question": safe_q, "player": display_name})
 
-    async def _serene_hail(self, room_id: str, display_name: str, hail_phrase: str):
+    def _serene_hail(self, room_id: str, display_name: str, hail_phrase: str) -> bool:
         logger.info("[Serene] HAIL by %s in room %s | %r", display_name, room_id, hail_phrase)
-        reply = await self._serene_request_get({"hail": hail_phrase, "player": display_name})
-        if reply:
-            await self._delayed_broadcast_serene(room_id, reply)
+        return self.serene.submit("hail", room_id, display_name, {"hail": hail_phrase, "player": display_name})
 
     # -------------------------
     # WebSocket handler
@@ -570,46 +578,31 @@ class ChatMain(commands.Cog):
                     room_id = room_id or jd.get("room_id")
                     display_name = display_name or jd.get("displayName", "Anonymous")
 
-            # Ensure lobby bucket persists
-            self.bot.chat_ws_rooms.setdefault("lobby", set())
-
-            # Register the WebSocket to the chat room
-            if room_id not in self.bot.chat_ws_rooms:
-                self.bot.chat_ws_rooms[room_id] = set()
-            self.bot.chat_ws_rooms[room_id].add(ws)
+            # Register the WebSocket to the chat room (hub keeps 'lobby' persistent)
+            self.hub.join(ws, room_id)
             logger.info("Chat client '%s' connected to room %s.", display_name, room_id)
 
+            # Catch-up: recent chat lines as ONE batched {"type":"history"} frame
+            await self.hub.send_history(ws, room_id)
+
             ts = int(time.time())
 
             # Broadcast join + friendly system notice on first join
-            await self._broadcast_room_json(room_id, {
-                "type": "user_joined",
-                "room_id": room_id,
-                "displayName": display_name,
-                "timestamp": ts,
-            })
+            await self.hub.announce_join(room_id, display_name, ts)
             try:
                 # SPEC: first connect to lobby should say "<name> joined the lobby"
                 if str(room_id).lower() == "lobby":
-                    await self._broadcast_room_json(room_id, {
-                        "type": "system_notice",
-                        "room_id": room_id,
-                        "message": f"{display_name} joined the lobby",
-                        "timestamp": ts,
-                    })
+                    await self.hub.notice(room_id, f"{display_name} joined the lobby", ts)
                 else:
-                    await self._broadcast_room_json(room_id, {
-                        "type": "system_notice",
-                        "room_id": room_id,
-                        "message": f"{display_name} joined the game",
-                        "timestamp": ts,
-                    })
+                    await self.hub.notice(room_id, f"{display_name} joined the game", ts)
             except Exception:
                 pass
 
             # Listen for subsequent messages
-            async for msg in ws:
+            is_text = lambda m: m.type == web.WSMsgType.TEXT
+            async for msg in METRICS.timed_iter(ws, "ws_frame_seconds", when=is_text, endpoint="/chat_ws"):
                 if msg.type == web.WSMsgType.TEXT:
+                    METRICS.inc("ws_frames_total", endpoint="/chat_ws")
                     # --- Handle raw "ping" frames even if they aren't JSON ---
                     if isinstance(msg.data, str) and msg.data.strip().lower() == "ping":
                         try:
@@ -641,35 +634,8 @@ class ChatMain(commands.Cog):
                             from_name = data.get('from_name')  # optional pretty labels
                             to_name = data.get('to_name')
 
-                            # Move socket between buckets
-                            try:
-                                if old_room in self.bot.chat_ws_rooms:
-                                    self.bot.chat_ws_rooms[old_room].discard(ws)
-                                    # never delete the lobby bucket
-                                    if not self.bot.chat_ws_rooms[old_room] and str(old_room).lower() != "lobby":
-                                        del self.bot.chat_ws_rooms[old_room]
-                            except Exception:
-                                pass
-
-                            if new_room not in self.bot.chat_ws_rooms:
-                                self.bot.chat_ws_rooms[new_room] = set()
-                            self.bot.chat_ws_rooms[new_room].add(ws)
-
-                            ts_move = int(time.time())
-
-                            # Presence events
-                            await self._broadcast_room_json(old_room, {
-                                "type": "user_left",
-                                "room_id": old_room,
-                                "displayName": display_name,
-                                "timestamp": ts_move,
-                            })
-                            await self._broadcast_room_json(new_room, {
-                                "type": "user_joined",
-                                "room_id": new_room,
-                                "displayName": display_name,
-                                "timestamp": ts_move,
-                            })
+                            # Move socket + user_left/user_joined + history catch-up via hub
+                            await self.hub.rebind(ws, new_room, display_name)
 
                             # SPEC presence copy
                             await self._presence_move_messages(
@@ -691,34 +657,8 @@ class ChatMain(commands.Cog):
                         if new_room and new_room != room_id:
                             old_room = room_id
 
-                            # Move socket
-                            try:
-                                if old_room in self.bot.chat_ws_rooms:
-                                    self.bot.chat_ws_rooms[old_room].discard(ws)
-                                    if not self.bot.chat_ws_rooms[old_room] and str(old_room).lower() != "lobby":
-                                        del self.bot.chat_ws_rooms[old_room]
-                            except Exception:
-                                pass
-
-                            if new_room not in self.bot.chat_ws_rooms:
-                                self.bot.chat_ws_rooms[new_room] = set()
-                            self.bot.chat_ws_rooms[new_room].add(ws)
-
-                            ts_move = int(time.time())
-
-                            # Presence events
-                            await self._broadcast_room_json(old_room, {
-                                "type": "user_left",
-                                "room_id": old_room,
-                                "displayName": display_name,
-                                "timestamp": ts_move,
-                            })
-                            await self._broadcast_room_json(new_room, {
-                                "type": "user_joined",
-                                "room_id": new_room,
-                                "displayName": display_name,
-                                "timestamp": ts_move,
-                            })
+                            # Move socket + user_left/user_joined + history catch-up via hub
+                            await self.hub.rebind(ws, new_room, display_name)
 
                             # SPEC presence copy
                             await self._presence_move_messages(
@@ -744,15 +684,16 @@ class ChatMain(commands.Cog):
                         # Serene question flow
                         if ws in self._awaiting_serene_question:
                             self._awaiting_serene_question.discard(ws)
-                            asyncio.create_task(self._serene_question(room_id, display_name, message_text))
+                            self._serene_question(room_id, display_name, message_text)
 
                         # 'hail serene' has priority
                         m_hail = HAIL_SERENE_RE.search(lowered)
                         if m_hail:
-                            asyncio.create_task(self._serene_hail(room_id, display_name, m_hail.group(0)))
+                            self._serene_hail(room_id, display_name, m_hail.group(0))
                         elif SERENE_WORD_RE.search(lowered):
-                            self._awaiting_serene_question.add(ws)
-                            asyncio.create_task(self._serene_start(room_id, display_name))
+                            # only wait for a question if Serene actually greeted (not coalesced / rate-limited)
+                            if self._serene_start(room_id, display_name):
+                                self._awaiting_serene_question.add(ws)
 
                         # Sound trigger flow (restored original behavior)
                         parsed = self._parse_sound_command(message_text)
@@ -812,33 +753,18 @@ class ChatMain(commands.Cog):
         finally:
             # Unregister and notify others
             try:
-                if room_id and room_id in self.bot.chat_ws_rooms:
-                    if ws in self.bot.chat_ws_rooms[room_id]:
-                        self.bot.chat_ws_rooms[room_id].remove(ws)
-
-                    # Ensure no stale question flag for this socket
-                    self._awaiting_serene_question.discard(ws)
+                # Ensure no stale question flag for this socket
+                self._awaiting_serene_question.discard(ws)
 
+                left_room = self.hub.leave(ws)
+                if left_room:
                     logger.info(
                         "Chat client '%s' disconnected from room %s. Remaining: %d",
-                        display_name, room_id, len(self.bot.chat_ws_rooms.get(room_id, set()))
+                        display_name, left_room, self.hub.room_size(left_room)
                     )
 
                     # Broadcast leave message to that room
-                    await self._broadcast_room_json(room_id, {
-                        "type": "user_left",
-                        "room_id": room_id,
-                        "displayName": display_name,
-                        "timestamp": int(time.time()),
-                    })
-
-                    # Never delete the lobby bucket; other rooms can be closed
-                    if not self.bot.chat_ws_rooms[room_id] and str(room_id).lower() != "lobby":
-                        del self.bot.chat_ws_rooms[room_id]
-                        logger.info("Chat room %s is now empty and has been closed.", room_id)
-
-                # Ensure lobby key persists
-                self.bot.chat_ws_rooms.setdefault("lobby", set())
+                    await self.hub.announce_leave(left_room, display_name)
             finally:
                 return ws
 
@@ -6,11 +6,13 @@ import io
 import os # For environment variables like API keys
 import urllib.parse # For URL encoding
 import json # For parsing JSON data
-import re # Import the re module for regular expressions
 import aiohttp # For asynchronous HTTP requests
 import aiomysql # Import aiomysql for database operations
 import logging # Import logging
 
+from cogs.utils.jeopardy_bank import JEOPARDY_BANK
+from cogs.utils.answer_match import answer_key, normalize_answer
+
 # Set up logging for this module
 logger = logging.getLogger(__name__)
 
@@ -18,49 +20,6 @@ logger = logging.getLogger(__name__)
 # This dictionary will store active Jeopardy games by channel ID.
 active_jeopardy_games = {}
 
-# --- Helper for fuzzy matching (MODIFIED to use Levenshtein distance) ---
-def levenshtein_distance(s1: str, s2: str) -> int:
-    """
-    Calculates the Levenshtein distance between two strings.
-    This is the minimum number of single-character edits (insertions, deletions, or substitutions)
-    required to change one word into the other.
-    """
-    if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
-
-    if len(s2) == 0:
-        return len(s1)
-
-    # Initialize the first row of the distance matrix
-    previous_row = list(range(len(s2) + 1))
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            # Calculate costs for insertion, deletion, and substitution
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2) # Cost is 0 if characters match, 1 otherwise
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-    return previous_row[-1]
-
-def calculate_word_similarity(word1: str, word2: str) -> float:
-    """
-    Calculates a percentage of similarity between two words using Levenshtein distance.
-    A higher percentage means more similarity.
-    """
-    word1_lower = word1.lower()
-    word2_lower = word2.lower()
-
-    max_len = max(len(word1_lower), len(word2_lower))
-    if max_len == 0:
-        return 100.0 # Both empty strings are 100% similar
-
-    dist = levenshtein_distance(word1_lower, word2_lower)
-    # Similarity is calculated as (max_length - distance) / max_length
-    similarity_percentage = ((max_len - dist) / max_len) * 100.0
-    return similarity_percentage
-
 # --- Database Operations ---
 async def update_user_kekchipz(guild_id: int, discord_id: int, amount: int, db_config: dict):
     """
@@ -354,39 +313,11 @@ class CategoryValueSelect(discord.ui.Select):
                 
                 processed_user_answer = user_raw_answer[matched_prefix_len:].strip()
                 
-                correct_answer_raw_lower = question_data['answer'].lower()
-                # Remove text in parentheses from the correct answer for direct comparison
-                correct_answer_for_comparison = re.sub(r'\s*\(.*\)', '', correct_answer_raw_lower).strip()
-
-                is_correct = False
-                # Check for exact match first (after stripping prefix and parentheses from correct answer)
-                if processed_user_answer == correct_answer_for_comparison:
-                    is_correct = True
-                else:
-                    # Tokenize answers and question for word-by-word comparison
-                    # Remove punctuation from words before tokenizing
-                    user_words = set(re.findall(r'\b\w+\b', processed_user_answer))
-                    correct_words_full = set(re.findall(r'\b\w+\b', correct_answer_for_comparison))
-                    question_words = set(re.findall(r'\b\w+\b', question_data['question'].lower()))
-
-                    # Filter correct words: keep only those NOT in the question
-                    # This creates a list of 'significant' words from the correct answer
-                    significant_correct_words = [word for word in correct_words_full if word not in question_words]
-
-                    # If the user's answer is a single word and it's an exact match for a significant correct word
-                    if len(user_words) == 1 and list(user_words)[0] in significant_correct_words:
-                        is_correct = True
-                    else:
-                        # Perform fuzzy matching for each user word against significant correct words
-                        for user_word in user_words:
-                            for sig_correct_word in significant_correct_words:
-                                similarity = calculate_word_similarity(user_word, sig_correct_word)
-                                if similarity >= 70.0:
-                                    is_correct = True
-                                    break
-                            if is_correct:
-                                break
-                
+                # Normalized answer / word sets were built with the board; this is a cheap lookup
+                # plus a bounded edit distance per guessed word
+                key = answer_key(question_data)
+                is_correct = bool(key and key.matches(processed_user_answer))
+
                 # Compare the processed user answer with the correct answer
                 if is_correct:
                     game.score += game.current_wager # Use wager for score
@@ -514,9 +445,10 @@ class CategoryValueSelect(discord.ui.Select):
                             final_raw_answer = final_answer_msg.content.lower()
                             
                             processed_final_answer = final_raw_answer[len(final_determined_prefix):].strip()
-                            correct_final_answer = final_jeopardy_question['answer'].lower().strip()
-                            
-                            if processed_final_answer == correct_final_answer:
+                            final_key = answer_key(final_jeopardy_question)
+
+                            # Final Jeopardy stays strict: the whole answer, compared after normalization
+                            if final_key and final_key.exact and final_key.exact == normalize_answer(processed_final_answer):
                                 game.score += game.current_wager
                                 await interaction.channel.send(
                                     f"✅ Correct, {game.player.display_name}! Your final score is **{'-' if game.score < 0 else ''}${abs(game.score)}**."
@@ -687,7 +619,26 @@ class NewJeopardyGame:
         """Checks if all phases are complete."""
         return self.is_all_questions_guessed("normal_jeopardy") and self.is_all_questions_guessed("double_jeopardy")
 
+    def load_board(self, board: dict):
+        """Takes a board built by the local question bank (see cogs/utils/jeopardy_bank.py)."""
+        self.normal_jeopardy_data["normal_jeopardy"] = board["normal"]
+        self.double_jeopardy_data["double_data"] = board["double"]
+        self.final_jeopardy_data["final_question"] = board["final"]
+
     async def fetch_and_parse_jeopardy_data(self):
+        """
+        Sets up the board from the local question bank (usually a board that was
+        already prefetched, so this returns immediately and works offline).
+        Falls back to the remote API only when no bank is installed.
+        """
+        board = await JEOPARDY_BANK.take_board()
+        if board is not None:
+            self.load_board(board)
+            return True
+        logger.warning("No local Jeopardy bank available; falling back to the remote API")
+        return await self._fetch_remote_jeopardy_data()
+
+    async def _fetch_remote_jeopardy_data(self):
         """
         Fetches Jeopardy data from a remote API and parses it into game state.
         This function now uses aiohttp for asynchronous fetching.
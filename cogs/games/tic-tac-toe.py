@@ -1,9 +1,10 @@
 import discord
 from discord import ui
 import asyncio
-import math
 import aiomysql # Import aiomysql for database interaction
 
+from cogs.utils.tictactoe_table import best_move as table_best_move
+
 class TicTacToeButton(ui.Button):
     def __init__(self, row, col, label="⬜"):
         super().__init__(style=discord.ButtonStyle.secondary, label=label, row=row)
@@ -160,50 +161,13 @@ class TicTacToeView(ui.View):
         await interaction.edit_original_response(view=self)
 
     def best_move(self):
-        best_score = -math.inf
-        move = None
-
-        for i in range(3):
-            for j in range(3):
-                if self.board[i][j] == "":
-                    self.board[i][j] = "O"
-                    score = self.minimax(False)
-                    self.board[i][j] = ""
-                    if score > best_score:
-                        best_score = score
-                        move = (i, j)
-
+        # Every reachable position is solved once in cogs/utils/tictactoe_table.py
+        # (same minimax scores and tie-break as before), so this is a dict lookup.
+        move = table_best_move(self.board)
+        if move is None:
+            move = next((i, j) for i in range(3) for j in range(3) if self.board[i][j] == "")
         return move
 
-    def minimax(self, is_maximizing):
-        if self.check_winner("O"):
-            return 1
-        if self.check_winner("X"):
-            return -1
-        if self.is_full():
-            return 0
-
-        if is_maximizing:
-            best_score = -math.inf
-            for i in range(3):
-                for j in range(3):
-                    if self.board[i][j] == "":
-                        self.board[i][j] = "O"
-                        score = self.minimax(False)
-                        self.board[i][j] = ""
-                        best_score = max(score, best_score)
-            return best_score
-        else:
-            best_score = math.inf
-            for i in range(3):
-                for j in range(3):
-                    if self.board[i][j] == "":
-                        self.board[i][j] = "X"
-                        score = self.minimax(True)
-                        self.board[i][j] = ""
-                        best_score = min(score, best_score)
-            return best_score
-
 
 async def start(interaction: discord.Interaction, bot):
     # Prepare database configuration to pass to the TicTacToeView
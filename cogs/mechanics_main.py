@@ -2,19 +2,32 @@ import logging
 import json
 import aiomysql
 import time
+import asyncio
 from itertools import combinations
 import aiohttp
 import os
 
 from discord.ext import commands, tasks
 
-from cogs.utils.game_models import Card, Deck
+from cogs.utils.game_models import CompactDeck
+from cogs.utils.metrics import REGISTRY as METRICS
+from cogs.utils.loop_monitor import LOOP_MONITOR
+from cogs.utils.tick_profile import TICK_PROFILER
+from cogs.utils.room_config import ROOM_CONFIGS
+from cogs.utils.presence import PresenceIndex
+from cogs.utils.state_projection import ProjectionCache, project_holdem, holdem_role
+from cogs.utils.hand_log import HandLog, hand_id_for, log_event, snapshot_state, take_staged
+from cogs.utils.poker_equity import EQUITY
 
 logger = logging.getLogger(__name__)
 
 # ---------------- Presence / DC grace config ----------------
 DISCONNECT_GRACE_SECS = 10  # after this, a DC'd seated player is removed if not reconnected
 
+# ---------------- Timer loop concurrency ----------------
+TIMER_ROOM_CONCURRENCY = int(os.getenv("TIMER_ROOM_CONCURRENCY", "16"))  # rooms ticked at once
+TIMER_PASS_WAIT_SECS = 0.9  # a pass stops waiting on stragglers so the next 1s pass starts on time
+
 # ---------------- Hand Evaluation (unchanged core) ----------------
 HAND_RANKINGS = {
     "High Card": 0, "One Pair": 1, "Two Pair": 2, "Three of a Kind": 3, "Straight": 4,
@@ -100,48 +113,70 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
 
         # WS bucket (populated by bot.game_was_handler via register_ws_connection)
         if not hasattr(bot, "ws_rooms"): bot.ws_rooms = {}
+        # room -> player_id -> sockets (shared by both mechanics cogs)
+        if not hasattr(bot, "ws_presence"): bot.ws_presence = PresenceIndex()
+
+        # Encoded per-viewer state views, cached per (room, __rev, role)
+        self._projections = ProjectionCache(project_holdem, holdem_role)
+
+        # Append-only per-room hand log (seed + actions) for tools/replay_hand.py
+        self.hand_log = HandLog()
 
         # Rooms we poll for timers
         self.rooms_with_active_timers = set()
+        self._room_ticks = {}   # room_id -> in-flight tick task (a room is never ticked twice at once)
+        self._tick_slots = asyncio.Semaphore(max(1, TIMER_ROOM_CONCURRENCY))
         self.check_game_timers.start()
 
     def cog_unload(self):
         self.check_game_timers.cancel()
+        for task in list(self._room_ticks.values()):
+            task.cancel()
+        self.hand_log.stop()
 
     # ---------------- Utility helpers ----------------
     def _normalize_room_id(self, room_id: str) -> str:
         if not room_id: raise ValueError("room_id missing")
         return str(room_id).strip()
 
-    async def _load_room_config(self, room_id: str) -> dict:
-        """
-        Fetch game_mode for the room and derive min_bet.
-        """
+    async def _fetch_room_config_row(self, room_id: str) -> dict | None:
+        """Read the bot_game_rooms config columns (cache miss path)."""
         conn = None
         try:
-            conn = await aiomysql.connect(
-                host=self.db_host, user=self.db_user, password=self.db_password,
-                db=self.db_name, charset='utf8mb4', autocommit=True,
-                cursorclass=aiomysql.cursors.DictCursor
-            )
-            async with conn.cursor() as cursor:
-                await cursor.execute("SELECT game_mode, guild_id, channel_id FROM bot_game_rooms WHERE room_id = %s LIMIT 1", (room_id,))
-                row = await cursor.fetchone()
-                game_mode = str(row.get("game_mode") or "1") if row else "1"
-                min_bet = MODE_MIN_BET.get(game_mode, MODE_MIN_BET["1"])
-                guild_id = row.get("guild_id") if row else None
-                channel_id = row.get("channel_id") if row else None
-                return {"game_mode": game_mode, "min_bet": int(min_bet), "guild_id": guild_id, "channel_id": channel_id}
+            with METRICS.timer("db_seconds", source="holdem", op="room_config"):
+                conn = await aiomysql.connect(
+                    host=self.db_host, user=self.db_user, password=self.db_password,
+                    db=self.db_name, charset='utf8mb4', autocommit=True,
+                    cursorclass=aiomysql.cursors.DictCursor
+                )
+                async with conn.cursor() as cursor:
+                    await cursor.execute("SELECT game_mode, guild_id, channel_id FROM bot_game_rooms WHERE room_id = %s LIMIT 1", (room_id,))
+                    return await cursor.fetchone()
         except Exception as e:
             logger.warning(f"Failed to load game_mode for room {room_id}: {e}")
-            return {"game_mode": "1", "min_bet": MODE_MIN_BET["1"], "guild_id": None, "channel_id": None}
+            return None
         finally:
             if conn: conn.close()
 
+    async def _load_room_config(self, room_id: str) -> dict:
+        """
+        Fetch game_mode for the room (shared ROOM_CONFIGS cache) and derive min_bet.
+        """
+        row = await ROOM_CONFIGS.get(room_id, self._fetch_room_config_row)
+        game_mode = str(row.get("game_mode") or "1") if row else "1"
+        min_bet = MODE_MIN_BET.get(game_mode, MODE_MIN_BET["1"])
+        guild_id = row.get("guild_id") if row else None
+        channel_id = row.get("channel_id") if row else None
+        return {"game_mode": game_mode, "min_bet": int(min_bet), "guild_id": guild_id, "channel_id": channel_id}
+
     def register_ws_connection(self, ws, room_id: str):
         rid = self._normalize_room_id(room_id)
         self.bot.ws_rooms.setdefault(rid, set()).add(ws)
         setattr(ws, "_assigned_room", rid)
+        # presence index: remember the exact key so unregister removes the same entry
+        pid = str(getattr(ws, "_player_id", "") or "")
+        setattr(ws, "_presence_key", (rid, pid))
+        self.bot.ws_presence.add(rid, pid, ws)
         return True
 
     def unregister_ws_connection(self, ws):
@@ -150,22 +185,21 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
             self.bot.ws_rooms[room].discard(ws)
             if not self.bot.ws_rooms[room]:
                 del self.bot.ws_rooms[room]
+        key = getattr(ws, "_presence_key", None)
+        if key:
+            self.bot.ws_presence.remove(key[0], key[1], ws)
 
     # ---- NEW: presence tagging helpers ----
     def _is_ws_connected(self, room_id: str, player_id: str) -> bool:
         """
         Returns True if we see a live WS in the room tagged with this player_id.
-        Requires bot.py to set ws._player_id = <sender_id> on /game_was handshake.
+        Requires bot.py to set ws._player_id = <sender_id> on /game_was handshake
+        (before register_ws_connection, which indexes it in bot.ws_presence).
         """
         try:
-            for ws in list(self.bot.ws_rooms.get(str(room_id), set())):
-                if getattr(ws, "closed", False):
-                    continue
-                if str(getattr(ws, "_player_id", "")) == str(player_id):
-                    return True
+            return self.bot.ws_presence.is_connected(room_id, player_id)
         except Exception:
-            pass
-        return False
+            return False
 
     # ---------------- Connection hooks (now implemented) ----------------
     async def player_connect(self, room_id: str, discord_id: str):
@@ -240,6 +274,7 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
 
     async def _load_game_state(self, room_id: str) -> dict | None:
         conn = None
+        t0 = time.perf_counter()
         try:
             conn = await self._get_db_connection()
             async with conn.cursor() as cursor:
@@ -252,11 +287,16 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
                         logger.warning(f"Bad JSON game_state for room {room_id}, resetting.")
                         return None
                 return None
+        except Exception:
+            METRICS.inc("db_errors_total", source="holdem", op="load_state")
+            raise
         finally:
             if conn: conn.close()
+            METRICS.observe("db_seconds", time.perf_counter() - t0, source="holdem", op="load_state")
 
     async def _save_game_state(self, room_id: str, state: dict):
         conn = None
+        t0 = time.perf_counter()
         try:
             conn = await self._get_db_connection()
             async with conn.cursor() as cursor:
@@ -270,10 +310,12 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
             logger.info(f"Saved state for room '{room_id}'")
         except Exception as e:
             if conn: await conn.rollback()
+            METRICS.inc("db_errors_total", source="holdem", op="save_state")
             logger.error(f"DB save error for room '{room_id}': {e}", exc_info=True)
             raise
         finally:
             if conn: conn.close()
+            METRICS.observe("db_seconds", time.perf_counter() - t0, source="holdem", op="save_state")
 
     # -------- NEW: optimistic save guard (prevents stale overwrites) --------
     async def _save_if_current(self, room_id: str, state: dict, expected_rev: int) -> bool:
@@ -281,7 +323,9 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         Save only if the DB's current __rev matches the expected_rev that we loaded.
         Prevents a timer tick snapshot from overwriting a concurrent player_sit (and vice versa).
         Returns True iff save occurred.
+        Hand-log events staged on the state are written only when the save happens.
         """
+        staged = take_staged(state)
         try:
             current = await self._load_game_state(room_id)
         except Exception as e:
@@ -294,6 +338,7 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
             return False
 
         await self._save_game_state(room_id, state)
+        self.hand_log.commit(room_id, staged)
         return True
 
     # ---------------- Partitioned broadcast helpers ----------------
@@ -310,16 +355,16 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
     async def _broadcast_state(self, room_id: str, state: dict):
         bucket = self.bot.ws_rooms.get(room_id, set())
         if not bucket: return
-        envelope = {
-            "type": "state",
-            "game_state": state,
-            "room_id": room_id,
-            "server_ts": int(time.time()),
-        }
-        msg = json.dumps(envelope)
-        for ws in list(bucket):
-            try: await ws.send_str(msg)
-            except: self.unregister_ws_connection(ws)
+        # Per-viewer projection: deck stripped, hidden cards masked; each view encoded once
+        METRICS.inc("broadcast_recipients_total", len(bucket), kind="holdem_state")
+        with METRICS.timer("broadcast_seconds", kind="holdem_state"):
+            for ws in list(bucket):
+                try: await ws.send_str(self._encode_state_envelope(room_id, state, getattr(ws, "_player_id", None)))
+                except: self.unregister_ws_connection(ws)
+
+    def _encode_state_envelope(self, room_id: str, state: dict, viewer_id=None) -> str:
+        """{"type":"state",...} frame as this viewer may see it (also used for the join snapshot)."""
+        return self._projections.envelope(room_id, state, viewer_id)
 
     def _build_ui_hint_for_current_bettor(self, state: dict) -> dict:
         actor = state.get("current_bettor")
@@ -343,6 +388,40 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
             "current_bet": int(current_bet),
         }
 
+    async def _send_equity_hint(self, room_id: str, sender_id):
+        """
+        {"type":"equity",...} to the sender's own sockets: their win / tie odds
+        against the dealer and the other live hands, from what they can see
+        (own hole cards + board). Cached per street in cogs/utils/poker_equity.py.
+        """
+        sender_id = str(sender_id or "")
+        sockets = self.bot.ws_presence.sockets(room_id, sender_id)
+        if not sockets:
+            return
+        payload = {"type": "equity", "room_id": room_id, "discord_id": sender_id}
+        try:
+            state = await self._load_game_state(room_id)
+            p = self._find_player(state, sender_id) if state else None
+            if not p or not p.get("in_hand") or p.get("is_folded") or len(p.get("hand") or []) < 2:
+                payload["error"] = "not_in_hand"
+            else:
+                opponents = len([o for o in self._active_players(state) if str(o.get("discord_id")) != sender_id])
+                result = await EQUITY.estimate(p.get("hand"), state.get("board_cards") or [], opponents)
+                if result is None:
+                    payload["error"] = "unreadable_cards"
+                else:
+                    payload.update(result)
+                    payload["opponents"] = opponents
+                    payload["current_round"] = state.get("current_round")
+                    payload["__rev"] = state.get("__rev", 0)
+        except Exception as e:
+            logger.error(f"Equity hint failed for {sender_id} in room {room_id}: {e}", exc_info=True)
+            payload["error"] = "internal"
+        msg = json.dumps(payload)
+        for ws in sockets:
+            try: await ws.send_str(msg)
+            except: self.unregister_ws_connection(ws)
+
     async def _broadcast_tick(self, room_id: str, state: dict):
         bucket = self.bot.ws_rooms.get(room_id, set())
         if not bucket: return
@@ -361,9 +440,11 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
             "ui_for_current_bettor": self._build_ui_hint_for_current_bettor(state),
         }
         msg = json.dumps(payload)
-        for ws in list(bucket):
-            try: await ws.send_str(msg)
-            except: self.unregister_ws_connection(ws)
+        METRICS.inc("broadcast_recipients_total", len(bucket), kind="holdem_tick")
+        with METRICS.timer("broadcast_seconds", kind="holdem_tick"):
+            for ws in list(bucket):
+                try: await ws.send_str(msg)
+                except: self.unregister_ws_connection(ws)
 
     def _add_room_active(self, room_id: str):
         rid = self._normalize_room_id(room_id)
@@ -377,7 +458,6 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         state.setdefault("pot", 0)
         state.setdefault("board_cards", [])
         state.setdefault("dealer_hand", [])
-        state.setdefault("deck", [])
         state.setdefault("round_timer_start", None)
         state.setdefault("round_timer_secs", None)
         state.setdefault("action_deadline_epoch", None)
@@ -526,7 +606,8 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         state["current_round"] = "pre-game"
         state["board_cards"] = []
         state["dealer_hand"] = []
-        state["deck"] = []
+        CompactDeck.clear(state)
+        state.pop("hand_id", None)
         state["pot"] = 0
 
         # reset timers & betting pointers
@@ -585,14 +666,13 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
 
     # ---------------- Dealing & phase transitions ----------------
     def _deal_from_deck(self, state: dict, n: int):
-        deck = Deck(cards_data=state["deck"]) if state.get("deck") else Deck()
-        if not state.get("deck"):
-            deck.shuffle()
+        # compact sidecar (seed + cursor); a fresh shuffle only if the hand has none
+        deck = CompactDeck.from_state(state) or CompactDeck.new()
         out = []
         for _ in range(n):
-            c = deck.deal_card()
-            if c: out.append(c.to_output_format())
-        state["deck"] = deck.to_output_format()
+            code = deck.deal_code()
+            if code: out.append(code)
+        deck.to_state(state)
         return out
 
     def _new_hand_reset_player_flags(self, state: dict):
@@ -606,12 +686,14 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
             # NEW: track full-hand contribution for side pots
             p["total_contributed"] = 0
 
-    async def _to_pre_flop(self, state: dict):
+    async def _to_pre_flop(self, state: dict, seed: str | None = None):
+        """Start a hand. seed is only passed by the replay tool; live hands draw a fresh CSPRNG seed."""
         logger.info(f"Transition -> pre_flop for room '{state.get('room_id')}'")
+        before = snapshot_state(state)
         state["last_evaluation"] = None
 
-        deck = Deck(); deck.shuffle()
-        state["deck"] = deck.to_output_format()
+        deck = CompactDeck(seed=seed) if seed else CompactDeck.new()
+        state["hand_id"] = hand_id_for(deck.seed)
         state["board_cards"] = []
         state["dealer_hand"] = []
         state["pot"] = 0
@@ -621,14 +703,15 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         # Deal 2 to each eligible player and 2 to dealer
         for p in self._seated_players_in_hand(state):
             if not p.get("is_spectating"):
-                p["hand"] = [deck.deal_card().to_output_format(), deck.deal_card().to_output_format()]
-        state["dealer_hand"] = [deck.deal_card().to_output_format(), deck.deal_card().to_output_format()]
-        state["deck"] = deck.to_output_format()
+                p["hand"] = [deck.deal_code(), deck.deal_code()]
+        state["dealer_hand"] = [deck.deal_code(), deck.deal_code()]
+        deck.to_state(state)
 
         state["current_round"] = "pre_flop"
         self._ensure_betting_defaults(state)
         self._build_action_order(state)
         self._mark_dirty(state)
+        log_event(state, "hand_start", seed=deck.seed, table=before)
 
     async def _to_flop(self, state: dict):
         new_cards = self._deal_from_deck(state, 3)
@@ -734,6 +817,7 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         # Safety: if missing critical cards, emit empty winners payload
         if len(board_eval) < 3 or len(dealer_eval_cards) < 2:
             state["last_evaluation"] = {"evaluations": [], "dealer_evaluation": None, "winner_lines": []}
+            log_event(state, "showdown", board=list(state.get("board_cards") or []), payouts={})
             self._start_phase_timer(state, POST_SHOWDOWN_WAIT_SECS)
             self._mark_dirty(state)
             return
@@ -777,10 +861,12 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         # -------- Side pots & payouts --------
         pots = self._build_side_pots(state)
         payouts: dict[str, int] = {}
+        # Seat order, so the odd chip of a split always goes to the same player (replayable)
+        seat_of = {str(p.get("discord_id")): self._seat_num(p) for p in state.get("players", [])}
 
         for pot in pots:
             amount = int(pot["amount"])
-            eligible = list(pot["eligible"])
+            eligible = sorted(pot["eligible"], key=lambda pid: (seat_of.get(pid, 9999), pid))
             if amount <= 0 or not eligible:
                 continue
 
@@ -845,6 +931,9 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         except Exception as e:
             logger.error(f"Payout failure at showdown: {e}", exc_info=True)
 
+        log_event(state, "showdown", board=list(state.get("board_cards") or []),
+                  payouts={pid: int(amt) for pid, amt in payouts.items()})
+
         # Start visible timer before moving to post_showdown
         self._start_phase_timer(state, POST_SHOWDOWN_WAIT_SECS)
         self._mark_dirty(state)
@@ -930,6 +1019,7 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         # Remove from table
         state['players'] = [q for q in state['players'] if str(q.get('discord_id')) != pid]
         self._mark_dirty(state)
+        log_event(state, "leave", seat=p.get("seat_id"), pid=pid)
 
         # Force pre-game if no seats
         self._force_pre_game_if_empty_seats(state)
@@ -1039,12 +1129,32 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         if not self.rooms_with_active_timers:
             return
 
+        t_pass = time.perf_counter()
+        started = []
         for room_id in list(self.rooms_with_active_timers):
             rid = self._normalize_room_id(room_id)
+            if rid in self._room_ticks:
+                continue  # still running from an earlier pass; skip rather than overlap
+            task = asyncio.create_task(self._tick_room(rid))
+            self._room_ticks[rid] = task
+            task.add_done_callback(lambda _t, rid=rid: self._room_ticks.pop(rid, None))
+            started.append(task)
+
+        if started:
+            # one stuck table must not hold every other table's countdown
+            await asyncio.wait(started, timeout=TIMER_PASS_WAIT_SECS)
+        TICK_PROFILER.end_pass("holdem", time.perf_counter() - t_pass, len(started))
+
+    async def _tick_room(self, rid: str):
+        """One room's timer pass; failures are contained to this room."""
+        async with self._tick_slots:
+            t_tick = time.perf_counter()
+            loop_tag = LOOP_MONITOR.tag(source="holdem_timer", room=rid)
+            prof = TICK_PROFILER.begin("holdem", rid)
             try:
                 state = await self._load_game_state(rid)
                 if not state:
-                    continue
+                    return
 
                 self._ensure_defaults(state)
                 self._ensure_betting_defaults(state)
@@ -1059,14 +1169,20 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
 
                 # Capture the revision we loaded to protect our saves below
                 before_rev = int(state.get("__rev") or 0)
+                prof.round = state.get("current_round")
+                prof.mark("load")
 
                 # If no one is seated, force pre_game (debounced) and skip further processing
                 if self._force_pre_game_if_empty_seats(state):
+                    prof.mark("transition")
                     # Only persist if DB still at the revision we loaded
-                    if await self._save_if_current(rid, state, before_rev):
+                    saved = await self._save_if_current(rid, state, before_rev)
+                    prof.mark("save")
+                    if saved:
                         await self._broadcast_state(rid, state)
+                        prof.mark("broadcast")
                     self._add_room_active(rid)
-                    continue
+                    return
 
                 # --- NEW: Authoritative DC reap path (based on WS and _dc_since) ---
                 changed_dc, need_advance_dc = self._reap_players_with_dead_ws(state, rid)
@@ -1077,6 +1193,7 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
                 changed_pd, need_advance_pd = self._reap_pending_disconnects(state, rid)
                 if need_advance_pd and state.get("current_round") in BETTING_ROUNDS:
                     await self._finish_betting_round_and_advance(state)
+                prof.mark("reap")
 
                 phase = state.get("current_round", "pre-game")
 
@@ -1089,20 +1206,11 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
                 # Betting rounds: enforce per-player auto timer
                 elif phase in BETTING_ROUNDS:
                     if not state.get("current_bettor"):
+                        log_event(state, "advance")
                         await self._finish_betting_round_and_advance(state)
                     else:
                         if self._action_timer_expired(state):
-                            pid = state["current_bettor"]
-                            for p in state["players"]:
-                                if str(p.get("discord_id")) == str(pid):
-                                    p["is_folded"] = True
-                                    p["in_hand"] = False
-                                    self._mark_dirty(state)
-                                    break
-                            if self._active_player_count(state) == 0:
-                                await self._finish_betting_round_and_advance(state)
-                            else:
-                                self._advance_bettor_pointer(state)
+                            await self._auto_fold_current_bettor(state)
 
                 elif phase == "showdown":
                     if self._timer_expired(state):
@@ -1112,22 +1220,46 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
                     if self._timer_expired(state):
                         await self._to_pre_flop(state)
 
+                prof.mark("transition")
+
                 # Persist/broadcast only if structurally changed
                 after_rev = int(state.get("__rev") or 0)
                 changed = (after_rev != before_rev)
 
                 if changed:
-                    if await self._save_if_current(rid, state, before_rev):
+                    saved = await self._save_if_current(rid, state, before_rev)
+                    prof.mark("save")
+                    if saved:
                         await self._broadcast_state(rid, state)
                 else:
                     if self._has_timers(state):
                         await self._broadcast_tick(rid, state)
+                prof.mark("broadcast")
 
                 self._add_room_active(rid)
 
             except Exception as e:
                 logger.error(f"[TIMER TASK] Error checking room '{rid}': {e}", exc_info=True)
                 self.rooms_with_active_timers.discard(rid)
+            finally:
+                METRICS.observe("game_tick_seconds", time.perf_counter() - t_tick, game="holdem", room=rid)
+                TICK_PROFILER.end(prof)
+                LOOP_MONITOR.untag(loop_tag)
+
+    async def _auto_fold_current_bettor(self, state: dict):
+        """Action timer ran out: fold the current bettor and move the hand on."""
+        pid = state["current_bettor"]
+        for p in state["players"]:
+            if str(p.get("discord_id")) == str(pid):
+                p["is_folded"] = True
+                p["in_hand"] = False
+                self._mark_dirty(state)
+                log_event(state, "action", seat=p.get("seat_id"), pid=str(pid), action="fold", auto=True)
+                break
+        if self._active_player_count(state) == 0:
+            await self._finish_betting_round_and_advance(state)
+        else:
+            self._advance_bettor_pointer(state)
 
     @check_game_timers.before_loop
     async def before_check_game_timers(self):
@@ -1138,6 +1270,11 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
         action = data.get('action')
         room_id = self._normalize_room_id(data.get('room_id'))
 
+        if action == 'equity_hint':
+            # read-only and private to the sender: no save, no broadcast, no timer activity
+            await self._send_equity_hint(room_id, data.get('sender_id'))
+            return
+
         try:
             state = await self._load_game_state(room_id)
             if state is None:
@@ -1160,8 +1297,10 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
             # Capture the revision we loaded so our save is optimistic
             before_rev = int(state.get("__rev") or 0)
 
-            state['guild_id'] = state.get('guild_id') or data.get('guild_id')
-            state['channel_id'] = state.get('channel_id') or data.get('channel_id')
+            for key in ('guild_id', 'channel_id'):
+                if not state.get(key) and data.get(key):
+                    state[key] = data[key]
+                    self._mark_dirty(state)
 
             # If anyone interacts and pre-game countdown already elapsed, jump to pre-flop
             t0 = state.get('pre_flop_timer_start_time')
@@ -1169,149 +1308,164 @@ class MechanicsMain(commands.Cog, name="MechanicsMain"):
                 await self._to_pre_flop(state)
                 self._add_room_active(room_id)
 
-            if action == 'player_sit':
-                pdata = data.get('player_data', {})
-                seat_id = pdata.get('seat_id')
-                player_id = str(pdata.get('discord_id') or data.get('sender_id'))
-                if seat_id and player_id:
-                    if any(str(p.get('discord_id')) == player_id for p in state['players']):
-                        pass
-                    elif any(str(p.get('seat_id')) == str(seat_id) for p in state['players']):
-                        pass
-                    else:
-                        is_mid_hand = state.get('current_round') not in ('pre-game', 'post_showdown')
-                        state['players'].append({
-                            'discord_id': player_id,
-                            'name': pdata.get('name', 'Player'),
-                            'seat_id': seat_id,
-                            'avatar_url': pdata.get('avatar_url'),
-                            'total_chips': 1000,
-                            'hand': [],
-                            'bet': 0,
-                            'is_folded': False,
-                            'is_spectating': bool(is_mid_hand),
-                            'in_hand': not bool(is_mid_hand),
-                            'total_contributed': 0,  # NEW
-                            'connected': True,       # assume connected on sit
-                        })
-                        # remove any stale dc stamps
-                        try:
-                            state['players'][-1].pop('_dc_since', None)
-                        except Exception:
-                            pass
-                        self._mark_dirty(state)
-
-                        # First eligible sitter: start pre-game countdown
-                        if len([p for p in state['players'] if not p.get('is_spectating')]) == 1 \
-                            and state['current_round'] == 'pre-game' and not state.get('initial_countdown_triggered'):
-                            state['pre_flop_timer_start_time'] = time.time()
-                            state['initial_countdown_triggered'] = True
-                            self._add_room_active(room_id)
-                            self._mark_dirty(state)
-                            logger.info(f"First player sat. Room '{room_id}' added to active timer checks.")
-
-            elif action == 'player_leave':
-                player_id = str(data.get('sender_id') or data.get('discord_id'))
-                # Use the centralized helper so bettors/phase adjust consistently
-                outcome = self._remove_player_by_id(state, player_id)
-                if outcome == "advance_phase" and state.get("current_round") in BETTING_ROUNDS:
-                    await self._finish_betting_round_and_advance(state)
-
-                self._add_room_active(room_id)
+            if not await self._apply_action(room_id, state, data):
+                return
 
-            elif action == 'fold':
-                player_id = str(data.get('sender_id') or data.get('discord_id'))
-                p = self._find_player(state, player_id)
-                if p and p.get('in_hand') and not p.get('is_spectating') and state.get('current_round') in BETTING_ROUNDS:
-                    if state.get("current_bettor") == player_id:
-                        p['is_folded'] = True
-                        p['in_hand'] = False
-                        self._mark_dirty(state)
-                        if self._active_player_count(state) == 0:
-                            await self._finish_betting_round_and_advance(state)
-                        else:
-                            self._advance_bettor_pointer(state)
+            after_rev = int(state.get("__rev") or 0)
+            if after_rev != before_rev:
+                if await self._save_if_current(room_id, state, before_rev):
+                    await self._broadcast_state(room_id, state)
 
-                self._add_room_active(room_id)
+        except Exception as e:
+            logger.error(f"Error in handle_websocket_game_action ('{action}'): {e}", exc_info=True)
 
-            elif action == 'player_action':
-                move = (data.get("move") or "").lower()
-                actor = str(data.get("sender_id") or data.get("discord_id"))
-                phase = state.get("current_round")
-
-                if phase in BETTING_ROUNDS and state.get("current_bettor") == actor:
-                    p = self._find_player(state, actor)
-                    if p and self._eligible_for_action(p):
-                        min_bet = self._room_min_bet(state)
-                        current_bet = int(state.get("current_bet") or 0)
-                        p_bet = int(p.get("bet") or 0)
-                        amount = int(data.get("amount") or 0)  # NEW chips the actor already withdrew client-side
-
-                        if move == "check":
-                            if self._can_check(state, p):
-                                pass
-                            else:
-                                logger.debug("Illegal CHECK attempted; requires call.")
-                                return
-
-                        elif move == "call":
-                            needed = max(0, current_bet - p_bet)
-                            if needed > 0:
-                                if amount < needed:
-                                    logger.debug("Insufficient CALL contribution; ignoring.")
-                                    return
-                                self._apply_contribution(state, p, needed)
-
-                        elif move == "bet":
-                            if not self._can_bet(state, amount):
-                                logger.debug("Illegal BET (either bet exists or below min).")
-                                return
-                            self._apply_contribution(state, p, amount)
-                            state["current_bet"] = int(p.get("bet") or 0)
-
-                        elif move == "raise":
-                            delta = amount
-                            if not self._can_raise(state, p, delta):
-                                logger.debug("Illegal RAISE (below min raise or no bet to raise).")
-                                return
-                            self._apply_contribution(state, p, delta)
-                            state["current_bet"] = int(p.get("bet") or 0)
-
-                        elif move == "fold":
-                            p["is_folded"] = True
-                            p["in_hand"] = False
-
-                        if self._active_player_count(state) == 0:
-                            await self._finish_betting_round_and_advance(state)
-                        else:
-                            self._advance_bettor_pointer(state)
+    async def _apply_action(self, room_id: str, state: dict, data: dict) -> bool:
+        """
+        Apply one client action to an already-loaded state.
+        Returns False when the action was rejected or empty (nothing to save).
+        Shared by handle_websocket_game_action and tools/replay_hand.py.
+        """
+        action = data.get('action')
+        if action == 'player_sit':
+            pdata = data.get('player_data', {})
+            seat_id = pdata.get('seat_id')
+            player_id = str(pdata.get('discord_id') or data.get('sender_id'))
+            if seat_id and player_id:
+                if any(str(p.get('discord_id')) == player_id for p in state['players']):
+                    pass
+                elif any(str(p.get('seat_id')) == str(seat_id) for p in state['players']):
+                    pass
+                else:
+                    is_mid_hand = state.get('current_round') not in ('pre-game', 'post_showdown')
+                    state['players'].append({
+                        'discord_id': player_id,
+                        'name': pdata.get('name', 'Player'),
+                        'seat_id': seat_id,
+                        'avatar_url': pdata.get('avatar_url'),
+                        'total_chips': 1000,
+                        'hand': [],
+                        'bet': 0,
+                        'is_folded': False,
+                        'is_spectating': bool(is_mid_hand),
+                        'in_hand': not bool(is_mid_hand),
+                        'total_contributed': 0,  # NEW
+                        'connected': True,       # assume connected on sit
+                    })
+                    # remove any stale dc stamps
+                    try:
+                        state['players'][-1].pop('_dc_since', None)
+                    except Exception:
+                        pass
+                    self._mark_dirty(state)
 
+                    # First eligible sitter: start pre-game countdown
+                    if len([p for p in state['players'] if not p.get('is_spectating')]) == 1 \
+                        and state['current_round'] == 'pre-game' and not state.get('initial_countdown_triggered'):
+                        state['pre_flop_timer_start_time'] = time.time()
+                        state['initial_countdown_triggered'] = True
+                        self._add_room_active(room_id)
                         self._mark_dirty(state)
+                        logger.info(f"First player sat. Room '{room_id}' added to active timer checks.")
+
+        elif action == 'player_leave':
+            player_id = str(data.get('sender_id') or data.get('discord_id'))
+            # Use the centralized helper so bettors/phase adjust consistently
+            outcome = self._remove_player_by_id(state, player_id)
+            if outcome == "advance_phase" and state.get("current_round") in BETTING_ROUNDS:
+                await self._finish_betting_round_and_advance(state)
+
+            self._add_room_active(room_id)
+
+        elif action == 'fold':
+            player_id = str(data.get('sender_id') or data.get('discord_id'))
+            p = self._find_player(state, player_id)
+            if p and p.get('in_hand') and not p.get('is_spectating') and state.get('current_round') in BETTING_ROUNDS:
+                if state.get("current_bettor") == player_id:
+                    p['is_folded'] = True
+                    p['in_hand'] = False
+                    self._mark_dirty(state)
+                    log_event(state, "action", seat=p.get("seat_id"), pid=player_id, action="fold")
+                    if self._active_player_count(state) == 0:
+                        await self._finish_betting_round_and_advance(state)
+                    else:
+                        self._advance_bettor_pointer(state)
 
-                self._add_room_active(room_id)
+            self._add_room_active(room_id)
 
-            elif action == 'advance_phase':
-                phase = state.get('current_round')
-                if phase == 'pre_flop':       await self._to_flop(state)
-                elif phase == 'pre_turn':     await self._to_turn(state)
-                elif phase == 'pre_river':    await self._to_river(state)
-                elif phase == 'pre_showdown': await self._to_showdown(state)
-                elif phase == 'showdown':     await self._to_post_showdown(state)
-                elif phase == 'post_showdown':await self._to_pre_flop(state)
-                self._add_room_active(room_id)
+        elif action == 'player_action':
+            move = (data.get("move") or "").lower()
+            actor = str(data.get("sender_id") or data.get("discord_id"))
+            phase = state.get("current_round")
 
-            elif action is not None:
-                self._add_room_active(room_id)
-            else:
-                return
+            if phase in BETTING_ROUNDS and state.get("current_bettor") == actor:
+                p = self._find_player(state, actor)
+                if p and self._eligible_for_action(p):
+                    min_bet = self._room_min_bet(state)
+                    current_bet = int(state.get("current_bet") or 0)
+                    p_bet = int(p.get("bet") or 0)
+                    amount = int(data.get("amount") or 0)  # NEW chips the actor already withdrew client-side
 
-            after_rev = int(state.get("__rev") or 0)
-            if after_rev != before_rev:
-                if await self._save_if_current(room_id, state, before_rev):
-                    await self._broadcast_state(room_id, state)
+                    if move == "check":
+                        if self._can_check(state, p):
+                            pass
+                        else:
+                            logger.debug("Illegal CHECK attempted; requires call.")
+                            return False
+
+                    elif move == "call":
+                        needed = max(0, current_bet - p_bet)
+                        if needed > 0:
+                            if amount < needed:
+                                logger.debug("Insufficient CALL contribution; ignoring.")
+                                return False
+                            self._apply_contribution(state, p, needed)
+
+                    elif move == "bet":
+                        if not self._can_bet(state, amount):
+                            logger.debug("Illegal BET (either bet exists or below min).")
+                            return False
+                        self._apply_contribution(state, p, amount)
+                        state["current_bet"] = int(p.get("bet") or 0)
+
+                    elif move == "raise":
+                        delta = amount
+                        if not self._can_raise(state, p, delta):
+                            logger.debug("Illegal RAISE (below min raise or no bet to raise).")
+                            return False
+                        self._apply_contribution(state, p, delta)
+                        state["current_bet"] = int(p.get("bet") or 0)
+
+                    elif move == "fold":
+                        p["is_folded"] = True
+                        p["in_hand"] = False
+
+                    log_event(state, "action", seat=p.get("seat_id"), pid=actor,
+                              action="player_action", move=move, amount=amount)
+                    if self._active_player_count(state) == 0:
+                        await self._finish_betting_round_and_advance(state)
+                    else:
+                        self._advance_bettor_pointer(state)
 
-        except Exception as e:
-            logger.error(f"Error in handle_websocket_game_action ('{action}'): {e}", exc_info=True)
+                    self._mark_dirty(state)
+
+            self._add_room_active(room_id)
+
+        elif action == 'advance_phase':
+            phase = state.get('current_round')
+            log_event(state, "action", action="advance_phase", phase=phase)
+            if phase == 'pre_flop':       await self._to_flop(state)
+            elif phase == 'pre_turn':     await self._to_turn(state)
+            elif phase == 'pre_river':    await self._to_river(state)
+            elif phase == 'pre_showdown': await self._to_showdown(state)
+            elif phase == 'showdown':     await self._to_post_showdown(state)
+            elif phase == 'post_showdown':await self._to_pre_flop(state)
+            self._add_room_active(room_id)
+
+        elif action is not None:
+            self._add_room_active(room_id)
+        else:
+            return False
+        return True
 
     # ---------------- Payouts ----------------
     async def _execute_payouts(self, state: dict):
@@ -2,19 +2,35 @@ import logging
 import json
 import aiomysql
 import time
+import asyncio
 import aiohttp
 import os
 from typing import List, Tuple, Optional
 
 from discord.ext import commands, tasks
 
-from cogs.utils.game_models import Card, Deck
+from cogs.utils.game_models import CompactDeck, Shoe
+from cogs.utils.metrics import REGISTRY as METRICS
+from cogs.utils.loop_monitor import LOOP_MONITOR
+from cogs.utils.tick_profile import TICK_PROFILER
+from cogs.utils.room_config import ROOM_CONFIGS
+from cogs.utils.presence import PresenceIndex
+from cogs.utils.state_projection import ProjectionCache, project_blackjack, blackjack_role
+from cogs.utils.bj_strategy import table_for_bet
 
 logger = logging.getLogger(__name__)
 
 # ---------------- Presence / DC grace config ----------------
 DISCONNECT_GRACE_SECS = 10  # after this, a DC'd seated player is removed if not reconnected
 
+# ---------------- Timer loop concurrency ----------------
+TIMER_ROOM_CONCURRENCY = int(os.getenv("TIMER_ROOM_CONCURRENCY", "16"))  # rooms ticked at once
+TIMER_PASS_WAIT_SECS = 0.9  # a pass stops waiting on stragglers so the next 1s pass starts on time
+
+# ---------------- Shoe ----------------
+BJ_SHOE_DECKS = int(os.getenv("BJ_SHOE_DECKS", "6"))
+BJ_SHOE_PENETRATION = float(os.getenv("BJ_SHOE_PENETRATION", "0.75"))  # cut card position, share of the shoe
+
 # ---------------- Game / Round Names (Blackjack) ----------------
 PHASE_PRE_GAME    = "pre-game"
 PHASE_BETTING     = "betting"
@@ -99,8 +115,9 @@ def safe_int(x, default=0):
     try: return int(x)
     except: return default
 
-# ---------------- Card-code hygiene (NO BACKEND HIDING) ----------------
-# The client controls visibility. We *always* transmit real codes.
+# ---------------- Card-code hygiene (NO PLACEHOLDERS IN STORED STATE) ----------------
+# Persisted state *always* holds real codes; masking happens only in the
+# broadcast projection (cogs/utils/state_projection.py).
 VALID_SUITS = {"S","H","D","C"}
 
 def _normalize_code(rank: str, suit: str) -> Optional[dict]:
@@ -173,8 +190,9 @@ def _sanitize_cards_list(cards: Optional[List[object]]) -> List[dict]:
 class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
     """
     Blackjack mechanics to be used behind the blackjack_ws websocket.
-    IMPORTANT: The server NEVER hides cards. It always sends real codes/dicts.
-               The client (gamebj.php) decides what to render face-up/back.
+    IMPORTANT: Stored state always holds real codes/dicts (see sanitizers below).
+               Broadcasts go through a projection that drops the deck and sends the
+               dealer's hole card as a face-down placeholder until the dealer plays.
     """
     def __init__(self, bot):
         self.bot = bot
@@ -188,13 +206,25 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
 
         # WS bucket (populated by bot.blackjack_ws_handler via register_ws_connection)
         if not hasattr(bot, "ws_rooms"): bot.ws_rooms = {}
+        # room -> player_id -> sockets (shared by both mechanics cogs)
+        if not hasattr(bot, "ws_presence"): bot.ws_presence = PresenceIndex()
+
+        # Encoded per-viewer state views, cached per (room, __rev, role)
+        self._projections = ProjectionCache(
+            lambda st, role: project_blackjack(st, role, upcard_total=lambda cards: bj_total(cards)[0]),
+            blackjack_role,
+        )
 
         # Rooms we poll for timers
         self.rooms_with_active_timers = set()
+        self._room_ticks = {}   # room_id -> in-flight tick task (a room is never ticked twice at once)
+        self._tick_slots = asyncio.Semaphore(max(1, TIMER_ROOM_CONCURRENCY))
         self.check_game_timers.start()
 
     def cog_unload(self):
         self.check_game_timers.cancel()
+        for task in list(self._room_ticks.values()):
+            task.cancel()
 
     # ---------------- Utility helpers ----------------
     def _normalize_room_id(self, room_id: str) -> str:
@@ -208,38 +238,42 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             cursorclass=aiomysql.cursors.DictCursor
         )
 
-    async def _load_room_config(self, room_id: str) -> dict:
+    async def _fetch_room_config_row(self, room_id: str) -> Optional[dict]:
+        """Read the bot_game_rooms config columns (cache miss path)."""
+        conn = None
         try:
-            conn = await aiomysql.connect(
-                host=self.db_host, user=self.db_user, password=self.db_password,
-                db=self.db_name, charset='utf8mb4', autocommit=True,
-                cursorclass=aiomysql.cursors.DictCursor
-            )
-            async with conn.cursor() as cursor:
-                await cursor.execute("SELECT game_mode, guild_id, channel_id FROM bot_game_rooms WHERE room_id = %s LIMIT 1", (room_id,))
-                row = await cursor.fetchone()
-                game_mode = str(row.get("game_mode") or "1") if row else "1"
-                min_bet = MODE_MIN_BET.get(game_mode, MODE_MIN_BET["1"])
-                max_bet = MODE_MAX_BET.get(game_mode, MODE_MAX_BET["1"])
-                return {
-                    "game_mode": game_mode,
-                    "min_bet": int(min_bet),
-                    "max_bet": int(max_bet),
-                    "guild_id": row.get("guild_id") if row else None,
-                    "channel_id": row.get("channel_id") if row else None
-                }
+            with METRICS.timer("db_seconds", source="blackjack", op="room_config"):
+                conn = await aiomysql.connect(
+                    host=self.db_host, user=self.db_user, password=self.db_password,
+                    db=self.db_name, charset='utf8mb4', autocommit=True,
+                    cursorclass=aiomysql.cursors.DictCursor
+                )
+                async with conn.cursor() as cursor:
+                    await cursor.execute("SELECT game_mode, guild_id, channel_id FROM bot_game_rooms WHERE room_id = %s LIMIT 1", (room_id,))
+                    return await cursor.fetchone()
         except Exception as e:
             logger.warning(f"Failed to load game_mode for room {room_id}: {e}")
-            return {
-                "game_mode": "1",
-                "min_bet": MODE_MIN_BET["1"],
-                "max_bet": MODE_MAX_BET["1"],
-                "guild_id": None,
-                "channel_id": None
-            }
+            return None
+        finally:
+            if conn: conn.close()
+
+    async def _load_room_config(self, room_id: str) -> dict:
+        # served from the shared ROOM_CONFIGS cache; DB only on first access
+        row = await ROOM_CONFIGS.get(room_id, self._fetch_room_config_row)
+        game_mode = str(row.get("game_mode") or "1") if row else "1"
+        min_bet = MODE_MIN_BET.get(game_mode, MODE_MIN_BET["1"])
+        max_bet = MODE_MAX_BET.get(game_mode, MODE_MAX_BET["1"])
+        return {
+            "game_mode": game_mode,
+            "min_bet": int(min_bet),
+            "max_bet": int(max_bet),
+            "guild_id": row.get("guild_id") if row else None,
+            "channel_id": row.get("channel_id") if row else None
+        }
 
     async def _load_game_state(self, room_id: str) -> Optional[dict]:
         conn = None
+        t0 = time.perf_counter()
         try:
             conn = await self._get_db_connection()
             async with conn.cursor() as cursor:
@@ -252,8 +286,12 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
                         logger.warning(f"Bad JSON game_state for room {room_id}, resetting.")
                         return None
                 return None
+        except Exception:
+            METRICS.inc("db_errors_total", source="blackjack", op="load_state")
+            raise
         finally:
             if conn: conn.close()
+            METRICS.observe("db_seconds", time.perf_counter() - t0, source="blackjack", op="load_state")
 
     async def _save_game_state(self, room_id: str, state: dict):
         # As a last line of defense, sanitize every save to guarantee real codes:
@@ -263,6 +301,7 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             logger.error(f"Sanitize before save failed: {e}", exc_info=True)
 
         conn = None
+        t0 = time.perf_counter()
         try:
             conn = await self._get_db_connection()
             async with conn.cursor() as cursor:
@@ -275,10 +314,12 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             await conn.commit()
         except Exception as e:
             if conn: await conn.rollback()
+            METRICS.inc("db_errors_total", source="blackjack", op="save_state")
             logger.error(f"DB save error for room '{room_id}': {e}", exc_info=True)
             raise
         finally:
             if conn: conn.close()
+            METRICS.observe("db_seconds", time.perf_counter() - t0, source="blackjack", op="save_state")
 
     def _sanitize_state_cards(self, state: dict):
         """Make sure no placeholder/back markers exist anywhere in state."""
@@ -309,6 +350,10 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
         rid = self._normalize_room_id(room_id)
         self.bot.ws_rooms.setdefault(rid, set()).add(ws)
         setattr(ws, "_assigned_room", rid)
+        # presence index: remember the exact key so unregister removes the same entry
+        pid = str(getattr(ws, "_player_id", "") or "")
+        setattr(ws, "_presence_key", (rid, pid))
+        self.bot.ws_presence.add(rid, pid, ws)
         return True
 
     def unregister_ws_connection(self, ws):
@@ -317,37 +362,26 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             self.bot.ws_rooms[room].discard(ws)
             if not self.bot.ws_rooms[room]:
                 del self.bot.ws_rooms[room]
+        key = getattr(ws, "_presence_key", None)
+        if key:
+            self.bot.ws_presence.remove(key[0], key[1], ws)
 
     # ---- Presence tagging helpers (bot.blackjack_ws_handler should set ws._player_id) ----
     def _is_ws_connected(self, room_id: str, player_id: str) -> bool:
         try:
-            for ws in list(self.bot.ws_rooms.get(str(room_id), set())):
-                if getattr(ws, "closed", False):
-                    continue
-                if str(getattr(ws, "_player_id", "")) == str(player_id):
-                    return True
+            return self.bot.ws_presence.is_connected(room_id, player_id)
         except Exception:
-            pass
-        return False
+            return False
 
     def _sender_in_room_bucket(self, room_id: str, player_id: str) -> bool:
         """
         Mirror hold'em room-gating: if the room has a bucket, only accept actions
         from senders that have a live WS in that same room.
         """
-        bucket = self.bot.ws_rooms.get(str(room_id), set())
-        if not bucket:
+        if not self.bot.ws_rooms.get(str(room_id)):
             # if there's no bucket, be permissive (e.g., unit tests / headless)
             return True
-        for ws in list(bucket):
-            try:
-                if getattr(ws, "closed", False):
-                    continue
-                if str(getattr(ws, "_player_id", "")) == str(player_id):
-                    return True
-            except Exception:
-                continue
-        return False
+        return self._is_ws_connected(room_id, player_id)
 
     # ---------------- State defaults & patches ----------------
     def _mark_dirty(self, state: dict):
@@ -359,7 +393,6 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
         state.setdefault("players", [])  # each player may have "hands": [ {cards,total,is_busted,is_standing,bet,double,surrender} ... ]
         state.setdefault("dealer_hand", [])
         state.setdefault("dealer_total", None)
-        state.setdefault("deck", [])
         state.setdefault("round_timer_start", None)
         state.setdefault("round_timer_secs", None)
         state.setdefault("action_timer_start", None)
@@ -398,16 +431,16 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
 
         bucket = self.bot.ws_rooms.get(room_id, set())
         if not bucket: return
-        envelope = {
-            "type": "state",
-            "game_state": state,
-            "room_id": room_id,
-            "server_ts": int(time.time()),
-        }
-        msg = json.dumps(envelope)
-        for ws in list(bucket):
-            try: await ws.send_str(msg)
-            except: self.unregister_ws_connection(ws)
+        # Per-viewer projection: deck stripped, hidden cards masked; each view encoded once
+        METRICS.inc("broadcast_recipients_total", len(bucket), kind="blackjack_state")
+        with METRICS.timer("broadcast_seconds", kind="blackjack_state"):
+            for ws in list(bucket):
+                try: await ws.send_str(self._encode_state_envelope(room_id, state, getattr(ws, "_player_id", None)))
+                except: self.unregister_ws_connection(ws)
+
+    def _encode_state_envelope(self, room_id: str, state: dict, viewer_id=None) -> str:
+        """{"type":"state",...} frame as this viewer may see it (also used for the join snapshot)."""
+        return self._projections.envelope(room_id, state, viewer_id)
 
     def _build_ui_hint_for_actor(self, state: dict) -> dict:
         actor = state.get("current_actor")
@@ -427,6 +460,10 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             # NEW: expose split/multi-hand context
             "hand_count": 0,
             "active_hand_index": None,
+
+            # basic-strategy advice for the active hand (cogs/utils/bj_strategy.py)
+            "advice": None,
+            "advice_ev": None,
         }
         if not actor: return hint
         p = self._find_player(state, actor)
@@ -468,6 +505,17 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             base_bet = int(hand.get("bet") or p.get("bet") or 0)
             hint["insurance_amount"] = max(0, base_bet // 2)
 
+        # Advice: table lookup among the actions allowed right now
+        if hint["can_hit"] and dealer_cards:
+            bet = safe_int(hand.get("bet"), safe_int(p.get("bet"), 0))
+            advice = table_for_bet(bet).advise(
+                cards, dealer_cards[0],
+                can_double=hint["can_double"], can_surrender=hint["can_surrender"], can_split=hint["can_split"],
+            )
+            if advice:
+                hint["advice"], ev = advice
+                hint["advice_ev"] = round(ev, 4)
+
         return hint
 
     async def _broadcast_tick(self, room_id: str, state: dict):
@@ -486,9 +534,11 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             "ui_for_current_actor": self._build_ui_hint_for_actor(state),
         }
         msg = json.dumps(payload)
-        for ws in list(bucket):
-            try: await ws.send_str(msg)
-            except: self.unregister_ws_connection(ws)
+        METRICS.inc("broadcast_recipients_total", len(bucket), kind="blackjack_tick")
+        with METRICS.timer("broadcast_seconds", kind="blackjack_tick"):
+            for ws in list(bucket):
+                try: await ws.send_str(msg)
+                except: self.unregister_ws_connection(ws)
 
     def _add_room_active(self, room_id: str):
         self.rooms_with_active_timers.add(self._normalize_room_id(room_id))
@@ -717,23 +767,25 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
         return [p for p in state.get("players", []) if p.get("seat_id")]
 
     # ---------------- Dealer & dealing ----------------
-    def _fresh_deck(self) -> Deck:
-        d = Deck()
-        d.shuffle()
-        return d
+    def _fresh_deck(self) -> Shoe:
+        return Shoe.new(BJ_SHOE_DECKS, BJ_SHOE_PENETRATION)
 
     def _deal_card(self, state: dict) -> dict:
-        """ALWAYS returns a real card dict (never placeholders)."""
-        deck = Deck(cards_data=state["deck"]) if state.get("deck") else self._fresh_deck()
-        c = deck.deal_card()
-        state["deck"] = deck.to_output_format()
-        return c.to_output_format() if c else None
+        """ALWAYS returns a real card code (never placeholders)."""
+        shoe = Shoe.from_state(state)
+        if shoe is None or not len(shoe):
+            # only if the table's shoe vanished or ran dry past the cut card mid-round
+            logger.warning(f"Blackjack shoe {'exhausted' if shoe else 'missing'} mid-round; shuffling a new one")
+            shoe = self._fresh_deck()
+        code = shoe.deal_code()
+        shoe.to_state(state)
+        return code
 
     def _start_new_round(self, state: dict):
         # reset dealer & players for a new hand (but keep seats)
         state["dealer_hand"] = []
         state["dealer_total"] = None
-        state["deck"] = []
+        # the shoe ("__deck") carries over between rounds; _initial_deal reshuffles at the cut card
         state["last_evaluation"] = None
         # reset each player’s running state
         for p in state.get("players", []):
@@ -744,7 +796,8 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
 
     def _initial_deal(self, state: dict):
         # assume all bets > 0 have been placed or players skipped
-        deck = self._fresh_deck()
+        deck, reshuffled = Shoe.for_round(state, BJ_SHOE_DECKS, BJ_SHOE_PENETRATION)
+        state["shoe_reshuffled"] = reshuffled
         skips = state.get("_betting_skip_round") or {}
         # deal 2 to each seated who actually bet and were not skipped
         for _ in range(2):
@@ -767,16 +820,16 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
                         "insured": False,
                     }]
                 # draw
-                c = deck.deal_card()
+                c = deck.deal_code()
                 if c:
-                    p["hands"][0]["cards"].append(c.to_output_format())
+                    p["hands"][0]["cards"].append(c)
         # dealer 2
         dh = []
         for _ in range(2):
-            c = deck.deal_card()
-            if c: dh.append(c.to_output_format())
+            c = deck.deal_code()
+            if c: dh.append(c)
         state["dealer_hand"] = dh
-        state["deck"] = deck.to_output_format()
+        deck.to_state(state)
 
         # compute initial totals
         for p in state.get("players", []):
@@ -1036,7 +1089,7 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
         # clear to pre-game
         state["current_round"] = PHASE_PRE_GAME
         state["dealer_hand"] = []; state["dealer_total"] = None
-        state["deck"] = []
+        CompactDeck.clear(state)
         state["round_timer_start"] = None; state["round_timer_secs"] = None
         state["action_timer_start"] = None; state["action_timer_secs"] = None; state["action_deadline_epoch"] = None
         state["initial_countdown_triggered"] = False
@@ -1109,34 +1162,61 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
         if not self.rooms_with_active_timers:
             return
 
+        t_pass = time.perf_counter()
+        started = []
         for room_id in list(self.rooms_with_active_timers):
             rid = self._normalize_room_id(room_id)
+            if rid in self._room_ticks:
+                continue  # still running from an earlier pass; skip rather than overlap
+            task = asyncio.create_task(self._tick_room(rid))
+            self._room_ticks[rid] = task
+            task.add_done_callback(lambda _t, rid=rid: self._room_ticks.pop(rid, None))
+            started.append(task)
+
+        if started:
+            # one stuck table must not hold every other table's countdown
+            await asyncio.wait(started, timeout=TIMER_PASS_WAIT_SECS)
+        TICK_PROFILER.end_pass("blackjack", time.perf_counter() - t_pass, len(started))
+
+    async def _tick_room(self, rid: str):
+        """One room's timer pass; failures are contained to this room."""
+        async with self._tick_slots:
+            t_tick = time.perf_counter()
+            loop_tag = LOOP_MONITOR.tag(source="blackjack_timer", room=rid)
+            prof = TICK_PROFILER.begin("blackjack", rid)
             try:
                 state = await self._load_game_state(rid)
                 if not state:
-                    continue
+                    return
                 self._ensure_defaults(state)
                 # stamp the room id so helpers that read it don't see None
                 if not state.get("room_id"):
                     state["room_id"] = rid
 
-                # room limits from DB once
+                # room limits (cached; DB only on first access)
                 cfg = await self._load_room_config(rid)
                 self._ensure_room_limits(state, cfg)
 
                 before_rev = int(state.get("__rev") or 0)
+                prof.round = state.get("current_round")
+                prof.mark("load")
 
                 if self._force_pre_game_if_empty_seats(state):
-                    if await self._save_if_current(rid, state, before_rev):
+                    prof.mark("transition")
+                    saved = await self._save_if_current(rid, state, before_rev)
+                    prof.mark("save")
+                    if saved:
                         await self._broadcast_state(rid, state)
+                        prof.mark("broadcast")
                     self._add_room_active(rid)
-                    continue
+                    return
 
                 # DC reaps
                 if self._reap_players_with_dead_ws(state, rid):
                     pass
                 if self._reap_pending_disconnects(state, rid):
                     pass
+                prof.mark("reap")
 
                 phase = state.get("current_round", PHASE_PRE_GAME)
 
@@ -1259,21 +1339,30 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
                     # For compatibility, immediately start betting again
                     await self._to_betting(state)
 
+                prof.mark("transition")
+
                 # Save/broadcast
                 after_rev = int(state.get("__rev") or 0)
                 changed = (after_rev != before_rev)
                 if changed:
-                    if await self._save_if_current(rid, state, before_rev):
+                    saved = await self._save_if_current(rid, state, before_rev)
+                    prof.mark("save")
+                    if saved:
                         await self._broadcast_state(rid, state)
                 else:
                     # heartbeat tick for countdowns/action bar
                     await self._broadcast_tick(rid, state)
+                prof.mark("broadcast")
 
                 self._add_room_active(rid)
 
             except Exception as e:
                 logger.error(f"[TIMER TASK] Error checking room '{rid}': {e}", exc_info=True)
                 self.rooms_with_active_timers.discard(rid)
+            finally:
+                METRICS.observe("game_tick_seconds", time.perf_counter() - t_tick, game="blackjack", room=rid)
+                TICK_PROFILER.end(prof)
+                LOOP_MONITOR.untag(loop_tag)
 
     @check_game_timers.before_loop
     async def before_check_game_timers(self):
@@ -1372,8 +1461,10 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             before_rev = int(state.get("__rev") or 0)
 
             # minimal enrichment
-            state['guild_id'] = state.get('guild_id') or data.get('guild_id')
-            state['channel_id'] = state.get('channel_id') or data.get('channel_id')
+            for key in ('guild_id', 'channel_id'):
+                if not state.get(key) and data.get(key):
+                    state[key] = data[key]
+                    self._mark_dirty(state)
 
             # empty table debounce
             self._force_pre_game_if_empty_seats(state)
@@ -1623,6 +1714,9 @@ class MechanicsMain2(commands.Cog, name="MechanicsMain2"):
             # final save/broadcast if changed — authoritative save from action handler
             if int(state.get("__rev") or 0) != int(before_rev):
                 await self._save_game_state(room_id, state)
+                # unlike the optimistic timer save, this one can publish a second state at a
+                # __rev a concurrent tick already broadcast, so don't reuse that rev's views
+                self._projections.forget(room_id)
                 await self._broadcast_state(room_id, state)
 
         except Exception as e:
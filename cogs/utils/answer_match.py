@@ -0,0 +1,139 @@
+import re
+from typing import FrozenSet, Optional
+
+# Share of a word that must survive edits for a fuzzy hit (same 70% the game always used).
+ANSWER_SIMILARITY = 0.70
+
+_TAG_RE = re.compile(r"<[^>]+>")                 # dumps carry <i>titles</i>
+_PAREN_RE = re.compile(r"\s*\(.*?\)")            # "(Ernest) Hemingway" -> "Hemingway"
+_PREFIX_RE = re.compile(r"^\s*(?:what|who|where|when)\s+(?:is|are|was|were)\b\s*")
+_WORD_RE = re.compile(r"\w+")
+_ARTICLES = frozenset(("a", "an", "the"))
+_STOPWORDS = _ARTICLES | frozenset(("of", "and", "in", "on", "to", "for", "or"))
+
+
+def normalize_answer(text: str) -> str:
+    """
+    'What is <i>The Old Man (and the Sea)</i>?' -> 'old man'
+    lowercase, no markup / parentheticals / Jeopardy prefix / leading article / punctuation.
+    """
+    text = _TAG_RE.sub("", str(text or "").lower())
+    text = _PAREN_RE.sub("", text)
+    text = _PREFIX_RE.sub("", text)
+    words = _WORD_RE.findall(text)
+    if words and words[0] in _ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+
+def _content_words(normalized: str) -> FrozenSet[str]:
+    return frozenset(w for w in normalized.split() if w not in _STOPWORDS)
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance between a and b if it is <= limit, else limit + 1.
+    Only the diagonal band of width 2*limit+1 is filled and the scan stops
+    as soon as a whole row exceeds the limit, so a miss costs O(limit * len).
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    la, lb = len(a), len(b)
+    if la - lb > limit:
+        return limit + 1
+    if lb == 0:
+        return la
+    big = limit + 1
+    prev = list(range(lb + 1))
+    for i in range(1, la + 1):
+        lo = max(1, i - limit)
+        hi = min(lb, i + limit)
+        cur = [big] * (lb + 1)
+        cur[0] = i if i <= limit else big
+        ca = a[i - 1]
+        row_min = cur[0]
+        for j in range(lo, hi + 1):
+            cost = prev[j - 1] + (ca != b[j - 1])
+            if prev[j] + 1 < cost:
+                cost = prev[j] + 1
+            if cur[j - 1] + 1 < cost:
+                cost = cur[j - 1] + 1
+            cur[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > limit:
+            return big
+        prev = cur
+    return prev[lb] if prev[lb] <= limit else big
+
+
+def similar_words(a: str, b: str, threshold: float = ANSWER_SIMILARITY) -> bool:
+    """(max_len - distance) / max_len >= threshold, without computing the full distance."""
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return True
+    limit = int(longest * (1.0 - threshold) + 1e-9)
+    return bounded_levenshtein(a, b, limit) <= limit
+
+
+class AnswerKey:
+    """
+    One clue's answer, normalized once when the board is built.
+
+      • exact: the whole normalized answer
+      • words: answer words that don't already appear in the clue (giving back
+        a word from the question isn't knowing the answer), grouped by length
+        so a guess word only meets candidates that could be within the threshold
+    """
+    __slots__ = ("exact", "words", "_by_len")
+
+    def __init__(self, answer: str, question: str = ""):
+        self.exact = normalize_answer(answer)
+        clue_words = _content_words(normalize_answer(question))
+        self.words = _content_words(self.exact) - clue_words
+        self._by_len = {}
+        for w in self.words:
+            self._by_len.setdefault(len(w), []).append(w)
+
+    def _fuzzy_hit(self, word: str, threshold: float) -> bool:
+        n = len(word)
+        for length, candidates in self._by_len.items():
+            # distance >= |len difference|, so most lengths can be skipped outright
+            if abs(length - n) > max(length, n) * (1.0 - threshold):
+                continue
+            for cand in candidates:
+                if similar_words(word, cand, threshold):
+                    return True
+        return False
+
+    def matches(self, guess: str, threshold: float = ANSWER_SIMILARITY) -> bool:
+        """Is the player's reply (prefix and all) an acceptable answer?"""
+        normalized = normalize_answer(guess)
+        if not normalized:
+            return False
+        if normalized == self.exact:
+            return True
+        guess_words = _content_words(normalized)
+        if guess_words & self.words:
+            return True
+        return any(self._fuzzy_hit(w, threshold) for w in guess_words)
+
+
+def answer_key(clue: dict) -> Optional[AnswerKey]:
+    """The clue's AnswerKey, built on first use and kept on the clue dict."""
+    key = clue.get("answer_key")
+    if key is None and clue.get("answer"):
+        key = clue["answer_key"] = AnswerKey(clue["answer"], clue.get("question", ""))
+    return key
+
+
+def precompute_answer_keys(board: dict):
+    """Attach AnswerKeys to every clue of a bank board ({"normal", "double", "final"})."""
+    for round_key in ("normal", "double"):
+        for cat in board.get(round_key) or []:
+            for clue in cat["questions"]:
+                answer_key(clue)
+    if board.get("final"):
+        answer_key(board["final"])
@@ -0,0 +1,247 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# ---------------- House rules (as played by MechanicsMain2) ----------------
+#   • dealer draws to 16 and stands on every 17, soft 17 included
+#   • no hole-card peek: players act first, a dealer blackjack only beats hands
+#     under 21 (a player's 3-card 21 pushes it)
+#   • blackjack pays int(1.5 * bet); surrender (first decision) loses bet // 2
+#   • double on any first two cards, also after a split; one card then stand
+#   • one split per round (no resplit); split hands play normally, and a
+#     two-card 21 on a split hand still counts as blackjack
+#
+# EVs assume an infinite shoe (each rank independent of the cards already
+# out), which is what basic strategy charts use; the effect of removing a
+# handful of cards from a multi-deck shoe is a few hundredths of a percent.
+
+# value -> probability; 1 = ace, 10 = ten / J / Q / K
+_P = {v: 1 / 13 for v in range(1, 10)}
+_P[10] = 4 / 13
+_VALUES = tuple(range(1, 11))
+
+ACTIONS = ("stand", "hit", "double", "surrender", "split")
+_CHART_CODE = {"stand": "S", "hit": "H", "double": "D", "surrender": "R", "split": "P"}
+
+
+def _total(hard: int, ace: bool) -> int:
+    return hard + 10 if ace and hard + 10 <= 21 else hard
+
+
+def card_value(card) -> int:
+    """Card dict / code -> 1 (ace), 2..9 or 10."""
+    rank = (card.get("rank") if isinstance(card, dict) else str(card or "")[:-1]) or ""
+    rank = rank.upper()
+    if rank == "A":
+        return 1
+    if rank in ("K", "Q", "J", "0", "10", "T"):
+        return 10
+    try:
+        return max(2, min(9, int(rank)))
+    except ValueError:
+        return 10
+
+
+@lru_cache(maxsize=None)
+def dealer_outcomes(up: int) -> Tuple[Tuple[int, float], ...]:
+    """Dealer's final result for an upcard: ((17..21 | 0 = bust | 22 = blackjack, probability), ...)."""
+    out: Dict[int, float] = {}
+
+    def play(hard: int, ace: bool, n: int, prob: float):
+        total = _total(hard, ace)
+        if hard > 21:
+            out[0] = out.get(0, 0.0) + prob
+            return
+        if total >= 17:
+            key = 22 if (n == 2 and total == 21) else total
+            out[key] = out.get(key, 0.0) + prob
+            return
+        for v in _VALUES:
+            play(hard + v, ace or v == 1, n + 1, prob * _P[v])
+
+    play(up, up == 1, 1, 1.0)
+    return tuple(sorted(out.items()))
+
+
+class StrategyTable:
+    """
+    Exact per-decision EVs (in units of the hand's bet) for one payout rule,
+    computed once by DP over (hard total, holds an ace, dealer upcard).
+
+    ev[(hard, ace, up)] = (stand, hit, double, surrender) for a two-card first
+    decision; split_ev[(value, up)] for a pair. advise() is a couple of tuple
+    lookups and a max over the actions the UI currently allows.
+    """
+
+    def __init__(self, bj_pays: float = 1.5, surrender_loses: float = 0.5):
+        self.bj_pays = float(bj_pays)
+        self.surrender_loses = float(surrender_loses)
+        self._stand = {}
+        self._opt = {}
+        self.ev: Dict[Tuple[int, bool, int], Tuple[float, float, float, float]] = {}
+        self.split_ev: Dict[Tuple[int, int], float] = {}
+        self._build()
+
+    # ---------------- DP ----------------
+
+    def _stand_ev(self, hard: int, ace: bool, up: int) -> float:
+        key = (hard, ace, up)
+        ev = self._stand.get(key)
+        if ev is None:
+            total = _total(hard, ace)
+            ev = 0.0
+            for d, p in dealer_outcomes(up):
+                d = 21 if d == 22 else d      # dealer blackjack only matters against a player blackjack
+                if d == 0 or total > d:
+                    ev += p
+                elif total < d:
+                    ev -= p
+            self._stand[key] = ev
+        return ev
+
+    def _draw(self, hard: int, ace: bool, up: int, after) -> float:
+        ev = 0.0
+        for v in _VALUES:
+            h = hard + v
+            ev += _P[v] * (-1.0 if h > 21 else after(h, ace or v == 1, up))
+        return ev
+
+    def _optimal_ev(self, hard: int, ace: bool, up: int) -> float:
+        """Best of hit / stand once double and surrender are gone."""
+        key = (hard, ace, up)
+        ev = self._opt.get(key)
+        if ev is None:
+            ev = self._stand_ev(hard, ace, up)
+            if _total(hard, ace) < 21:
+                ev = max(ev, self._draw(hard, ace, up, self._optimal_ev))
+            self._opt[key] = ev
+        return ev
+
+    def _blackjack_ev(self, up: int) -> float:
+        p_dealer_bj = dict(dealer_outcomes(up)).get(22, 0.0)
+        return self.bj_pays * (1.0 - p_dealer_bj)
+
+    def _first_ev(self, hard: int, ace: bool, up: int) -> float:
+        return max(self.ev[(hard, ace, up)])
+
+    def _build(self):
+        for up in _VALUES:
+            for hard in range(2, 22):
+                for ace in (False, True):
+                    stand = self._stand_ev(hard, ace, up)
+                    hit = self._draw(hard, ace, up, self._optimal_ev)
+                    double = 2.0 * self._draw(hard, ace, up, self._stand_ev)
+                    self.ev[(hard, ace, up)] = (stand, hit, double, -self.surrender_loses)
+            for v in _VALUES:
+                ev = 0.0
+                for c in _VALUES:
+                    if {v, c} == {1, 10}:
+                        ev += _P[c] * self._blackjack_ev(up)
+                    else:
+                        ev += _P[c] * self._first_ev(v + c, v == 1 or c == 1, up)
+                self.split_ev[(v, up)] = 2.0 * ev
+
+    # ---------------- lookups ----------------
+
+    def action_evs(self, cards: List, dealer_up, can_double: bool = True, can_surrender: bool = True,
+                   can_split: bool = False) -> Dict[str, float]:
+        """EV of each currently allowed action for this hand vs this dealer upcard."""
+        values = [card_value(c) for c in cards]
+        up = card_value(dealer_up)
+        hard, ace = sum(values), 1 in values
+        if hard > 21:
+            return {}
+        if len(values) == 2 and _total(hard, ace) == 21:
+            return {"stand": self._blackjack_ev(up)}
+        stand, hit, double, surrender = self.ev[(hard, ace, up)]
+        if len(values) != 2:
+            return {"stand": stand, "hit": hit}
+        evs = {"stand": stand, "hit": hit}
+        if can_double:
+            evs["double"] = double
+        if can_surrender:
+            evs["surrender"] = surrender
+        if can_split and values[0] == values[1]:
+            evs["split"] = self.split_ev[(values[0], up)]
+        return evs
+
+    def advise(self, cards: List, dealer_up, **allowed) -> Optional[Tuple[str, float]]:
+        """(best action, its EV) or None for a busted / empty hand."""
+        evs = self.action_evs(cards, dealer_up, **allowed) if cards and dealer_up else {}
+        if not evs:
+            return None
+        action = max(evs, key=lambda a: (evs[a], -ACTIONS.index(a)))
+        return action, evs[action]
+
+    # ---------------- reports ----------------
+
+    def round_ev(self) -> float:
+        """Expected result of one hand (per unit bet) played perfectly; -house edge."""
+        total = 0.0
+        for up in _VALUES:
+            for a in _VALUES:
+                for b in _VALUES:
+                    p = _P[up] * _P[a] * _P[b]
+                    if {a, b} == {1, 10}:
+                        total += p * self._blackjack_ev(up)
+                        continue
+                    best = self._first_ev(a + b, a == 1 or b == 1, up)
+                    if a == b:
+                        best = max(best, self.split_ev[(a, up)])
+                    total += p * best
+        return total
+
+    def _best_code(self, hard: int, ace: bool, up: int, pair: Optional[int] = None) -> str:
+        evs = dict(zip(ACTIONS, self.ev[(hard, ace, up)]))
+        if pair is not None:
+            evs["split"] = self.split_ev[(pair, up)]
+        return _CHART_CODE[max(evs, key=lambda a: (evs[a], -ACTIONS.index(a)))]
+
+    def chart(self) -> Dict[str, List[str]]:
+        """Classic basic-strategy rows (upcards 2..10, A) for two-card hard / soft / pair hands."""
+        ups = list(range(2, 11)) + [1]
+        rows = {"hard": [], "soft": [], "pair": []}
+        for total in range(5, 21):
+            rows["hard"].append(f"{total:>5}  " + " ".join(self._best_code(total, False, u) for u in ups))
+        for other in range(2, 10):
+            rows["soft"].append(f"{'A,' + str(other):>5}  " + " ".join(self._best_code(1 + other, True, u) for u in ups))
+        for v in list(range(2, 11)) + [1]:
+            r = "A" if v == 1 else ("T" if v == 10 else str(v))
+            rows["pair"].append(f"{r + ',' + r:>5}  " + " ".join(self._best_code(2 * v, v == 1, u, pair=v) for u in ups))
+        return rows
+
+
+_TABLES: Dict[Tuple[float, float], StrategyTable] = {}
+
+
+def table_for_bet(bet: int) -> StrategyTable:
+    """
+    Table for the payout ratios a given bet actually gets (integer chips: a 5 bet
+    is paid 7 on blackjack and loses 2 on surrender). Built once per ratio.
+    """
+    bet = max(1, int(bet or 0))
+    key = (int(1.5 * bet) / bet, (bet // 2) / bet)
+    table = _TABLES.get(key)
+    if table is None:
+        table = _TABLES[key] = StrategyTable(*key)
+    return table
+
+
+def house_edge_report(min_bets: Dict[str, int], max_bets: Dict[str, int]) -> List[dict]:
+    """Per game_mode: house edge at the min and max bet, and expected loss per hand."""
+    rows = []
+    for mode in sorted(set(min_bets) | set(max_bets)):
+        row = {"mode": mode}
+        for label, bets in (("min", min_bets), ("max", max_bets)):
+            bet = bets.get(mode)
+            if not bet:
+                continue
+            edge = -table_for_bet(bet).round_ev()
+            row[f"{label}_bet"] = int(bet)
+            row[f"{label}_edge"] = edge
+            row[f"{label}_loss_per_hand"] = edge * bet
+        rows.append(row)
+    return rows
+
+
+# Built at import for the common (even bet) payouts so the first hint is a lookup.
+DEFAULT_TABLE = table_for_bet(2)
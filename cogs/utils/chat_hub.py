@@ -0,0 +1,375 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+from cogs.utils.metrics import REGISTRY as METRICS
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Chat hub config ----------------
+PERSISTENT_ROOMS = ("lobby",)   # buckets that are never deleted when empty
+SEND_TIMEOUT_SECS = 1.0         # per-socket send deadline inside a broadcast
+MAX_INFLIGHT_PER_WS = 8         # queued sends allowed on one socket before it counts as stalled
+
+# ---------------- History (catch-up on join / rebind) ----------------
+HISTORY_TYPES = {"new_message"}                 # only real chat lines are replayed
+HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "50"))
+HISTORY_MAX_BYTES = int(os.getenv("CHAT_HISTORY_MAX_BYTES", str(64 * 1024)))
+HISTORY_PATH = os.getenv("CHAT_HISTORY_PATH", os.path.join("data", "chat_history.json"))
+HISTORY_FLUSH_SECS = 15
+
+
+class ChatHub:
+    """
+    Single owner of /chat_ws room membership and fan-out.
+
+    Both bot.py's chat_websocket_handler and ChatMain.handle_chat_websocket
+    delegate here so there is exactly one set of rules for:
+      • joining / leaving / rebinding a socket between room buckets
+      • presence frames (user_joined / user_left / system_notice)
+      • broadcast: payload serialized ONCE, sent to every socket concurrently,
+        each send time-limited; stalled or dead sockets are pruned and closed
+
+    The rooms dict is shared (bot.chat_ws_rooms) so existing readers keep working.
+    """
+
+    def __init__(self, rooms: Optional[dict] = None, persistent_rooms=PERSISTENT_ROOMS,
+                 send_timeout: float = SEND_TIMEOUT_SECS, max_inflight: int = MAX_INFLIGHT_PER_WS):
+        self.rooms = rooms if rooms is not None else {}
+        self.persistent_rooms = {str(r).lower() for r in (persistent_rooms or ())}
+        self.send_timeout = float(send_timeout)
+        self.max_inflight = int(max_inflight)
+
+        # ws -> room_id the socket is currently bound to (survives pruning so
+        # the handler's cleanup still knows where to announce the leave)
+        self._where = {}
+        # ws -> number of sends currently awaiting the transport
+        self._inflight = {}
+
+        # Counters for benchmarking fan-out cost
+        self.stats = {
+            "broadcasts": 0,
+            "frames_sent": 0,
+            "bytes_serialized": 0,
+            "send_failures": 0,
+            "pruned": 0,
+        }
+
+        for r in persistent_rooms or ():
+            self.rooms.setdefault(r, set())
+
+        # room_id -> RoomHistory (kept while the room bucket is empty; drop_room() forgets it)
+        self.history = {}
+        self.history_path = HISTORY_PATH
+        self._history_dirty = False
+        self._flush_task = None
+        self._load_history()
+
+    # ---------------- Membership ----------------
+
+    def _is_persistent(self, room_id) -> bool:
+        return str(room_id).lower() in self.persistent_rooms
+
+    def _drop_if_empty(self, room_id):
+        bucket = self.rooms.get(room_id)
+        if bucket is not None and not bucket and not self._is_persistent(room_id):
+            del self.rooms[room_id]
+            logger.info("Chat room %s is now empty and has been closed.", room_id)
+
+    def drop_room(self, room_id):
+        """
+        Forget a deleted room: its socket bucket and its chat history. Sockets
+        still bound to it keep their _where entry so leave() works as usual.
+        """
+        if not self._is_persistent(room_id):
+            self.rooms.pop(room_id, None)
+        if self.history.pop(room_id, None) is not None:
+            self._history_dirty = True
+            self._ensure_flusher()
+
+    def members(self, room_id) -> set:
+        return self.rooms.get(room_id) or set()
+
+    def room_size(self, room_id) -> int:
+        return len(self.rooms.get(room_id) or ())
+
+    def room_of(self, ws) -> Optional[str]:
+        return self._where.get(ws)
+
+    def join(self, ws, room_id: str):
+        """Bind a socket to a room (moving it out of any previous room)."""
+        prev = self._where.get(ws)
+        if prev is not None and prev != room_id:
+            self._discard(ws, prev)
+        self.rooms.setdefault(room_id, set()).add(ws)
+        self._where[ws] = room_id
+        self._inflight.setdefault(ws, 0)
+
+    def _discard(self, ws, room_id):
+        try:
+            bucket = self.rooms.get(room_id)
+            if bucket is not None:
+                bucket.discard(ws)
+                self._drop_if_empty(room_id)
+        except Exception:
+            pass
+
+    def leave(self, ws) -> Optional[str]:
+        """Unbind a socket completely. Returns the room it was in (or None)."""
+        room_id = self._where.pop(ws, None)
+        self._inflight.pop(ws, None)
+        if room_id is not None:
+            self._discard(ws, room_id)
+        for r in self.persistent_rooms:
+            self.rooms.setdefault(r, set())
+        return room_id
+
+    def move(self, ws, new_room: str) -> Optional[str]:
+        """Rebind a socket to new_room. Returns the old room."""
+        old_room = self._where.get(ws)
+        self.join(ws, new_room)
+        return old_room
+
+    # ---------------- Fan-out ----------------
+
+    async def _send_one(self, ws, msg: str) -> bool:
+        if getattr(ws, "closed", False):
+            return False
+        pending = self._inflight.get(ws, 0)
+        if pending >= self.max_inflight:
+            # back-pressure: this socket is not draining, stop queueing onto it
+            return False
+        self._inflight[ws] = pending + 1
+        try:
+            await asyncio.wait_for(ws.send_str(msg), timeout=self.send_timeout)
+            return True
+        except Exception:
+            return False
+        finally:
+            if ws in self._inflight:
+                self._inflight[ws] = max(0, self._inflight[ws] - 1)
+
+    def _prune(self, ws, room_id):
+        bucket = self.rooms.get(room_id)
+        if bucket is not None:
+            bucket.discard(ws)
+        self.stats["pruned"] += 1
+        if not getattr(ws, "closed", False):
+            # let the client reconnect instead of silently missing frames
+            try:
+                asyncio.create_task(ws.close())
+            except Exception:
+                pass
+
+    async def broadcast(self, room_id: str, payload: dict, exclude=None) -> int:
+        """
+        Serialize payload once and send to every socket in room_id concurrently.
+        Chat lines (HISTORY_TYPES) are also appended to the room's history.
+        Returns the number of sockets the frame was delivered to.
+        """
+        try:
+            msg = None
+            if payload.get("type") in HISTORY_TYPES:
+                msg = json.dumps(payload)
+                self._record(room_id, msg)
+
+            clients = [w for w in (self.rooms.get(room_id) or ()) if w is not exclude]
+            if not clients:
+                return 0
+            if msg is None:
+                msg = json.dumps(payload)
+            self.stats["broadcasts"] += 1
+            self.stats["bytes_serialized"] += len(msg)
+
+            METRICS.inc("broadcast_recipients_total", len(clients), kind="chat")
+            with METRICS.timer("broadcast_seconds", kind="chat"):
+                results = await asyncio.gather(*[self._send_one(w, msg) for w in clients], return_exceptions=True)
+            delivered = 0
+            for w, ok in zip(clients, results):
+                if ok is True:
+                    delivered += 1
+                    continue
+                self.stats["send_failures"] += 1
+                self._prune(w, room_id)
+            self.stats["frames_sent"] += delivered
+            return delivered
+        except Exception:
+            logger.exception("Broadcast error for room %s", room_id)
+            return 0
+
+    async def send_to(self, ws, payload: dict) -> bool:
+        """Single-socket send with the same deadline rules as broadcast()."""
+        return await self._send_one(ws, json.dumps(payload))
+
+    # ---------------- Presence ----------------
+
+    async def notice(self, room_id: str, message: str, ts: Optional[int] = None):
+        await self.broadcast(room_id, {
+            "type": "system_notice",
+            "room_id": room_id,
+            "message": message,
+            "timestamp": ts if ts is not None else int(time.time()),
+        })
+
+    async def announce_join(self, room_id: str, display_name: str, ts: Optional[int] = None):
+        await self.broadcast(room_id, {
+            "type": "user_joined",
+            "room_id": room_id,
+            "displayName": display_name,
+            "timestamp": ts if ts is not None else int(time.time()),
+        })
+
+    async def announce_leave(self, room_id: str, display_name: str, ts: Optional[int] = None):
+        await self.broadcast(room_id, {
+            "type": "user_left",
+            "room_id": room_id,
+            "displayName": display_name,
+            "timestamp": ts if ts is not None else int(time.time()),
+        })
+
+    async def rebind(self, ws, new_room: str, display_name: str) -> Optional[str]:
+        """
+        Move ws to new_room and emit user_left / user_joined to both rooms
+        concurrently. Callers add their own system_notice copy afterwards.
+        Returns the old room.
+        """
+        old_room = self.move(ws, new_room)
+        ts = int(time.time())
+        jobs = [self.announce_join(new_room, display_name, ts), self.send_history(ws, new_room)]
+        if old_room and old_room != new_room:
+            jobs.append(self.announce_leave(old_room, display_name, ts))
+        await asyncio.gather(*jobs, return_exceptions=True)
+        return old_room
+
+    def snapshot(self) -> dict:
+        """Cheap summary for logs / admin views."""
+        return {
+            "rooms": len(self.rooms),
+            "sockets": len(self._where),
+            "history_rooms": len(self.history),
+            "history_bytes": sum(h.nbytes for h in self.history.values()),
+            **self.stats,
+        }
+
+    # ---------------- History ----------------
+
+    def _record(self, room_id: str, msg: str):
+        hist = self.history.get(room_id)
+        if hist is None:
+            hist = self.history[room_id] = RoomHistory()
+        hist.append(msg)
+        self._history_dirty = True
+        self._ensure_flusher()
+
+    async def send_history(self, ws, room_id: str) -> bool:
+        """
+        Send the room's recent chat lines to ONE socket as a single batched frame:
+          {"type":"history","room_id":...,"messages":[<new_message payloads>]}
+        Messages are stored pre-serialized so this is a string join, not a re-encode.
+        """
+        hist = self.history.get(room_id)
+        if not hist:
+            return False
+        frame = '{"type":"history","room_id":%s,"messages":[%s]}' % (
+            json.dumps(room_id), ",".join(hist.items)
+        )
+        return await self._send_one(ws, frame)
+
+    def _load_history(self):
+        try:
+            if not self.history_path or not os.path.exists(self.history_path):
+                return
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for room_id, items in (data or {}).items():
+                hist = RoomHistory()
+                for m in items or []:
+                    hist.append(m if isinstance(m, str) else json.dumps(m))
+                if hist:
+                    self.history[room_id] = hist
+            logger.info("Loaded chat history for %d room(s) from %s", len(self.history), self.history_path)
+        except Exception:
+            logger.exception("Failed to load chat history from %s", self.history_path)
+
+    def _write_history(self, data: dict):
+        folder = os.path.dirname(self.history_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp = f"{self.history_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.history_path)
+
+    async def flush_history(self):
+        """Write history to disk if anything changed (file I/O off the event loop)."""
+        if not self._history_dirty or not self.history_path:
+            return
+        self._history_dirty = False
+        data = {room_id: list(h.items) for room_id, h in self.history.items() if h}
+        try:
+            await asyncio.to_thread(self._write_history, data)
+        except Exception:
+            self._history_dirty = True
+            logger.exception("Failed to flush chat history to %s", self.history_path)
+
+    async def close(self):
+        """Stop the flush loop and write any pending history (call on shutdown)."""
+        task, self._flush_task = self._flush_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        await self.flush_history()
+
+    def _ensure_flusher(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            # no running loop yet (import time); the first broadcast will start it
+            self._flush_task = None
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(HISTORY_FLUSH_SECS)
+                await self.flush_history()
+            except asyncio.CancelledError:
+                await self.flush_history()
+                raise
+            except Exception:
+                logger.exception("Chat history flush loop error")
+
+
+class RoomHistory:
+    """Ring buffer of serialized chat lines capped by count AND total bytes."""
+
+    __slots__ = ("items", "sizes", "nbytes", "max_messages", "max_bytes")
+
+    def __init__(self, max_messages: int = HISTORY_MAX_MESSAGES, max_bytes: int = HISTORY_MAX_BYTES):
+        self.items = deque()
+        self.sizes = deque()    # UTF-8 size of each item (emoji / CJK are several bytes per char)
+        self.nbytes = 0
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+
+    def __len__(self):
+        return len(self.items)
+
+    def append(self, msg: str):
+        size = len(msg.encode("utf-8"))
+        if size > self.max_bytes:
+            return  # a single oversized frame (e.g. data: URL) is never replayed
+        self.items.append(msg)
+        self.sizes.append(size)
+        self.nbytes += size
+        while self.items and (len(self.items) > self.max_messages or self.nbytes > self.max_bytes):
+            self.items.popleft()
+            self.nbytes -= self.sizes.popleft()
@@ -1,4 +1,6 @@
 import random
+import secrets
+from functools import lru_cache
 
 class Card:
     def __init__(self, suit, rank):
@@ -51,9 +53,12 @@ class Deck:
         ranks = ["2", "3", "4", "5", "6", "7", "8", "9", "0", "J", "Q", "K", "A"]
         self.cards = [Card(suit, rank) for suit in suits for rank in ranks]
 
-    def shuffle(self):
-        """Shuffles the deck."""
-        random.shuffle(self.cards)
+    def shuffle(self, seed=None):
+        """Shuffles the deck. With a seed the order is reproducible (same seed, same deal)."""
+        if seed is None:
+            random.shuffle(self.cards)
+        else:
+            random.Random(seed).shuffle(self.cards)
 
     def deal_card(self):
         """Deals a single card from the top of the deck."""
@@ -66,3 +71,131 @@ class Deck:
     def to_output_format(self):
         """Converts the deck to a list of two-character strings for serialization."""
         return [card.to_output_format() for card in self.cards]
+
+
+# ---------------- Compact server-side deck ----------------
+SUITS = ["Hearts", "Diamonds", "Clubs", "Spades"]
+RANKS = ["2", "3", "4", "5", "6", "7", "8", "9", "0", "J", "Q", "K", "A"]
+# Same order Deck.build() produces
+STANDARD_CODES = tuple(f"{rank}{suit[0]}" for suit in SUITS for rank in RANKS)
+
+
+@lru_cache(maxsize=256)
+def shuffled_codes(seed: str, decks: int = 1) -> tuple:
+    """Deterministic deal order for a seed (cached, so dealing never rebuilds it)."""
+    codes = list(STANDARD_CODES) * int(decks)
+    random.Random(seed).shuffle(codes)
+    return tuple(codes)
+
+
+class CompactDeck:
+    """
+    A deck stored as a few bytes in game_state instead of a list of card strings.
+
+    Persisted under state["__deck"] (a private key that broadcasts never send):
+      {"seed": "<hex>", "cursor": n}    # normal form: order derived from the seed
+      {"seed": "<hex>", "cursor": n, "decks": 6, "cut": 234}  # multi-deck shoe (see Shoe)
+      {"packed": "ASKD0H...", "cursor": n}  # legacy form: migrated from state["deck"]
+    Dealing just advances the cursor.
+    """
+    STATE_KEY = "__deck"
+
+    def __init__(self, seed=None, cursor=0, decks=1, packed=None, cut=None):
+        self.seed = seed
+        self.cursor = int(cursor or 0)
+        self.decks = int(decks or 1)
+        self.packed = packed
+        self.cut = int(cut) if cut is not None else None
+
+    @classmethod
+    def new(cls, decks=1):
+        """Fresh shuffle from a CSPRNG-derived seed."""
+        return cls(seed=secrets.token_hex(16), cursor=0, decks=decks)
+
+    @classmethod
+    def from_state(cls, state: dict):
+        """Load the sidecar (or migrate a legacy state["deck"] list). None if there is no deck."""
+        data = state.get(cls.STATE_KEY)
+        if isinstance(data, dict) and (data.get("seed") or data.get("packed")):
+            return cls(seed=data.get("seed"), cursor=data.get("cursor", 0),
+                       decks=data.get("decks", 1), packed=data.get("packed"), cut=data.get("cut"))
+        legacy = state.get("deck")
+        if isinstance(legacy, list) and legacy:
+            # Deck.deal_card() pops from the end, so the deal order is reversed
+            return cls(packed="".join(str(c) for c in reversed(legacy)))
+        return None
+
+    def to_state(self, state: dict):
+        if self.packed is not None:
+            data = {"packed": self.packed, "cursor": self.cursor}
+        else:
+            data = {"seed": self.seed, "cursor": self.cursor}
+            if self.decks != 1:
+                data["decks"] = self.decks
+            if self.cut is not None:
+                data["cut"] = self.cut
+        state[self.STATE_KEY] = data
+        state.pop("deck", None)
+
+    @staticmethod
+    def clear(state: dict):
+        state.pop(CompactDeck.STATE_KEY, None)
+        state.pop("deck", None)
+
+    def __len__(self):
+        total = len(self.packed) // 2 if self.packed is not None else 52 * self.decks
+        return max(0, total - self.cursor)
+
+    def deal_code(self):
+        """Next card as a two-character code, or None when exhausted."""
+        if self.packed is not None:
+            i = self.cursor * 2
+            if i + 2 > len(self.packed):
+                return None
+            self.cursor += 1
+            return self.packed[i:i + 2]
+        order = shuffled_codes(self.seed, self.decks)
+        if self.cursor >= len(order):
+            return None
+        code = order[self.cursor]
+        self.cursor += 1
+        return code
+
+    def deal_card(self):
+        code = self.deal_code()
+        return Card.from_output_format(code) if code else None
+
+
+class Shoe(CompactDeck):
+    """
+    N decks shuffled together with a cut card, kept across rounds.
+
+    Same sidecar as CompactDeck plus "cut": the position of the cut card. Once
+    the cursor passes it, the round in progress finishes from the shoe and the
+    next round starts from a fresh shuffle (for_round). Storage stays a seed
+    and two ints; the card order is the cached shuffled_codes() tuple, so a
+    deal is an index into it.
+    """
+
+    @classmethod
+    def new(cls, decks=6, penetration=0.75):
+        decks = max(1, int(decks))
+        total = 52 * decks
+        cut = max(1, min(total - 1, int(total * float(penetration))))
+        return cls(seed=secrets.token_hex(16), cursor=0, decks=decks, cut=cut)
+
+    @property
+    def past_cut(self) -> bool:
+        return self.cut is None or self.cursor >= self.cut
+
+    @classmethod
+    def for_round(cls, state: dict, decks=6, penetration=0.75):
+        """
+        The shoe to deal a new round from: the persisted one, unless it is
+        missing, past its cut card, or built for a different deck count.
+        Returns (shoe, reshuffled).
+        """
+        shoe = cls.from_state(state)
+        if shoe is None or shoe.packed is not None or shoe.decks != int(decks) or shoe.past_cut:
+            return cls.new(decks, penetration), True
+        return shoe, False
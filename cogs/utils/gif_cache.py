@@ -0,0 +1,116 @@
+import re
+import time
+import random
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ---------------- GIF cache config ----------------
+GIF_RESULTS_PER_QUERY = 20     # results pulled per upstream call, sampled locally afterwards
+GIF_TTL_SECS = 15 * 60         # positive entries
+GIF_NEGATIVE_TTL_SECS = 2 * 60 # "no result" entries (short so new content shows up)
+GIF_MAX_ENTRIES = 512          # LRU bound on distinct queries
+
+_WS_RE = re.compile(r"\s+")
+
+
+class GifFetchError(Exception):
+    """Upstream lookup failed (transport error, timeout, non-200); not the same as "no results"."""
+
+
+def normalize_gif_query(query: str) -> str:
+    """'  Happy   CAT ' -> 'happy cat' (the cache key)."""
+    return _WS_RE.sub(" ", (query or "").strip().lower())
+
+
+class GifCache:
+    """
+    Query -> list of GIF URLs, shared by bot.py and ChatMain.
+
+      • several results per query; resolve() picks one at random locally
+      • TTL on hits, shorter TTL on genuine misses (negative caching); a
+        fetch that raises is never cached, so an upstream hiccup isn't
+        remembered as "no GIF"
+      • single-flight: concurrent resolve() calls for the same query share
+        ONE upstream fetch instead of each hitting Tenor / crawl.php
+      • bounded LRU so a spammy room can't grow it without limit
+    """
+
+    def __init__(self, ttl: float = GIF_TTL_SECS, negative_ttl: float = GIF_NEGATIVE_TTL_SECS,
+                 max_entries: int = GIF_MAX_ENTRIES):
+        self.ttl = float(ttl)
+        self.negative_ttl = float(negative_ttl)
+        self.max_entries = int(max_entries)
+        self._entries = OrderedDict()  # key -> (expires_at, [urls])
+        self._inflight = {}            # key -> asyncio.Future
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "coalesced": 0, "fetch_errors": 0}
+
+    def _get(self, key: str) -> Optional[List[str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, urls = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return urls
+
+    def _put(self, key: str, urls: List[str]):
+        ttl = self.ttl if urls else self.negative_ttl
+        self._entries[key] = (time.monotonic() + ttl, urls)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_urls(self, query: str, fetch: Callable[[str], Awaitable[List[str]]]) -> List[str]:
+        """
+        Cached candidate list for query; fetch(query) is only called on a miss.
+        fetch returns [] for "nothing found" and raises (GifFetchError) on failure.
+        """
+        key = normalize_gif_query(query)
+        if not key:
+            return []
+
+        cached = self._get(key)
+        if cached is not None:
+            self.stats["hits" if cached else "negative_hits"] += 1
+            return cached
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(fut)
+
+        self.stats["misses"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            try:
+                urls = [u for u in (await fetch(query) or []) if u]
+            except Exception as e:
+                self.stats["fetch_errors"] += 1
+                if isinstance(e, GifFetchError):
+                    logger.warning("GIF fetch failed for %r: %s", query, e)
+                else:
+                    logger.warning("GIF fetch failed for %r", query, exc_info=True)
+                # waiters get "nothing this time"; the next call retries upstream
+                fut.set_result([])
+                return []
+            # de-dupe, keep order
+            urls = list(dict.fromkeys(urls))
+            self._put(key, urls)
+            fut.set_result(urls)
+            return urls
+        finally:
+            if not fut.done():
+                fut.set_result([])
+            self._inflight.pop(key, None)
+
+    async def resolve(self, query: str, fetch: Callable[[str], Awaitable[List[str]]]) -> Optional[str]:
+        """One random URL for query (None if nothing was found)."""
+        urls = await self.get_urls(query, fetch)
+        return random.choice(urls) if urls else None
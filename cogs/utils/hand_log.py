@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Hand log config ----------------
+HAND_LOG_DIR = os.getenv("HAND_LOG_DIR", os.path.join("data", "hand_logs"))  # one <room_id>.jsonl per room
+HAND_LOG_MAX_BYTES = int(os.getenv("HAND_LOG_MAX_BYTES", str(8 * 1024 * 1024)))  # rotate a room's file past this
+HAND_LOG_KEEP = int(os.getenv("HAND_LOG_KEEP", "3"))    # rotated files kept per room: <room_id>~1.jsonl (newest) ...
+HAND_LOG_FLUSH_SECS = 5
+
+# Events are staged on the state dict and only written once the state that
+# produced them has actually been saved (see MechanicsMain._save_if_current),
+# so a stale optimistic save never leaves phantom actions in the log.
+STAGING_KEY = "__hand_log"
+
+# Keys that never go into the hand_start snapshot
+_SNAPSHOT_SKIP = ("deck", "__deck", STAGING_KEY)
+
+
+def hand_id_for(seed: str) -> str:
+    """Public hand id derived from the (private) deck seed; safe to broadcast."""
+    return hashlib.sha256(str(seed).encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_state(state: dict) -> dict:
+    """Deep copy of the table as it was before a hand starts (deck excluded)."""
+    return json.loads(json.dumps({k: v for k, v in state.items() if k not in _SNAPSHOT_SKIP}))
+
+
+def log_event(state: dict, kind: str, **fields):
+    """
+    Stage one event for the hand in progress. No-op outside a hand.
+
+      {"t": "action", "hand": <hand_id>, "rev": <__rev>, "ts": <epoch>, "seat": ..., ...}
+
+    rev is the state's __rev when the event was recorded (ordering / drift checks only).
+    """
+    hand = state.get("hand_id")
+    if not hand:
+        return
+    rec = {"t": kind, "hand": hand, "rev": int(state.get("__rev") or 0), "ts": round(time.time(), 3)}
+    rec.update(fields)
+    state.setdefault(STAGING_KEY, []).append(rec)
+
+
+def take_staged(state: dict) -> list:
+    """Detach staged events from the state (always called before it is persisted)."""
+    return state.pop(STAGING_KEY, None) or []
+
+
+class HandLog:
+    """
+    Append-only per-room hand log (JSONL on disk).
+
+    Records per hand, in order:
+      hand_start  {"seed", "table": <pre-deal snapshot>}
+      action      {"seat", "pid", "action", "move"?, "amount"?, "auto"?}
+      leave       {"seat", "pid"}
+      advance     {}                      (timer advanced a finished betting round)
+      showdown    {"board", "payouts"}
+
+    Lines are buffered and appended from a worker thread every few seconds.
+    A room's file is rotated (<room_id>~1.jsonl, ~2, ... up to HAND_LOG_KEEP)
+    once it passes HAND_LOG_MAX_BYTES, always at a hand_start so no hand is
+    split across files.
+    """
+
+    def __init__(self, directory: str = HAND_LOG_DIR, max_bytes: int = HAND_LOG_MAX_BYTES,
+                 keep: int = HAND_LOG_KEEP):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.keep = max(0, int(keep))
+        self._pending = {}          # room_id -> [json line, ...]
+        self._flush_task = None
+        self.stats = {"events": 0, "hands": 0, "write_failures": 0}
+
+    def path_for(self, room_id: str, generation: int = 0) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", str(room_id)) or "_"
+        # "~" can't appear in a sanitized id, so rotated names never collide with a room's
+        suffix = f"~{generation}" if generation else ""
+        return os.path.join(self.directory, f"{safe}{suffix}.jsonl")
+
+    def commit(self, room_id: str, events: list):
+        """Queue events whose state was saved successfully."""
+        if not events or not self.directory:
+            return
+        lines = self._pending.setdefault(str(room_id), [])
+        for rec in events:
+            if rec.get("t") == "hand_start":
+                self.stats["hands"] += 1
+            lines.append(json.dumps(rec, separators=(",", ":")))
+        self.stats["events"] += len(events)
+        self._ensure_flusher()
+
+    def _rotate(self, room_id: str):
+        if self.keep <= 0:
+            os.remove(self.path_for(room_id))
+            return
+        oldest = self.path_for(room_id, self.keep)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for gen in range(self.keep - 1, -1, -1):
+            src = self.path_for(room_id, gen)
+            if os.path.exists(src):
+                os.replace(src, self.path_for(room_id, gen + 1))
+
+    def _append_room(self, room_id: str, lines: list):
+        path = self.path_for(room_id)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if self.max_bytes > 0 and size >= self.max_bytes:
+            # finish the hand in progress in the old file, start the new one at a hand_start
+            cut = next((i for i, line in enumerate(lines) if line.startswith('{"t":"hand_start"')), None)
+            if cut is not None:
+                if cut:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write("\n".join(lines[:cut]) + "\n")
+                self._rotate(room_id)
+                lines = lines[cut:]
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _append_lines(self, batch: dict) -> set:
+        """Write each room's lines; returns the rooms that were written completely."""
+        os.makedirs(self.directory, exist_ok=True)
+        done = set()
+        for room_id, lines in batch.items():
+            try:
+                self._append_room(room_id, lines)
+                done.add(room_id)
+            except Exception:
+                logger.exception("Failed to append hand log for room %s", room_id)
+        return done
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            done = await asyncio.to_thread(self._append_lines, batch)
+        except Exception:
+            done = set()
+            logger.exception("Failed to flush hand log to %s", self.directory)
+        failed = [room_id for room_id in batch if room_id not in done]
+        if failed:
+            self.stats["write_failures"] += 1
+            # put only the unwritten rooms back, in front of anything queued meanwhile
+            for room_id in failed:
+                self._pending[room_id] = batch[room_id] + self._pending.get(room_id, [])
+
+    def _ensure_flusher(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            self._flush_task = None
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(HAND_LOG_FLUSH_SECS)
+                await self.flush()
+            except asyncio.CancelledError:
+                await self.flush()
+                raise
+            except Exception:
+                logger.exception("Hand log flush loop error")
+
+    def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()   # the loop flushes once more on cancel
+            self._flush_task = None
+
+
+# ---------------- Reading ----------------
+
+def read_hands(path: str, hand_id: Optional[str] = None) -> Iterator[dict]:
+    """
+    Group a room log into hands:
+      {"hand": id, "start": <hand_start record>, "events": [records after it]}
+    Events logged before a hand's hand_start (e.g. a log that begins mid-hand) are skipped.
+    """
+    current = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except Exception:
+                logger.warning("Skipping bad hand log line in %s", path)
+                continue
+            if rec.get("t") == "hand_start":
+                if current is not None and (hand_id is None or current["hand"] == hand_id):
+                    yield current
+                current = {"hand": rec.get("hand"), "start": rec, "events": []}
+            elif current is not None and rec.get("hand") == current["hand"]:
+                current["events"].append(rec)
+    if current is not None and (hand_id is None or current["hand"] == hand_id):
+        yield current
@@ -0,0 +1,296 @@
+import os
+import re
+import json
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Iterable, Iterator, List, Optional
+
+from cogs.utils.answer_match import precompute_answer_keys
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Jeopardy bank config ----------------
+JEOPARDY_BANK_PATH = os.getenv(
+    "JEOPARDY_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "jeopardy.sqlite"),
+)
+JEOPARDY_PREFETCH_BOARDS = int(os.getenv("JEOPARDY_PREFETCH_BOARDS", "3"))  # boards kept ready
+JEOPARDY_MMAP_BYTES = 256 * 1024 * 1024   # SQLite reads through mmap instead of read() syscalls
+
+BOARD_CATEGORIES = 5          # per round
+BOARD_VALUES = (200, 400, 600, 800, 1000)
+IMPORT_BATCH = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id       INTEGER PRIMARY KEY,
+    name     TEXT NOT NULL,
+    show     TEXT NOT NULL DEFAULT '',
+    round    TEXT NOT NULL DEFAULT '',
+    n_values INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (name, show, round)
+);
+CREATE TABLE IF NOT EXISTS clues (
+    id          INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    value       INTEGER,
+    question    TEXT NOT NULL,
+    answer      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clues_category_value ON clues (category_id, value);
+CREATE INDEX IF NOT EXISTS idx_categories_boardable ON categories (round, n_values);
+"""
+
+_VALUE_RE = re.compile(r"[^0-9]")
+
+
+def _parse_value(value) -> Optional[int]:
+    """200, "$200", "$1,200" -> int; None / "None" / "" -> None."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) or None
+    digits = _VALUE_RE.sub("", str(value))
+    return int(digits) if digits else None
+
+
+def _round_key(value) -> str:
+    """'Jeopardy!' / 'Double Jeopardy!' / 'Final Jeopardy!' / anything else -> '', 'double', 'final'."""
+    text = str(value or "").lower()
+    if "final" in text:
+        return "final"
+    if "double" in text:
+        return "double"
+    return ""
+
+
+def iter_source_rows(path: str) -> Iterator[dict]:
+    """
+    Flat clue dicts from a .json / .jsonl dump. Accepts both shapes seen in the wild:
+      • flat:    {"category", "value", "question", "answer", "round"?, "show_number"?}
+      • grouped: {"category", "questions": [{"question", "answer", "value"}, ...]}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            items = (json.loads(line) for line in f if line.strip())
+        else:
+            items = json.load(f)
+            if isinstance(items, dict):
+                items = items.get("clues") or items.get("data") or []
+        for item in items:
+            if not isinstance(item, dict) or not item.get("category"):
+                continue
+            if isinstance(item.get("questions"), list):
+                for q in item["questions"]:
+                    if isinstance(q, dict):
+                        yield {"category": item["category"], "show": str(item.get("show_number") or ""),
+                               "round": item.get("round"), **q}
+            else:
+                yield {**item, "show": str(item.get("show_number") or "")}
+
+
+def import_rows(db_path: str, rows: Iterable[dict], replace: bool = False) -> int:
+    """
+    Load clue dicts into the SQLite bank at db_path (created if missing).
+    Clues are grouped per (category, show, round) so a board category is one
+    coherent set of clues, then n_values is refreshed for board sampling.
+    Returns the number of clues inserted.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(SCHEMA)
+        if replace:
+            conn.execute("DELETE FROM clues")
+            conn.execute("DELETE FROM categories")
+        cat_ids = {}
+        batch, inserted = [], 0
+        for row in rows:
+            question, answer = str(row.get("question") or "").strip(), str(row.get("answer") or "").strip()
+            name = str(row.get("category") or "").strip()
+            if not (question and answer and name):
+                continue
+            key = (name, str(row.get("show") or ""), _round_key(row.get("round")))
+            cat_id = cat_ids.get(key)
+            if cat_id is None:
+                conn.execute("INSERT OR IGNORE INTO categories (name, show, round) VALUES (?, ?, ?)", key)
+                cat_id = cat_ids[key] = conn.execute(
+                    "SELECT id FROM categories WHERE name = ? AND show = ? AND round = ?", key
+                ).fetchone()[0]
+            batch.append((cat_id, _parse_value(row.get("value")), question, answer))
+            if len(batch) >= IMPORT_BATCH:
+                conn.executemany("INSERT INTO clues (category_id, value, question, answer) VALUES (?, ?, ?, ?)", batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            conn.executemany("INSERT INTO clues (category_id, value, question, answer) VALUES (?, ?, ?, ?)", batch)
+            inserted += len(batch)
+        conn.execute(
+            "UPDATE categories SET n_values = (SELECT COUNT(DISTINCT value) FROM clues "
+            "WHERE clues.category_id = categories.id AND value IS NOT NULL)"
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+        return inserted
+    finally:
+        conn.close()
+
+
+class JeopardyBank:
+    """
+    Local question bank + board prefetcher for cogs/games/jeopardy.py.
+
+      • clues live in a SQLite file indexed by (category, value); building a
+        board is a handful of indexed reads, no network
+      • JEOPARDY_PREFETCH_BOARDS boards are built ahead of time in a worker
+        thread, so take_board() is normally just a pop
+      • jeopardy.py is re-imported per game by game_main, so the ready boards
+        live here (a normal module) to survive between games
+    """
+
+    def __init__(self, path: str = JEOPARDY_BANK_PATH, prefetch: int = JEOPARDY_PREFETCH_BOARDS):
+        self.path = path
+        self.prefetch = max(0, int(prefetch))
+        self._ready = deque()
+        self._refill = None
+        self._local = threading.local()   # one read-only connection per worker thread
+        self._pools = None                # (mtime, [(board category id, name)], [final category id])
+        self._pool_lock = threading.Lock()
+        self.stats = {"served_ready": 0, "built_on_demand": 0, "build_errors": 0}
+
+    def available(self) -> bool:
+        return os.path.isfile(self.path)
+
+    # ---------------- sync side (worker thread) ----------------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            conn.execute(f"PRAGMA mmap_size = {JEOPARDY_MMAP_BYTES}")
+            self._local.conn = conn
+        return conn
+
+    def _category_pools(self):
+        mtime = os.path.getmtime(self.path)
+        with self._pool_lock:
+            if self._pools is None or self._pools[0] != mtime:
+                conn = self._conn()
+                board = conn.execute(
+                    "SELECT id, name FROM categories WHERE round != 'final' AND n_values >= ?", (len(BOARD_VALUES),)
+                ).fetchall()
+                final = [r[0] for r in conn.execute("SELECT id FROM categories WHERE round = 'final'")]
+                self._pools = (mtime, board, final)
+                logger.info(f"Jeopardy bank: {len(board)} board categories, {len(final)} final categories")
+            return self._pools[1], self._pools[2]
+
+    def _category(self, cat_id: int, multiplier: int) -> dict:
+        conn = self._conn()
+        name = conn.execute("SELECT name FROM categories WHERE id = ?", (cat_id,)).fetchone()[0]
+        by_value = {}
+        for value, question, answer in conn.execute(
+                "SELECT value, question, answer FROM clues WHERE category_id = ? AND value IS NOT NULL", (cat_id,)):
+            by_value.setdefault(value, []).append((question, answer))
+        # Most common values are the real board slots (odd ones are Daily Double wagers)
+        slots = sorted(sorted(by_value, key=lambda v: (-len(by_value[v]), v))[:len(BOARD_VALUES)])
+        questions = []
+        for value, board_value in zip(slots, BOARD_VALUES):
+            question, answer = random.choice(by_value[value])
+            questions.append({"category": name, "question": question, "answer": answer,
+                              "value": board_value * multiplier, "guessed": False})
+        return {"category": name, "questions": questions}
+
+    @staticmethod
+    def _pick_categories(board_pool: List[tuple], n: int) -> List[int]:
+        """n random category ids with distinct names (the board UI looks categories up by name)."""
+        picked, names = [], set()
+        for cat_id, name in random.sample(board_pool, min(len(board_pool), 4 * n)):
+            if name not in names:
+                names.add(name)
+                picked.append(cat_id)
+                if len(picked) == n:
+                    break
+        return picked
+
+    def _final(self, final_ids: List[int], board_pool: List[tuple]) -> Optional[dict]:
+        conn = self._conn()
+        cat_id = random.choice(final_ids) if final_ids else random.choice(board_pool)[0]
+        name = conn.execute("SELECT name FROM categories WHERE id = ?", (cat_id,)).fetchone()[0]
+        clues = conn.execute("SELECT question, answer FROM clues WHERE category_id = ?", (cat_id,)).fetchall()
+        if not clues:
+            return None
+        question, answer = random.choice(clues)
+        return {"category": name, "question": question, "answer": answer}
+
+    @staticmethod
+    def _place_daily_doubles(categories: List[dict], count: int):
+        slots = [(ci, qi) for ci, cat in enumerate(categories) for qi in range(len(cat["questions"]))]
+        for ci, qi in random.sample(slots, min(count, len(slots))):
+            categories[ci]["questions"][qi]["daily_double"] = True
+
+    def build_board(self) -> Optional[dict]:
+        """
+        One full game: {"normal": [5 categories], "double": [5 categories], "final": {...}}
+        in the shapes NewJeopardyGame stores. None if the bank is missing or too small.
+        """
+        if not self.available():
+            return None
+        board_pool, final_ids = self._category_pools()
+        picked = self._pick_categories(board_pool, 2 * BOARD_CATEGORIES)
+        if len(picked) < 2 * BOARD_CATEGORIES:
+            logger.warning(f"Jeopardy bank at {self.path} has too few usable categories ({len(board_pool)})")
+            return None
+        normal = [self._category(c, 1) for c in picked[:BOARD_CATEGORIES]]
+        double = [self._category(c, 2) for c in picked[BOARD_CATEGORIES:]]
+        self._place_daily_doubles(normal, 1)
+        self._place_daily_doubles(double, 2)
+        final = self._final(final_ids, board_pool)
+        if final is None:
+            return None
+        board = {"normal": normal, "double": double, "final": final}
+        precompute_answer_keys(board)   # answers are normalized here, in the worker thread
+        return board
+
+    # ---------------- async side ----------------
+
+    async def _build(self) -> Optional[dict]:
+        try:
+            return await asyncio.to_thread(self.build_board)
+        except Exception as e:
+            self.stats["build_errors"] += 1
+            logger.error(f"Failed to build Jeopardy board from {self.path}: {e}", exc_info=True)
+            return None
+
+    async def _fill(self):
+        while len(self._ready) < self.prefetch:
+            board = await self._build()
+            if board is None:
+                return
+            self._ready.append(board)
+
+    def start(self):
+        """Top the ready queue up in the background (call inside the running loop)."""
+        if not self.prefetch or not self.available():
+            return
+        if self._refill is None or self._refill.done():
+            self._refill = asyncio.create_task(self._fill(), name="jeopardy-prefetch")
+
+    async def take_board(self) -> Optional[dict]:
+        """A ready board (built now if none are queued), or None if there is no usable bank."""
+        if self._ready:
+            board = self._ready.popleft()
+            self.stats["served_ready"] += 1
+        else:
+            board = await self._build()
+            if board is not None:
+                self.stats["built_on_demand"] += 1
+        self.start()
+        return board
+
+
+# Process-wide bank (jeopardy.py takes boards from it; bot.py warms it at startup)
+JEOPARDY_BANK = JeopardyBank()
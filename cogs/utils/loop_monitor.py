@@ -0,0 +1,224 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+from cogs.utils.metrics import REGISTRY as METRICS, percentiles
+
+logger = logging.getLogger(__name__)
+
+# How often the lag probe wakes up; its overshoot is the scheduling lag.
+LOOP_LAG_PROBE_SECS = float(os.getenv("LOOP_LAG_PROBE_SECS", "0.1"))
+# A single callback / task step (or a lag sample) longer than this is recorded as a stall (0 disables).
+LOOP_SLOW_CALLBACK_SECS = float(os.getenv("LOOP_SLOW_CALLBACK_SECS", "0.1"))
+# Opt-in per-callback timing (see LoopMonitor); off by default because it patches a private asyncio class.
+LOOP_CALLBACK_TIMING = os.getenv("LOOP_CALLBACK_TIMING", "").lower() in ("1", "true", "yes")
+# Period of the summary log line (0 disables).
+LOOP_SUMMARY_SECS = float(os.getenv("LOOP_SUMMARY_SECS", "60"))
+# Also turn on asyncio's own debug mode (coroutine origin tracking, much slower).
+LOOP_ASYNCIO_DEBUG = os.getenv("LOOP_ASYNCIO_DEBUG", "").lower() in ("1", "true", "yes")
+
+LAG_WINDOW = 600        # probe samples kept for percentiles (~1 min at 0.1s)
+RECENT_STALLS = 50
+
+# Where the running code came from: {"route": "/game_was", "room": "123"} etc.
+# Tasks copy the context at creation, so a tag set in a WS handler covers every step of it.
+_TAG = contextvars.ContextVar("loop_monitor_tag", default=None)
+
+
+def _describe(handle) -> str:
+    """Coroutine (for task steps) or function name behind a loop callback."""
+    cb = getattr(handle, "_callback", None)
+    owner = getattr(cb, "__self__", None)
+    if isinstance(owner, asyncio.Future) and hasattr(owner, "get_coro"):
+        coro = owner.get_coro()
+        return getattr(coro, "__qualname__", None) or repr(coro)
+    return getattr(cb, "__qualname__", None) or repr(cb)
+
+
+class LoopMonitor:
+    """
+    Event-loop health for the bot process.
+
+      • a probe task samples scheduling lag every LOOP_LAG_PROBE_SECS; a
+        sample over LOOP_SLOW_CALLBACK_SECS is recorded as an (unattributed) stall
+      • with LOOP_CALLBACK_TIMING=1, every loop callback is timed instead and
+        slow ones are recorded with the coroutine name and the tag (route /
+        cog / room) of the code that ran, via tag() / tagged()
+      • LOOP_ASYNCIO_DEBUG=1 turns on asyncio's debug mode, which logs slow
+        callbacks itself (slow_callback_duration) at a much higher cost
+      • snapshot() backs the /loop_health route; a summary is logged every
+        LOOP_SUMMARY_SECS and reset
+
+    Callback timing wraps asyncio.events.Handle._run process-wide. That is a
+    private CPython detail: it is skipped on loops that don't run stdlib
+    Handles (uvloop) and may need revisiting on interpreter upgrades.
+    """
+
+    def __init__(self, probe: float = LOOP_LAG_PROBE_SECS, slow: float = LOOP_SLOW_CALLBACK_SECS,
+                 summary: float = LOOP_SUMMARY_SECS, callback_timing: bool = LOOP_CALLBACK_TIMING):
+        self.probe = float(probe)
+        self.slow = float(slow)
+        self.summary = float(summary)
+        self.callback_timing = bool(callback_timing)
+        self.lag = deque(maxlen=LAG_WINDOW)
+        self.recent = deque(maxlen=RECENT_STALLS)
+        self.offenders = {}         # (where, what) -> [count, total_secs, max_secs]
+        self.window = {"stalls": 0, "stall_secs": 0.0, "max_lag": 0.0}
+        self.started_at = None
+        self._task = None
+        self._orig_run = None
+
+    # ---------------- attribution ----------------
+
+    @staticmethod
+    def tag(**labels):
+        """Merge labels into the current task's tag; returns a token for untag()."""
+        cur = _TAG.get()
+        merged = dict(cur) if cur else {}
+        merged.update({k: str(v) for k, v in labels.items() if v is not None})
+        return _TAG.set(merged)
+
+    @staticmethod
+    def untag(token):
+        try:
+            _TAG.reset(token)
+        except (ValueError, LookupError):
+            pass
+
+    @contextmanager
+    def tagged(self, **labels):
+        token = self.tag(**labels)
+        try:
+            yield
+        finally:
+            self.untag(token)
+
+    # ---------------- lifecycle ----------------
+
+    def start(self):
+        """Start the probe, plus the opt-in callback timer (call inside the running loop)."""
+        if self._task is not None and not self._task.done():
+            return
+        loop = asyncio.get_running_loop()
+        if LOOP_ASYNCIO_DEBUG:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.slow or 0.1
+        if self.callback_timing and self.slow > 0 and self._orig_run is None:
+            if isinstance(loop, asyncio.BaseEventLoop) and hasattr(asyncio.events.Handle, "_run"):
+                self._install_hook()
+            else:
+                logger.warning(f"LOOP_CALLBACK_TIMING ignored: {type(loop).__name__} doesn't run asyncio Handles")
+        self.started_at = time.time()
+        self._task = asyncio.create_task(self._run(), name="loop-monitor")
+        logger.info(f"Loop monitor started (probe={self.probe}s, slow={self.slow}s, summary={self.summary}s, "
+                    f"callback timing={'on' if self._orig_run is not None else 'off'})")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._orig_run is not None:
+            asyncio.events.Handle._run = self._orig_run
+            self._orig_run = None
+
+    def _install_hook(self):
+        orig = asyncio.events.Handle._run
+        monitor = self
+        perf = time.perf_counter
+
+        def _timed_run(handle):
+            t0 = perf()
+            try:
+                return orig(handle)
+            finally:
+                dt = perf() - t0
+                if dt >= monitor.slow:
+                    monitor._record_stall(handle, dt)
+
+        self._orig_run = orig
+        asyncio.events.Handle._run = _timed_run
+
+    def _record_stall(self, handle, dt: float):
+        try:
+            if handle is None:
+                # seen by the lag probe only: something blocked the loop, culprit unknown
+                labels, where, what = {}, "lag-probe", "unattributed"
+            else:
+                ctx = getattr(handle, "_context", None)
+                labels = (ctx.get(_TAG) if ctx is not None else None) or {}
+                where = " ".join(f"{k}={v}" for k, v in sorted(labels.items())) or "untagged"
+                what = _describe(handle)
+            entry = self.offenders.get((where, what))
+            if entry is None:
+                entry = self.offenders[(where, what)] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += dt
+            entry[2] = max(entry[2], dt)
+            self.window["stalls"] += 1
+            self.window["stall_secs"] += dt
+            self.recent.append({"ts": int(time.time()), "secs": round(dt, 4), "where": where, "what": what})
+            METRICS.inc("loop_slow_callbacks_total", source=labels.get("route") or labels.get("source") or "other")
+        except Exception:
+            pass  # never let bookkeeping break the loop
+
+    async def _run(self):
+        next_summary = time.monotonic() + self.summary if self.summary > 0 else None
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.probe)
+            lag = max(0.0, time.perf_counter() - t0 - self.probe)
+            self.lag.append(lag)
+            if lag > self.window["max_lag"]:
+                self.window["max_lag"] = lag
+            METRICS.observe("loop_lag_seconds", lag)
+            if self._orig_run is None and self.slow > 0 and lag >= self.slow:
+                self._record_stall(None, lag)
+            if next_summary is not None and time.monotonic() >= next_summary:
+                next_summary = time.monotonic() + self.summary
+                self._log_summary()
+
+    # ---------------- reporting ----------------
+
+    def top(self, n: int = 10) -> list:
+        rows = sorted(self.offenders.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+        return [{"where": where, "what": what, "count": c, "total_secs": round(total, 4), "max_secs": round(mx, 4)}
+                for (where, what), (c, total, mx) in rows]
+
+    def snapshot(self, n: int = 10) -> dict:
+        return {
+            "since": self.started_at,
+            "probe_secs": self.probe,
+            "slow_callback_secs": self.slow,
+            "lag": {k: round(v, 6) for k, v in percentiles(list(self.lag)).items()},
+            "lag_samples": len(self.lag),
+            "stalls_total": sum(e[0] for e in self.offenders.values()),
+            "top": self.top(n),
+            "recent": list(self.recent)[-n:],
+        }
+
+    def reset(self):
+        self.lag.clear()
+        self.recent.clear()
+        self.offenders.clear()
+        self.window = {"stalls": 0, "stall_secs": 0.0, "max_lag": 0.0}
+
+    def _log_summary(self):
+        p = percentiles(list(self.lag))
+        w = self.window
+        self.window = {"stalls": 0, "stall_secs": 0.0, "max_lag": 0.0}
+        line = (f"[LOOP] lag p50={p.get('p50', 0) * 1000:.1f}ms p99={p.get('p99', 0) * 1000:.1f}ms "
+                f"max={w['max_lag'] * 1000:.1f}ms; {w['stalls']} stalls ({w['stall_secs']:.2f}s)")
+        if w["stalls"]:
+            worst = "; ".join(f"{o['what']} [{o['where']}] x{o['count']} max {o['max_secs'] * 1000:.0f}ms"
+                              for o in self.top(3))
+            logger.warning(f"{line}; worst since start: {worst}")
+        else:
+            logger.info(line)
+
+
+# Process-wide monitor (bot.py starts it; handlers and cogs tag their work)
+LOOP_MONITOR = LoopMonitor()
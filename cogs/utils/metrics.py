@@ -0,0 +1,155 @@
+import math
+import time
+import bisect
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help)
+METRIC_HELP = {
+    "http_requests_total": ("counter", "HTTP requests by method, route and status."),
+    "http_request_duration_seconds": ("histogram", "HTTP handler latency by route."),
+    "ws_frames_total": ("counter", "WebSocket TEXT frames handled by endpoint."),
+    "ws_frame_seconds": ("histogram", "Time spent handling one WebSocket frame."),
+    "db_seconds": ("histogram", "DB helper latency (connect + query) by source and op."),
+    "db_errors_total": ("counter", "DB helper failures by source and op."),
+    "game_tick_seconds": ("histogram", "check_game_timers time per room."),
+    "broadcast_seconds": ("histogram", "Fan-out latency by broadcaster."),
+    "broadcast_recipients_total": ("counter", "Sockets targeted by broadcaster."),
+    "loop_lag_seconds": ("histogram", "Event-loop scheduling lag seen by the loop monitor probe."),
+    "loop_slow_callbacks_total": ("counter", "Loop callbacks over LOOP_SLOW_CALLBACK_SECS by source."),
+    "equity_seconds": ("histogram", "Uncached poker equity estimates (wall time, incl. yields)."),
+}
+
+
+def percentiles(values, ps=(50, 95, 99)) -> dict:
+    """Nearest-rank percentiles of a list of numbers plus the max ({} when empty)."""
+    if not values:
+        return {}
+    data = sorted(values)
+    n = len(data)
+    out = {f"p{p}": data[max(0, min(n - 1, math.ceil(p / 100.0 * n) - 1))] for p in ps}
+    out["max"] = data[-1]
+    return out
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, nbuckets: int):
+        self.counts = [0] * (nbuckets + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    Tiny in-process metrics store (no external deps).
+
+      REGISTRY.inc("ws_frames_total", endpoint="/chat_ws")
+      REGISTRY.observe("db_seconds", 0.012, source="holdem", op="load_state")
+      with REGISTRY.timer("game_tick_seconds", game="blackjack", room=rid): ...
+      async for msg in REGISTRY.timed_iter(ws, "ws_frame_seconds", endpoint="/chat_ws"): ...
+
+    render() returns Prometheus text exposition format for the /metrics route.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}    # name -> {label_tuple: float}
+        self._hists = {}       # name -> {label_tuple: _Histogram}
+
+    @staticmethod
+    def _key(labels: dict) -> tuple:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = self._key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        series = self._hists.setdefault(name, {})
+        key = self._key(labels)
+        h = series.get(key)
+        if h is None:
+            h = series[key] = _Histogram(len(self.buckets))
+        h.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        h.sum += seconds
+        h.count += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe wall time of the block (works across awaits)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    async def timed_iter(self, items, name: str, when=None, **labels):
+        """
+        Re-yield an async iterable, observing how long the consumer spent on each
+        item (from the yield until it asks for the next one). Times an
+        `async for` body without wrapping it; `when(item)` picks which items count.
+        """
+        async for item in items:
+            t0 = time.perf_counter()
+            yield item
+            if when is None or when(item):
+                self.observe(name, time.perf_counter() - t0, **labels)
+
+    def forget(self, **labels):
+        """Drop every series whose labels include all of the given pairs (e.g. room=<id>)."""
+        want = set(self._key(labels))
+        for store in (self._counters, self._hists):
+            for series in store.values():
+                for key in [k for k in series if want.issubset(k)]:
+                    series.pop(key, None)
+
+    # ---------------- exposition ----------------
+
+    @staticmethod
+    def _fmt_labels(key: tuple, extra: tuple = ()) -> str:
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        inner = ",".join(
+            '%s="%s"' % (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+            for k, v in pairs
+        )
+        return "{" + inner + "}"
+
+    @staticmethod
+    def _fmt_num(v: float) -> str:
+        return repr(float(v)) if isinstance(v, float) else str(v)
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._counters):
+            kind, help_ = METRIC_HELP.get(name, ("counter", name))
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} counter")
+            for key, v in self._counters[name].items():
+                lines.append(f"{name}{self._fmt_labels(key)} {self._fmt_num(v)}")
+        for name in sorted(self._hists):
+            kind, help_ = METRIC_HELP.get(name, ("histogram", name))
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in self._hists[name].items():
+                cum = 0
+                for ub, c in zip(self.buckets, h.counts):
+                    cum += c
+                    lines.append(f"{name}_bucket{self._fmt_labels(key, (('le', repr(ub)),))} {cum}")
+                lines.append(f"{name}_bucket{self._fmt_labels(key, (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{name}_sum{self._fmt_labels(key)} {h.sum!r}")
+                lines.append(f"{name}_count{self._fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry (bot.py, cogs and utils all import this one)
+REGISTRY = MetricsRegistry()
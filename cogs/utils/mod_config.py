@@ -0,0 +1,195 @@
+import time
+import asyncio
+import logging
+from typing import Optional
+
+import aiomysql
+
+from cogs.utils.metrics import REGISTRY as METRICS
+
+logger = logging.getLogger(__name__)
+
+# Safety net only: the site signals edits through /settings_saved, which invalidates.
+MOD_CONFIG_TTL_SECS = 30 * 60
+
+# Same defaults as the site's PHP when a guild has no bot_flag_actions row
+ACTION_DEFAULTS = {
+    "first_flag": "show_rules_disable_chat",
+    "second_flag": "timeout_1h",
+    "final_flag": "ban",
+    "instant_ban_behavior": "none",
+}
+
+
+def default_mod_config() -> dict:
+    return {"reasons": [], "actions": dict(ACTION_DEFAULTS),
+            "quarantine_role_name": None, "quarantine_channel_name": None, "degraded": True}
+
+
+async def _fetch_use_custom(cursor, guild_id: str) -> int:
+    try:
+        await cursor.execute("SELECT use_custom FROM bot_use_custom WHERE guild_id = %s", (guild_id,))
+        row = await cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else 0
+    except Exception as e:
+        logger.error(f"Failed to read bot_use_custom for guild {guild_id}: {e}", exc_info=True)
+        return 0  # fall back to the DEFAULT reasons
+
+
+async def _fetch_actions(cursor, guild_id: str) -> Optional[dict]:
+    """bot_flag_actions with ACTION_DEFAULTS filled in; None if the query failed."""
+    try:
+        await cursor.execute(
+            "SELECT first_flag, second_flag, final_flag, instant_ban_behavior "
+            "FROM bot_flag_actions WHERE guild_id = %s",
+            (guild_id,)
+        )
+        row = await cursor.fetchone()
+    except Exception as e:
+        logger.error(f"Failed to read bot_flag_actions for guild {guild_id}: {e}", exc_info=True)
+        return None
+    actions = dict(ACTION_DEFAULTS)
+    if row:
+        for key, value in zip(("first_flag", "second_flag", "final_flag", "instant_ban_behavior"), row):
+            actions[key] = value or ACTION_DEFAULTS[key]
+    return actions
+
+
+async def _fetch_quarantine_names(cursor, guild_id: str) -> Optional[tuple]:
+    """(role name, channel name) from bot_flag_action_options; None if the query failed."""
+    try:
+        await cursor.execute(
+            "SELECT quarantine_role_name, quarantine_channel_name FROM bot_flag_action_options WHERE guild_id = %s",
+            (guild_id,)
+        )
+        row = await cursor.fetchone()
+    except Exception as e:
+        logger.error(f"Failed to read bot_flag_action_options for guild {guild_id}: {e}", exc_info=True)
+        return None
+    return (row[0], row[1]) if row else (None, None)
+
+
+async def fetch_mod_config(db_user: str, db_password: str, db_host: str, guild_id: str) -> Optional[dict]:
+    """
+    Everything the flag UI and quarantine paths read for one guild, on one connection:
+      • flag reasons (guild's own if bot_use_custom.use_custom = 1, else 'DEFAULT')
+      • bot_flag_actions (with ACTION_DEFAULTS)
+      • bot_flag_action_options quarantine role / channel names
+    Returns None only if the connection or the reasons query fails, so that isn't
+    cached. The other queries fall back on their own (use_custom -> 0, actions ->
+    ACTION_DEFAULTS, quarantine names -> None) and mark the result "degraded".
+    """
+    if not all([db_user, db_password, db_host]):
+        logger.error("Missing DB credentials; cannot load moderation config.")
+        return None
+    conn = None
+    try:
+        with METRICS.timer("db_seconds", source="mod_config", op="load"):
+            conn = await aiomysql.connect(
+                host=db_host,
+                user=db_user,
+                password=db_password,
+                db="serene_users",
+                charset='utf8mb4',
+                autocommit=True
+            )
+            async with conn.cursor() as cursor:
+                use_custom = await _fetch_use_custom(cursor, guild_id)
+
+                if use_custom == 1:
+                    await cursor.execute(
+                        "SELECT reason FROM rule_flagging WHERE guild_id = %s ORDER BY rule_class ASC, id ASC",
+                        (guild_id,)
+                    )
+                else:
+                    await cursor.execute(
+                        "SELECT reason FROM rule_flagging WHERE guild_id = 'DEFAULT' ORDER BY rule_class ASC, id ASC"
+                    )
+                reasons = []
+                for r in await cursor.fetchall() or []:
+                    if r[0] and r[0] not in reasons:
+                        reasons.append(r[0])
+
+                actions = await _fetch_actions(cursor, guild_id)
+                names = await _fetch_quarantine_names(cursor, guild_id)
+
+        degraded = actions is None or names is None
+        if degraded:
+            METRICS.inc("db_errors_total", source="mod_config", op="load_partial")
+        return {
+            "reasons": reasons,
+            "actions": actions if actions is not None else dict(ACTION_DEFAULTS),
+            "quarantine_role_name": names[0] if names else None,
+            "quarantine_channel_name": names[1] if names else None,
+            "degraded": degraded,
+        }
+    except Exception as e:
+        METRICS.inc("db_errors_total", source="mod_config", op="load")
+        logger.error(f"Failed to load moderation config for guild {guild_id}: {e}", exc_info=True)
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+class ModConfigCache:
+    """
+    guild_id -> moderation config (see fetch_mod_config).
+
+    Shared by flag.py (menu + confirm) and bot.py (quarantine accept button),
+    so opening the flag menu costs no DB round-trip after the first time.
+      • concurrent misses for one guild share a single load
+      • failed or degraded loads are NOT cached
+      • bot.py invalidates on /settings_saved and on the admin_ws
+        "invalidate_mod_config" op
+    """
+
+    def __init__(self, ttl: float = MOD_CONFIG_TTL_SECS):
+        self.ttl = float(ttl)
+        self._entries = {}    # guild_id -> (expires_at, config)
+        self._inflight = {}   # guild_id -> asyncio.Future
+        self._generation = 0  # bumped by invalidate() so an in-flight load can't re-cache stale data
+
+    async def get(self, guild_id, db_user: str, db_password: str, db_host: str) -> dict:
+        """Cached config for the guild, or defaults (uncached) if it can't be loaded."""
+        gid = str(guild_id)
+        entry = self._entries.get(gid)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                return entry[1]
+            self._entries.pop(gid, None)
+
+        fut = self._inflight.get(gid)
+        if fut is not None:
+            cfg = await asyncio.shield(fut)
+            return cfg or default_mod_config()
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[gid] = fut
+        generation = self._generation
+        cfg = None
+        try:
+            cfg = await fetch_mod_config(db_user, db_password, db_host, gid)
+            # a degraded load (some table unreadable, defaults used) is served but not cached
+            if cfg is not None and not cfg.get("degraded") and generation == self._generation:
+                self._entries[gid] = (time.monotonic() + self.ttl, cfg)
+            return cfg or default_mod_config()
+        finally:
+            if not fut.done():
+                fut.set_result(cfg)
+            self._inflight.pop(gid, None)
+
+    def invalidate(self, guild_id=None):
+        """Drop one guild (or every guild when guild_id is None)."""
+        self._generation += 1
+        if guild_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(guild_id), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide cache (flag.py and bot.py use this one)
+MOD_CONFIGS = ModConfigCache()
@@ -0,0 +1,206 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from cogs.utils.metrics import REGISTRY as METRICS
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Equity estimator config ----------------
+EQUITY_BUDGET_SECS = float(os.getenv("EQUITY_BUDGET_SECS", "0.15"))  # wall time per uncached request
+EQUITY_SLICE_SECS = 0.005       # simulate this long, then yield to the loop (timer ticks keep running)
+EQUITY_MAX_SAMPLES = 20000      # enough for ~±0.7% at 95%; stop early if reached inside the budget
+EQUITY_CACHE_MAX = 4096         # (hole, board, opponents) results kept
+
+# Card id = (rank - 2) * 4 + suit, rank 2..14 (A = 14), so rank = (id >> 2) + 2 and suit = id & 3.
+_RANK_OF = {"2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7, "8": 8, "9": 9,
+            "0": 10, "10": 10, "T": 10, "J": 11, "Q": 12, "K": 13, "A": 14}
+_SUIT_OF = {"H": 0, "D": 1, "C": 2, "S": 3}
+_STRAIGHT_HIGHS = tuple(range(14, 5, -1))   # 5-high (wheel) is checked separately
+
+
+def card_id(card) -> Optional[int]:
+    """'AS' / '0H' / '10H' / {"code": ...} / {"rank", "suit"} -> 0..51 (None if unreadable)."""
+    if isinstance(card, dict):
+        if card.get("code"):
+            return card_id(card["code"])
+        rank, suit = card.get("rank") or card.get("r"), card.get("suit") or card.get("s")
+        if not rank or not suit:
+            return None
+        card = f"{rank}{str(suit)[0]}"
+    if not isinstance(card, str):
+        return None
+    t = card.strip().upper()
+    r, s = _RANK_OF.get(t[:-1]), _SUIT_OF.get(t[-1:])
+    if r is None or s is None:
+        return None
+    return (r - 2) * 4 + s
+
+
+def _straight_high(present) -> int:
+    for hi in _STRAIGHT_HIGHS:
+        if hi in present and hi - 1 in present and hi - 2 in present and hi - 3 in present and hi - 4 in present:
+            return hi
+    if 14 in present and 2 in present and 3 in present and 4 in present and 5 in present:
+        return 5
+    return 0
+
+
+def hand_score(cards: Iterable[int]) -> tuple:
+    """
+    Best 5-of-N score for card ids, the same tuples evaluate_poker_hand in
+    cogs/mechanics_main.py produces (so results compare exactly like
+    _to_showdown), but computed from rank/suit counts instead of scoring
+    all 21 five-card combinations.
+    """
+    counts = [0] * 15
+    by_suit = ([], [], [], [])
+    for c in cards:
+        r = (c >> 2) + 2
+        counts[r] += 1
+        by_suit[c & 3].append(r)
+
+    for suited in by_suit:
+        if len(suited) >= 5:
+            # a 5+ card flush leaves too few cards for quads or a full house
+            hi = _straight_high(set(suited))
+            if hi:
+                return (9,) if hi == 14 else (8, hi)
+            suited.sort(reverse=True)
+            return (5, *suited[:5])
+
+    quads, trips, pairs, singles = [], [], [], []
+    for r in range(14, 1, -1):
+        n = counts[r]
+        if n == 4:
+            quads.append(r)
+        elif n == 3:
+            trips.append(r)
+        elif n == 2:
+            pairs.append(r)
+        elif n == 1:
+            singles.append(r)
+
+    if quads:
+        q = quads[0]
+        return (7, q, max(r for r in range(14, 1, -1) if counts[r] and r != q))
+    if trips and (len(trips) > 1 or pairs):
+        return (6, trips[0], max(trips[1] if len(trips) > 1 else 0, pairs[0] if pairs else 0))
+    hi = _straight_high({r for r in range(2, 15) if counts[r]})
+    if hi:
+        return (4, hi)
+    if trips:
+        return (3, trips[0], *singles[:2])
+    if len(pairs) >= 2:
+        rest = pairs[2:3] + singles[:1]
+        return (2, pairs[0], pairs[1], max(rest))
+    if pairs:
+        return (1, pairs[0], *singles[:3])
+    return (0, *singles[:5])
+
+
+def _simulate(hole: List[int], board: List[int], opponents: int, stock: List[int],
+              samples: int, rng: random.Random) -> Tuple[int, int]:
+    """
+    (wins, ties) over `samples` random run-outs under the table's rules: the
+    hero must beat the dealer's hand outright, then have the best (win) or
+    tied-best (tie) hand among the players who also beat the dealer.
+    """
+    missing = 5 - len(board)
+    need = missing + 2 + 2 * opponents
+    sample = rng.sample
+    wins = ties = 0
+    for _ in range(samples):
+        drawn = sample(stock, need)
+        full_board = board + drawn[:missing]
+        hero = hand_score(hole + full_board)
+        dealer = hand_score(drawn[missing:missing + 2] + full_board)
+        if hero <= dealer:
+            continue
+        tied = False
+        beaten = False
+        i = missing + 2
+        for _ in range(opponents):
+            opp = hand_score(drawn[i:i + 2] + full_board)
+            i += 2
+            if opp > hero:
+                beaten = True
+                break
+            if opp == hero:
+                tied = True
+        if beaten:
+            continue
+        if tied:
+            ties += 1
+        else:
+            wins += 1
+    return wins, ties
+
+
+class EquityEstimator:
+    """
+    Monte Carlo win / tie odds for one seated hold'em player, from that
+    player's point of view: the dealer's hand, undealt board and other
+    players' holes are all unknown, so nothing hidden leaks into the hint.
+
+      • runs on the event loop in EQUITY_SLICE_SECS slices, yielding between
+        them, and stops at EQUITY_BUDGET_SECS or EQUITY_MAX_SAMPLES
+      • results are cached per (hole, board, opponents), so every seat asking
+        again on the same street is a dict hit
+    """
+
+    def __init__(self, budget: float = EQUITY_BUDGET_SECS, max_samples: int = EQUITY_MAX_SAMPLES,
+                 cache_max: int = EQUITY_CACHE_MAX):
+        self.budget = float(budget)
+        self.max_samples = int(max_samples)
+        self.cache_max = int(cache_max)
+        self._cache = OrderedDict()   # key -> result dict
+        self._rng = random.Random()
+
+    async def estimate(self, hole_cards, board_cards, opponents: int) -> Optional[dict]:
+        """{"win", "tie", "samples", "cached"} or None if the cards can't be read."""
+        hole = [card_id(c) for c in hole_cards or []]
+        board = [card_id(c) for c in board_cards or []]
+        if len(hole) != 2 or None in hole or None in board or len(board) > 5:
+            return None
+        opponents = max(0, int(opponents))
+        key = (tuple(sorted(hole)), tuple(sorted(board)), opponents)
+        hit = self._cache.get(key)
+        if hit is not None:
+            self._cache.move_to_end(key)
+            return {**hit, "cached": True}
+
+        known = set(hole) | set(board)
+        stock = [c for c in range(52) if c not in known]
+        if len(stock) < (5 - len(board)) + 2 + 2 * opponents:
+            return None
+
+        wins = ties = samples = 0
+        t0 = time.perf_counter()
+        deadline = t0 + self.budget
+        batch = 64
+        with METRICS.timer("equity_seconds", opponents=min(opponents, 5)):
+            while samples < self.max_samples:
+                slice_end = min(time.perf_counter() + EQUITY_SLICE_SECS, deadline)
+                while samples < self.max_samples and time.perf_counter() < slice_end:
+                    w, t = _simulate(hole, board, opponents, stock, batch, self._rng)
+                    wins += w
+                    ties += t
+                    samples += batch
+                if time.perf_counter() >= deadline:
+                    break
+                await asyncio.sleep(0)
+
+        result = {"win": round(wins / samples, 4), "tie": round(ties / samples, 4), "samples": samples}
+        self._cache[key] = result
+        while len(self._cache) > self.cache_max:
+            self._cache.popitem(last=False)
+        return {**result, "cached": False}
+
+
+# Process-wide estimator (MechanicsMain's "equity_hint" action uses it)
+EQUITY = EquityEstimator()
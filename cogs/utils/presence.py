@@ -0,0 +1,49 @@
+class PresenceIndex:
+    """
+    room_id -> player_id -> set of sockets, kept in step with bot.ws_rooms by
+    register_ws_connection / unregister_ws_connection in both mechanics cogs.
+
+    Liveness checks become dict lookups instead of scanning every socket in
+    the room and comparing ws._player_id strings.
+    """
+
+    __slots__ = ("_rooms",)
+
+    def __init__(self):
+        self._rooms = {}
+
+    def add(self, room_id: str, player_id: str, ws):
+        if not player_id:
+            return
+        self._rooms.setdefault(str(room_id), {}).setdefault(str(player_id), set()).add(ws)
+
+    def remove(self, room_id: str, player_id: str, ws):
+        players = self._rooms.get(str(room_id))
+        if not players:
+            return
+        socks = players.get(str(player_id))
+        if socks is None:
+            return
+        socks.discard(ws)
+        if not socks:
+            del players[str(player_id)]
+            if not players:
+                del self._rooms[str(room_id)]
+
+    def live_count(self, room_id: str, player_id: str) -> int:
+        socks = (self._rooms.get(str(room_id)) or {}).get(str(player_id))
+        if not socks:
+            return 0
+        # a socket can be closed a moment before its handler unregisters it
+        return sum(1 for ws in socks if not getattr(ws, "closed", False))
+
+    def sockets(self, room_id: str, player_id: str) -> list:
+        """The player's open sockets in the room (for frames meant only for them)."""
+        socks = (self._rooms.get(str(room_id)) or {}).get(str(player_id)) or ()
+        return [ws for ws in socks if not getattr(ws, "closed", False)]
+
+    def is_connected(self, room_id: str, player_id: str) -> bool:
+        return self.live_count(room_id, player_id) > 0
+
+    def drop_room(self, room_id: str):
+        self._rooms.pop(str(room_id), None)
@@ -0,0 +1,70 @@
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Safety net in case the site edits a room's mode in place; rooms are normally
+# immutable after creation and removed through invalidate() when deleted.
+ROOM_CONFIG_TTL_SECS = 10 * 60
+
+
+class RoomConfigCache:
+    """
+    room_id -> {"game_mode", "guild_id", "channel_id"} (the bot_game_rooms row).
+
+    Shared by MechanicsMain and MechanicsMain2 so the 1s timer loops read
+    config from memory instead of opening a MySQL connection per room per tick.
+      • filled on first access (rooms are created by the site, not the bot)
+      • concurrent misses for one room share a single DB read
+      • failed / missing lookups are NOT cached, so a transient DB error
+        doesn't pin a room to default limits
+      • bot._summarize_rooms_and_prune calls invalidate() when it deletes a room
+    """
+
+    def __init__(self, ttl: float = ROOM_CONFIG_TTL_SECS):
+        self.ttl = float(ttl)
+        self._entries = {}    # room_id -> (expires_at, row)
+        self._inflight = {}   # room_id -> asyncio.Future
+
+    async def get(self, room_id: str, fetch: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        entry = self._entries.get(room_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                return entry[1]
+            self._entries.pop(room_id, None)
+
+        fut = self._inflight.get(room_id)
+        if fut is not None:
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[room_id] = fut
+        row = None
+        try:
+            row = await fetch(room_id)
+            if row:
+                self.prime(room_id, row)
+            return row
+        finally:
+            if not fut.done():
+                fut.set_result(row)
+            self._inflight.pop(room_id, None)
+
+    def prime(self, room_id: str, row: dict):
+        self._entries[room_id] = (time.monotonic() + self.ttl, {
+            "game_mode": str(row.get("game_mode") or "1"),
+            "guild_id": row.get("guild_id"),
+            "channel_id": row.get("channel_id"),
+        })
+
+    def invalidate(self, room_id: str):
+        self._entries.pop(room_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide cache (both mechanics cogs + bot.py pruning use this one)
+ROOM_CONFIGS = RoomConfigCache()
@@ -0,0 +1,210 @@
+import time
+import heapq
+import asyncio
+import logging
+from collections import deque, OrderedDict
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Serene scheduler config ----------------
+SERENE_WORKERS = 4              # concurrent upstream GETs to serene_bot.php
+SERENE_QUEUE_MAX = 100          # pending requests; beyond this new triggers are dropped
+SERENE_REPLY_DELAY_SECS = 2.0   # humanization delay before a reply is shown
+SERENE_COALESCE_SECS = 10.0     # identical start/hail triggers inside this window are merged
+COALESCED_KINDS = {"start", "hail"}
+
+# sliding-window rate limits: (max requests, window seconds)
+SERENE_USER_LIMIT = (3, 30.0)
+SERENE_ROOM_LIMIT = (10, 30.0)
+
+# deterministic-reply cache per kind (seconds; 0 = never cache)
+SERENE_CACHE_TTL = {"start": 0, "question": 60.0, "hail": 0}
+SERENE_CACHE_MAX = 256
+
+
+class SereneScheduler:
+    """
+    Bounded pipeline for Serene replies.
+
+      submit() ──► rate limit / coalesce ──► bounded queue ──► N workers (fetch)
+                                                        └──► delay heap ──► deliver()
+
+    One delivery task drains a heap of (due_at, reply) entries, so the 2s
+    humanization delay costs a heap entry instead of a sleeping task per reply.
+    """
+
+    def __init__(self, fetch: Callable[[dict], Awaitable[Optional[str]]],
+                 deliver: Callable[[str, str], Awaitable[None]],
+                 workers: int = SERENE_WORKERS, queue_max: int = SERENE_QUEUE_MAX,
+                 delay: float = SERENE_REPLY_DELAY_SECS):
+        self.fetch = fetch
+        self.deliver = deliver
+        self.workers = int(workers)
+        self.delay = float(delay)
+        self._queue_max = int(queue_max)
+        self._queue = None              # created on first submit (needs a running loop)
+        self._tasks = []
+        self._delayed = []              # heap of (due_at, seq, room_id, text)
+        self._seq = 0
+        self._wake = None
+
+        self._user_hits = {}            # (room_id, player) -> deque[ts]
+        self._room_hits = {}            # room_id -> deque[ts]
+        self._recent = {}               # coalesce key -> ts
+        self._cache = OrderedDict()     # (kind, params) -> (expires_at, text)
+
+        self.stats = {"submitted": 0, "rate_limited": 0, "coalesced": 0, "dropped": 0,
+                      "cache_hits": 0, "fetched": 0, "delivered": 0}
+
+    # ---------------- lifecycle ----------------
+
+    def _ensure_started(self) -> bool:
+        if self._tasks and all(not t.done() for t in self._tasks):
+            return True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_max)
+            self._wake = asyncio.Event()
+        self.stop()  # a crashed worker restarts the whole set
+        self._tasks = [loop.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(loop.create_task(self._delivery_loop()))
+        return True
+
+    def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        self._tasks = []
+
+    # ---------------- admission ----------------
+
+    @staticmethod
+    def _allow(hits: dict, key, limit: tuple, now: float) -> bool:
+        max_n, window = limit
+        dq = hits.get(key)
+        if dq is None:
+            dq = hits[key] = deque()
+        while dq and now - dq[0] > window:
+            dq.popleft()
+        if len(dq) >= max_n:
+            return False
+        dq.append(now)
+        return True
+
+    def _prune_maps(self, now: float):
+        # keep the bookkeeping dicts from growing with one-off users/rooms
+        if len(self._recent) > 1024:
+            self._recent = {k: t for k, t in self._recent.items() if now - t <= SERENE_COALESCE_SECS}
+        for hits, limit in ((self._user_hits, SERENE_USER_LIMIT), (self._room_hits, SERENE_ROOM_LIMIT)):
+            if len(hits) > 1024:
+                for k in [k for k, dq in hits.items() if not dq or now - dq[-1] > limit[1]]:
+                    hits.pop(k, None)
+
+    def submit(self, kind: str, room_id: str, player: str, params: dict) -> bool:
+        """
+        Queue a Serene request. Never blocks; returns False when the trigger
+        was merged, rate limited or dropped because the queue is full.
+        """
+        if not self._ensure_started():
+            return False
+        self.stats["submitted"] += 1
+        now = time.monotonic()
+        self._prune_maps(now)
+
+        params_key = tuple(sorted((str(k), str(v)) for k, v in params.items()))
+        if kind in COALESCED_KINDS:
+            ckey = (kind, room_id, params_key)
+            last = self._recent.get(ckey)
+            if last is not None and now - last <= SERENE_COALESCE_SECS:
+                self.stats["coalesced"] += 1
+                return False
+            self._recent[ckey] = now
+
+        if not self._allow(self._user_hits, (room_id, player), SERENE_USER_LIMIT, now) \
+                or not self._allow(self._room_hits, room_id, SERENE_ROOM_LIMIT, now):
+            self.stats["rate_limited"] += 1
+            logger.info("[Serene] rate limited %s by %s in room %s", kind, player, room_id)
+            return False
+
+        cached = self._cache_get((kind, params_key), now)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            self._schedule(room_id, cached)
+            return True
+
+        try:
+            self._queue.put_nowait((kind, room_id, params, params_key))
+            return True
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("[Serene] queue full; dropping %s in room %s", kind, room_id)
+            return False
+
+    # ---------------- reply cache ----------------
+
+    def _cache_get(self, key, now: float) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._cache.pop(key, None)
+            return None
+        return entry[1]
+
+    def _cache_put(self, kind: str, key, text: str):
+        ttl = SERENE_CACHE_TTL.get(kind, 0)
+        if ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + ttl, text)
+        self._cache.move_to_end(key)
+        while len(self._cache) > SERENE_CACHE_MAX:
+            self._cache.popitem(last=False)
+
+    # ---------------- workers / delivery ----------------
+
+    async def _worker(self, idx: int):
+        while True:
+            kind, room_id, params, params_key = await self._queue.get()
+            try:
+                reply = await self.fetch(params)
+                self.stats["fetched"] += 1
+                if reply:
+                    self._cache_put(kind, (kind, params_key), reply)
+                    self._schedule(room_id, reply)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("[Serene] worker %d failed on %s", idx, kind)
+            finally:
+                self._queue.task_done()
+
+    def _schedule(self, room_id: str, text: str):
+        self._seq += 1
+        heapq.heappush(self._delayed, (time.monotonic() + self.delay, self._seq, room_id, text))
+        self._wake.set()
+
+    async def _delivery_loop(self):
+        while True:
+            try:
+                if not self._delayed:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                wait = self._delayed[0][0] - time.monotonic()
+                if wait > 0:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                _, _, room_id, text = heapq.heappop(self._delayed)
+                await self.deliver(room_id, text)
+                self.stats["delivered"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("[Serene] delivery failed")
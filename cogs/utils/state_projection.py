@@ -0,0 +1,125 @@
+import json
+import time
+from typing import Callable, Optional
+
+# ---------------- Per-viewer game_state projection ----------------
+# What is persisted in bot_game_rooms.game_state is the full authoritative
+# state (deck included). What goes over the wire is a projection:
+#   • the deck ("__deck" sidecar, or a legacy "deck" list) is never sent
+#   • nor are hand-log events still staged on the state ("__hand_log") or the
+#     empty-table debounce stamp ("_empty_since", rewritten without a __rev bump)
+#   • cards the viewer may not see are replaced by a face-down placeholder
+#     (same list length, so table layouts don't shift)
+# Each distinct view is JSON-encoded once per (room, __rev, role) and shared by
+# every socket with that role (e.g. all spectators get the same bytes). That
+# relies on every change to a projected key going through _mark_dirty.
+
+PRIVATE_KEYS = ("deck", "__deck", "__hand_log", "_empty_since")
+
+HIDDEN_CARD_CODE = "XX"                                   # hold'em cards are 2-char strings
+HIDDEN_CARD_DICT = {"code": "XX", "rank": "", "suit": "", "hidden": True}  # blackjack card dicts
+
+ROLE_ALL = "all"              # nothing hidden except the deck
+ROLE_SPECTATOR = "spectator"  # every hand hidden
+ROLE_TABLE = "table"          # same view for every seat and spectator
+
+
+def _strip_private(state: dict) -> dict:
+    view = dict(state)
+    for k in PRIVATE_KEYS:
+        view.pop(k, None)
+    return view
+
+
+# ---------------- Hold'em ----------------
+HOLDEM_REVEAL_ROUNDS = {"showdown", "post_showdown"}
+
+
+def holdem_role(state: dict, viewer_id: Optional[str]) -> str:
+    if state.get("current_round") in HOLDEM_REVEAL_ROUNDS:
+        return ROLE_ALL
+    if viewer_id:
+        for p in state.get("players") or []:
+            if str(p.get("discord_id")) == str(viewer_id) and p.get("hand"):
+                return f"p:{viewer_id}"
+    return ROLE_SPECTATOR
+
+
+def project_holdem(state: dict, role: str) -> dict:
+    """
+    Pre-showdown: only the owner sees their hole cards; the dealer's hand is face-down.
+    Showdown / post_showdown: every hand still in play is shown; folded hands stay down.
+    """
+    view = _strip_private(state)
+    reveal = role == ROLE_ALL
+    owner = role[2:] if role.startswith("p:") else None
+
+    players = []
+    for p in state.get("players") or []:
+        hand = p.get("hand") or []
+        visible = (reveal and not p.get("is_folded")) or (owner is not None and str(p.get("discord_id")) == owner)
+        if hand and not visible:
+            p = dict(p)
+            p["hand"] = [HIDDEN_CARD_CODE] * len(hand)
+        players.append(p)
+    view["players"] = players
+
+    if not reveal and state.get("dealer_hand"):
+        view["dealer_hand"] = [HIDDEN_CARD_CODE] * len(state["dealer_hand"])
+    return view
+
+
+# ---------------- Blackjack ----------------
+# Player hands are dealt face-up; only the dealer's hole card is private until the dealer plays.
+BLACKJACK_HOLE_HIDDEN_PHASES = {"betting", "dealing", "player_turn"}
+
+
+def blackjack_role(state: dict, viewer_id: Optional[str]) -> str:
+    return ROLE_TABLE
+
+
+def project_blackjack(state: dict, role: str, upcard_total: Optional[Callable[[list], int]] = None) -> dict:
+    view = _strip_private(state)
+    dealer = state.get("dealer_hand") or []
+    if state.get("current_round") in BLACKJACK_HOLE_HIDDEN_PHASES and len(dealer) > 1:
+        view["dealer_hand"] = [dealer[0]] + [dict(HIDDEN_CARD_DICT) for _ in dealer[1:]]
+        # dealer_total would leak the hole card; show the upcard's value instead
+        if state.get("dealer_total") is not None:
+            view["dealer_total"] = upcard_total([dealer[0]]) if upcard_total else None
+    return view
+
+
+# ---------------- Encoding cache ----------------
+
+class ProjectionCache:
+    """
+    room_id -> {"rev": __rev, "views": {role: encoded game_state JSON}}.
+    Only the latest rev per room is kept; a broadcast fills it and join
+    snapshots at the same rev reuse it.
+    """
+
+    def __init__(self, project: Callable[[dict, str], dict], role_of: Callable[[dict, Optional[str]], str]):
+        self.project = project
+        self.role_of = role_of
+        self._rooms = {}
+
+    def forget(self, room_id: str):
+        """Drop a deleted room's cached views."""
+        self._rooms.pop(str(room_id), None)
+
+    def encoded_view(self, room_id: str, state: dict, role: str) -> str:
+        rev = int(state.get("__rev") or 0)
+        entry = self._rooms.get(str(room_id))
+        if entry is None or entry["rev"] != rev:
+            entry = self._rooms[str(room_id)] = {"rev": rev, "views": {}}
+        enc = entry["views"].get(role)
+        if enc is None:
+            enc = entry["views"][role] = json.dumps(self.project(state, role))
+        return enc
+
+    def envelope(self, room_id: str, state: dict, viewer_id: Optional[str]) -> str:
+        """The {"type":"state",...} frame for one viewer, reusing the cached view."""
+        role = self.role_of(state, viewer_id)
+        return '{"type": "state", "game_state": %s, "room_id": %s, "server_ts": %d}' % (
+            self.encoded_view(room_id, state, role), json.dumps(room_id), int(time.time())
+        )
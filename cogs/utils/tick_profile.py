@@ -0,0 +1,133 @@
+import os
+import time
+import logging
+from collections import deque
+from typing import Optional
+
+from cogs.utils.metrics import percentiles
+
+logger = logging.getLogger(__name__)
+
+# One room's share of a timer pass; over this we log the per-step breakdown.
+TICK_ROOM_BUDGET_SECS = float(os.getenv("TICK_ROOM_BUDGET_SECS", "0.1"))
+# A whole pass should finish inside the 1s loop interval or every countdown drifts.
+TICK_PASS_BUDGET_SECS = float(os.getenv("TICK_PASS_BUDGET_SECS", "1.0"))
+TICK_WARN_INTERVAL_SECS = 30.0    # per room / per game, so a slow table doesn't flood the log
+TICK_WINDOW = 120                  # ticks kept per room for percentiles (~2 min)
+
+STEPS = ("load", "reap", "transition", "save", "broadcast")
+
+
+def _pcts(values) -> dict:
+    return {k: round(v, 6) for k, v in percentiles(values).items()}
+
+
+class RoomTick:
+    """
+    One room's pass through check_game_timers. Call mark(step) after each
+    step; the time since the previous mark is charged to that step.
+    """
+    __slots__ = ("game", "room_id", "t0", "last", "steps", "round")
+
+    def __init__(self, game: str, room_id: str):
+        self.game = game
+        self.room_id = room_id
+        self.t0 = self.last = time.perf_counter()
+        self.steps = {}
+        self.round = None
+
+    def mark(self, step: str):
+        now = time.perf_counter()
+        self.steps[step] = self.steps.get(step, 0.0) + (now - self.last)
+        self.last = now
+
+
+class _RoomStats:
+    __slots__ = ("total", "steps", "round", "last_warn", "ticks")
+
+    def __init__(self):
+        self.total = deque(maxlen=TICK_WINDOW)
+        self.steps = {s: deque(maxlen=TICK_WINDOW) for s in STEPS}
+        self.round = None
+        self.last_warn = 0.0
+        self.ticks = 0
+
+
+class TickProfiler:
+    """
+    Rolling per-room, per-step timings for both games' timer loops.
+
+      tick = TICK_PROFILER.begin("holdem", rid)
+      ...; tick.mark("load")
+      ...; tick.mark("save")
+      TICK_PROFILER.end(tick)
+
+    Shared by MechanicsMain and MechanicsMain2; the admin route reads top().
+    """
+
+    def __init__(self, room_budget: float = TICK_ROOM_BUDGET_SECS, pass_budget: float = TICK_PASS_BUDGET_SECS):
+        self.room_budget = float(room_budget)
+        self.pass_budget = float(pass_budget)
+        self._rooms = {}      # (game, room_id) -> _RoomStats
+        self._passes = {}     # game -> deque of (secs, rooms)
+        self._pass_warn = {}  # game -> last warning ts
+
+    def begin(self, game: str, room_id: str) -> RoomTick:
+        return RoomTick(game, room_id)
+
+    def end(self, tick: RoomTick):
+        total = time.perf_counter() - tick.t0
+        st = self._rooms.get((tick.game, tick.room_id))
+        if st is None:
+            st = self._rooms[(tick.game, tick.room_id)] = _RoomStats()
+        st.ticks += 1
+        st.total.append(total)
+        for step in STEPS:
+            st.steps[step].append(tick.steps.get(step, 0.0))
+        if tick.round is not None:
+            st.round = tick.round
+
+        if total > self.room_budget:
+            now = time.monotonic()
+            if now - st.last_warn >= TICK_WARN_INTERVAL_SECS:
+                st.last_warn = now
+                parts = " ".join(f"{s}={tick.steps[s] * 1000:.0f}ms" for s in STEPS if s in tick.steps)
+                logger.warning(f"[TICK] {tick.game} room '{tick.room_id}' ({tick.round}) took "
+                               f"{total * 1000:.0f}ms > {self.room_budget * 1000:.0f}ms budget: {parts}")
+
+    def end_pass(self, game: str, seconds: float, rooms: int):
+        self._passes.setdefault(game, deque(maxlen=TICK_WINDOW)).append(seconds)
+        if seconds > self.pass_budget:
+            now = time.monotonic()
+            if now - self._pass_warn.get(game, 0.0) >= TICK_WARN_INTERVAL_SECS:
+                self._pass_warn[game] = now
+                logger.warning(f"[TICK] {game} timer pass over {rooms} rooms took {seconds * 1000:.0f}ms "
+                               f"(> {self.pass_budget * 1000:.0f}ms); countdowns are drifting")
+
+    def forget(self, room_id: str):
+        for key in [k for k in self._rooms if k[1] == str(room_id)]:
+            self._rooms.pop(key, None)
+
+    def top(self, n: int = 10, by: str = "p95", game: Optional[str] = None) -> list:
+        rows = []
+        for (g, rid), st in self._rooms.items():
+            if game and g != game:
+                continue
+            total = _pcts(st.total)
+            if not total:
+                continue
+            rows.append({
+                "game": g, "room_id": rid, "round": st.round, "ticks": st.ticks,
+                "total": total,
+                "steps": {s: _pcts(st.steps[s]) for s in STEPS},
+            })
+        key = by if by in ("p50", "p95", "p99", "max") else "p95"
+        rows.sort(key=lambda r: r["total"][key], reverse=True)
+        return rows[:n]
+
+    def passes(self) -> dict:
+        return {g: _pcts(d) for g, d in self._passes.items()}
+
+
+# Process-wide profiler (both mechanics cogs record into it; bot.py serves it)
+TICK_PROFILER = TickProfiler()
@@ -0,0 +1,165 @@
+import json
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+
+import aiomysql
+
+from cogs.utils.metrics import REGISTRY as METRICS
+
+logger = logging.getLogger(__name__)
+
+# Append-only offense log. One row per flag (strike_number 0) or strike (1, 2, ...),
+# so a member's offense count for a reason is one indexed COUNT and flagging is an INSERT.
+# The unique key makes two moderators flagging the same member at once collide
+# instead of both writing "strike 1".
+WARNINGS_DDL = """
+CREATE TABLE IF NOT EXISTS bot_user_warnings (
+    id            BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    guild_id      VARCHAR(32)  NOT NULL,
+    discord_id    VARCHAR(32)  NOT NULL,
+    reason        VARCHAR(255) NOT NULL,
+    kind          ENUM('flag', 'strike') NOT NULL,
+    strike_number INT UNSIGNED NOT NULL DEFAULT 0,
+    seen          TINYINT(1)   NOT NULL DEFAULT 0,
+    ts            DATETIME(6)  NOT NULL,
+    UNIQUE KEY uq_offense (guild_id, discord_id, reason, kind, strike_number),
+    KEY idx_guild_member (guild_id, discord_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+_INSERT = ("INSERT INTO bot_user_warnings (guild_id, discord_id, reason, kind, strike_number, seen, ts) "
+           "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+_INSERT_IGNORE = _INSERT.replace("INSERT INTO", "INSERT IGNORE INTO", 1)
+
+MIGRATE_BATCH = 500
+RECORD_RETRIES = 3
+
+_ready = False
+_ready_lock = asyncio.Lock()
+
+
+def _parse_ts(value) -> datetime:
+    try:
+        ts = datetime.fromisoformat(str(value))
+        return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def rows_from_json_data(guild_id: str, discord_id: str, json_data) -> List[tuple]:
+    """Legacy discord_users.json_data["warnings"] -> bot_user_warnings rows."""
+    if isinstance(json_data, (bytes, bytearray)):
+        json_data = json_data.decode("utf-8", errors="ignore")
+    try:
+        data = json.loads(json_data) if isinstance(json_data, str) else (json_data or {})
+    except (TypeError, ValueError):
+        return []
+    warnings = data.get("warnings") if isinstance(data, dict) else None
+    if not isinstance(warnings, dict):
+        return []
+    rows = []
+    for f in warnings.get("flags") or []:
+        if isinstance(f, dict) and f.get("reason"):
+            rows.append((guild_id, discord_id, str(f["reason"])[:255], "flag", 0,
+                         1 if f.get("seen") else 0, _parse_ts(f.get("timestamp"))))
+    for s in warnings.get("strikes") or []:
+        if isinstance(s, dict) and s.get("reason"):
+            rows.append((guild_id, discord_id, str(s["reason"])[:255], "strike", int(s.get("strike_number") or 1),
+                         0, _parse_ts(s.get("timestamp"))))
+    return rows
+
+
+async def _migrate_json_warnings(conn) -> int:
+    """Copy every legacy json_data warning into the table, in one transaction."""
+    moved = 0
+    await conn.begin()
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "SELECT guild_id, discord_id, json_data FROM discord_users "
+                "WHERE json_data LIKE %s OR json_data LIKE %s",
+                ('%"flags"%', '%"strikes"%')
+            )
+            batch = []
+            for guild_id, discord_id, raw in await cursor.fetchall() or []:
+                batch.extend(rows_from_json_data(str(guild_id), str(discord_id), raw))
+                if len(batch) >= MIGRATE_BATCH:
+                    moved += await cursor.executemany(_INSERT_IGNORE, batch) or 0
+                    batch = []
+            if batch:
+                moved += await cursor.executemany(_INSERT_IGNORE, batch) or 0
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return moved
+
+
+async def ensure_warnings_table(conn):
+    """
+    Create bot_user_warnings on first use in this process. If it is empty,
+    migrate the legacy json_data warnings once (all-or-nothing, so an empty
+    table always means the migration hasn't happened).
+    """
+    global _ready
+    if _ready:
+        return
+    async with _ready_lock:
+        if _ready:
+            return
+        async with conn.cursor() as cursor:
+            await cursor.execute(WARNINGS_DDL)
+            await cursor.execute("SELECT 1 FROM bot_user_warnings LIMIT 1")
+            empty = await cursor.fetchone() is None
+        if empty:
+            moved = await _migrate_json_warnings(conn)
+            logger.info(f"Migrated {moved} legacy json_data warning(s) into bot_user_warnings")
+        _ready = True
+
+
+async def offense_counts(cursor, guild_id: str, reason: str, discord_ids: Iterable[str]) -> Dict[str, int]:
+    """{discord_id: flags + strikes recorded for this reason} in one indexed query."""
+    ids = [str(d) for d in discord_ids]
+    if not ids:
+        return {}
+    marks = ", ".join(["%s"] * len(ids))
+    await cursor.execute(
+        f"SELECT discord_id, COUNT(*) FROM bot_user_warnings "
+        f"WHERE guild_id = %s AND reason = %s AND discord_id IN ({marks}) GROUP BY discord_id",
+        (str(guild_id), reason, *ids)
+    )
+    counts = {d: 0 for d in ids}
+    for discord_id, n in await cursor.fetchall() or []:
+        counts[str(discord_id)] = int(n)
+    return counts
+
+
+async def record_offenses(conn, guild_id: str, reason: str, discord_ids: Iterable[str]) -> Dict[str, int]:
+    """
+    Append one offense for `reason` to each member (first one is a flag, later
+    ones are numbered strikes) with a single multi-row INSERT.
+    Returns {discord_id: offense number} (1 = first flag, 2 = first strike, ...).
+    A concurrent flag for the same member hits the unique key; we recount and retry.
+    """
+    ids = list(dict.fromkeys(str(d) for d in discord_ids))
+    if not ids:
+        return {}
+    await ensure_warnings_table(conn)
+    reason = str(reason)[:255]
+    for attempt in range(RECORD_RETRIES):
+        async with conn.cursor() as cursor:
+            counts = await offense_counts(cursor, guild_id, reason, ids)
+            now = datetime.utcnow()
+            rows = [(str(guild_id), d, reason, "flag" if counts[d] == 0 else "strike", counts[d], 0, now)
+                    for d in ids]
+            try:
+                with METRICS.timer("db_seconds", source="warnings", op="record"):
+                    await cursor.executemany(_INSERT, rows)
+                return {d: counts[d] + 1 for d in ids}
+            except aiomysql.IntegrityError:
+                if attempt == RECORD_RETRIES - 1:
+                    raise
+                logger.info(f"Concurrent flag for '{reason}' in guild {guild_id}; recounting")
+    return {}
@@ -0,0 +1,219 @@
+"""
+Headless throughput benchmark for the game engines (no Discord, MySQL or network).
+
+  python -m tools.bench_engines --game holdem --tables 50 --players 6 --hands 20
+  python -m tools.bench_engines --game blackjack --tables 100 --players 5 --hands 30 --alloc
+  python -m tools.bench_engines --game holdem --hand-log bench_hands    # also write a replay corpus
+
+Drives the real handle_websocket_game_action / check_game_timers against
+tools.harness fakes: N tables, M seated bots each (plus optional spectator
+sockets), one simulated second per tick. Reports actions/sec, action and
+tick latency percentiles, bytes broadcast per action, DB traffic and,
+with --alloc, tracemalloc memory per hand.
+"""
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tracemalloc
+
+import cogs.mechanics_main as holdem_mod
+import cogs.mechanics_main2 as blackjack_mod
+from cogs.mechanics_main import MechanicsMain
+from cogs.mechanics_main2 import MechanicsMain2, bj_total
+from tools.harness import (MemoryRooms, FakePayouts, FakeWS, VirtualClock,
+                           headless, percentiles, fmt_ms)
+
+
+# ---------------- bot policies ----------------
+
+def holdem_move(engine, state: dict, rng: random.Random):
+    """(sender_id, move, amount) for whoever is to act, or None."""
+    pid = state.get("current_bettor")
+    p = engine._find_player(state, pid) if pid else None
+    if not p:
+        return None
+    min_bet = engine._room_min_bet(state)
+    current_bet = int(state.get("current_bet") or 0)
+    needed = current_bet - int(p.get("bet") or 0)
+    if needed <= 0:
+        if current_bet == 0 and rng.random() < 0.2:
+            return pid, "bet", min_bet
+        return pid, "check", 0
+    r = rng.random()
+    if r < 0.12:
+        return pid, "fold", 0
+    if r < 0.22:
+        return pid, "raise", needed + min_bet
+    return pid, "call", needed
+
+
+def blackjack_move(engine, state: dict, rng: random.Random):
+    pid = state.get("current_actor")
+    p = engine._find_player(state, pid) if pid else None
+    if not p:
+        return None
+    phase = state.get("current_round")
+    if phase == blackjack_mod.PHASE_BETTING:
+        return pid, "bet", int(state.get("min_bet") or 0)
+    if phase != blackjack_mod.PHASE_PLAYER_TURN:
+        return None
+    h = engine._active_hand(p)
+    if not h:
+        return None
+    cards = h.get("cards") or []
+    total, _, _, soft = bj_total(cards)
+    if len(cards) == 2 and not h.get("has_acted") and total in (10, 11) and rng.random() < 0.5:
+        return pid, "double", int(p.get("bet") or 0)
+    if total < 12 or (total < 17 and rng.random() < 0.7) or (soft and total < 18):
+        return pid, "hit", 0
+    return pid, "stand", 0
+
+
+GAMES = {
+    "holdem": (MechanicsMain, holdem_move, "current_bettor"),
+    "blackjack": (MechanicsMain2, blackjack_move, "current_actor"),
+}
+
+
+# ---------------- driver ----------------
+
+async def run(args) -> dict:
+    cog_cls, policy, _ = GAMES[args.game]
+    rng = random.Random(args.seed)
+    clock = VirtualClock()
+    clock.install(holdem_mod, blackjack_mod)
+
+    rooms = MemoryRooms(latency=args.db_ms / 1000.0)
+    payouts = FakePayouts(latency=args.payout_ms / 1000.0)
+    engine = headless(cog_cls, rooms, payouts)
+    if hasattr(engine, "hand_log"):
+        engine.hand_log.directory = args.hand_log   # None => hand events are dropped
+
+    sockets = []
+    table_ids = [f"bench-{args.game}-{i}" for i in range(args.tables)]
+    for rid in table_ids:
+        rooms.add_room(rid, game_mode=args.mode)
+        for s in range(args.players):
+            ws = FakeWS(f"{rid}:p{s}")
+            engine.register_ws_connection(ws, rid)
+            sockets.append(ws)
+        for _ in range(args.spectators):
+            ws = FakeWS(None)
+            engine.register_ws_connection(ws, rid)
+            sockets.append(ws)
+        for s in range(args.players):
+            pid = f"{rid}:p{s}"
+            await engine.handle_websocket_game_action({
+                "action": "player_sit", "room_id": rid, "sender_id": pid,
+                "player_data": {"seat_id": f"seat_{s + 1}", "discord_id": pid, "name": f"Bot {s + 1}"},
+            })
+
+    hands = {rid: 0 for rid in table_ids}
+    last_phase = {rid: None for rid in table_ids}
+    action_times, tick_times = [], []
+    actions = 0
+    ticks = 0
+    max_ticks = args.max_ticks or args.hands * 400
+
+    async def timed_action(data: dict):
+        t0 = time.perf_counter()
+        await engine.handle_websocket_game_action(data)
+        action_times.append(time.perf_counter() - t0)
+
+    if args.alloc:
+        tracemalloc.start()
+    blocks0 = sys.getallocatedblocks()
+    t_start = time.perf_counter()
+
+    while ticks < max_ticks and min(hands.values()) < args.hands:
+        for _ in range(args.actions_per_tick):
+            batch = []
+            for rid in table_ids:
+                state = rooms.peek_state(rid)
+                move = policy(engine, state, rng) if state else None
+                if move:
+                    pid, mv, amount = move
+                    batch.append(timed_action({"action": "player_action", "room_id": rid,
+                                               "sender_id": pid, "move": mv, "amount": amount}))
+            if not batch:
+                break
+            await asyncio.gather(*batch)
+            actions += len(batch)
+
+        t0 = time.perf_counter()
+        await engine.check_game_timers()
+        tick_times.append(time.perf_counter() - t0)
+        ticks += 1
+        clock.advance(1.0)
+
+        for rid in table_ids:
+            phase = (rooms.peek_state(rid) or {}).get("current_round")
+            if phase == "showdown" and last_phase[rid] != "showdown":
+                hands[rid] += 1
+            last_phase[rid] = phase
+
+    elapsed = time.perf_counter() - t_start
+    alloc = None
+    if args.alloc:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        alloc = {"peak": peak, "blocks": sys.getallocatedblocks() - blocks0}
+    if hasattr(engine, "hand_log"):
+        await engine.hand_log.flush()
+    engine.cog_unload()
+
+    return {
+        "elapsed": elapsed, "ticks": ticks, "actions": actions, "hands": sum(hands.values()),
+        "action_times": action_times, "tick_times": tick_times,
+        "frames": sum(ws.frames for ws in sockets), "bytes": sum(ws.bytes for ws in sockets),
+        "db": dict(rooms.stats), "payouts": payouts.calls, "alloc": alloc,
+    }
+
+
+def report(args, r: dict):
+    n_hands = max(1, r["hands"])
+    n_actions = max(1, r["actions"])
+    print(f"{args.game}: {args.tables} tables x {args.players} bots (+{args.spectators} spectators), "
+          f"{r['hands']} hands, {r['actions']} actions, {r['ticks']} ticks")
+    print(f"  wall        {r['elapsed']:.3f}s   {r['actions'] / r['elapsed']:,.0f} actions/s   "
+          f"{r['hands'] / r['elapsed']:,.1f} hands/s")
+    print(f"  action      {fmt_ms(percentiles(r['action_times']))}")
+    print(f"  tick        {fmt_ms(percentiles(r['tick_times']))}   "
+          f"(per table mean {sum(r['tick_times']) / max(1, len(r['tick_times'])) / args.tables * 1000:.3f}ms)")
+    print(f"  broadcast   {r['frames']:,} frames, {r['bytes'] / n_actions:,.0f} B/action, {r['bytes'] / n_hands:,.0f} B/hand")
+    db = r["db"]
+    print(f"  db          {db['reads'] / n_actions:.2f} reads/action, {db['writes'] / n_actions:.2f} writes/action, "
+          f"{db['bytes_written'] / n_hands:,.0f} B written/hand")
+    print(f"  payouts     {r['payouts']} credits")
+    if r["alloc"]:
+        print(f"  alloc       peak {r['alloc']['peak'] / 1024:,.0f} KiB traced, "
+              f"{r['alloc']['blocks'] / n_hands:+.1f} retained blocks/hand")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--game", choices=sorted(GAMES), default="holdem")
+    ap.add_argument("--tables", type=int, default=20)
+    ap.add_argument("--players", type=int, default=6, help="seated bots per table")
+    ap.add_argument("--spectators", type=int, default=0, help="extra sockets per table that only receive broadcasts")
+    ap.add_argument("--hands", type=int, default=10, help="stop once every table has played this many hands")
+    ap.add_argument("--actions-per-tick", type=int, default=1, help="bot moves per table between timer ticks")
+    ap.add_argument("--max-ticks", type=int, default=0, help="safety stop (default hands*400)")
+    ap.add_argument("--mode", default="1", help="game_mode of the bench rooms (sets min bet)")
+    ap.add_argument("--db-ms", type=float, default=0.0, help="simulated MySQL latency per statement")
+    ap.add_argument("--payout-ms", type=float, default=0.0, help="simulated latency of the credit endpoint")
+    ap.add_argument("--hand-log", default=None, help="hold'em only: write hand logs here (replay corpus)")
+    ap.add_argument("--alloc", action="store_true", help="trace memory with tracemalloc (slower)")
+    ap.add_argument("--seed", type=int, default=1, help="bot decision seed")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report(args, asyncio.run(run(args)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
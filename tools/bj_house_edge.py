@@ -0,0 +1,44 @@
+"""
+House-edge report for the blackjack table (MechanicsMain2) under its current rules.
+
+  python -m tools.bj_house_edge            # edge per game_mode at MODE_MIN_BET / MODE_MAX_BET
+  python -m tools.bj_house_edge --chart    # also print the basic-strategy chart the UI hint uses
+
+Numbers come from the same exact-EV tables that back the in-game advice
+(cogs/utils/bj_strategy.py), assuming perfect basic strategy. A negative
+edge means the rules favour the player. Odd bets differ because payouts are
+in whole chips (blackjack pays int(1.5 * bet), surrender keeps bet - bet // 2).
+"""
+import sys
+import argparse
+
+from cogs.mechanics_main2 import MODE_MIN_BET, MODE_MAX_BET
+from cogs.utils.bj_strategy import DEFAULT_TABLE, house_edge_report
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--chart", action="store_true", help="print the basic-strategy chart")
+    args = ap.parse_args(argv)
+
+    print(f"{'mode':<5} {'min bet':>8} {'edge':>8} {'loss/hand':>10}   {'max bet':>8} {'edge':>8} {'loss/hand':>10}")
+    for row in house_edge_report(MODE_MIN_BET, MODE_MAX_BET):
+        cols = []
+        for label in ("min", "max"):
+            if f"{label}_bet" in row:
+                cols.append(f"{row[f'{label}_bet']:>8} {row[f'{label}_edge'] * 100:>7.3f}% {row[f'{label}_loss_per_hand']:>10.3f}")
+            else:
+                cols.append(f"{'-':>8} {'-':>8} {'-':>10}")
+        print(f"{row['mode']:<5} " + "   ".join(cols))
+
+    if args.chart:
+        for name, rows in DEFAULT_TABLE.chart().items():
+            print(f"\n{name:<5}  2 3 4 5 6 7 8 9 T A")
+            for line in rows:
+                print(line)
+        print("\nS stand  H hit  D double  R surrender  P split")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Offline stand-ins shared by the benchmark / load-test tools.
+
+  MemoryRooms     in-memory bot_game_rooms (game_state stored as JSON text, like MySQL)
+  FakeConnection  the slice of the aiomysql connection/cursor API the engines use
+  FakeWS          socket that counts frames/bytes instead of sending them
+  VirtualClock    replaces the engines' `time` module so 60s phase waits take 60 ticks, not 60s
+  FakePayouts     replaces the PHP credit endpoint
+  headless()      a real MechanicsMain / MechanicsMain2 wired to the fakes above
+"""
+import re
+import json
+import time
+import asyncio
+from types import SimpleNamespace
+from typing import Optional
+
+from cogs.utils.metrics import percentiles  # re-exported for the tools
+
+
+def fmt_ms(stats: dict) -> str:
+    return "  ".join(f"{k}={v * 1000:.2f}ms" for k, v in stats.items()) or "n/a"
+
+
+# ---------------- bot_game_rooms stand-in ----------------
+
+class MemoryRooms:
+    """room_id -> row dict with the same columns the bot reads/writes."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = float(latency)   # simulated MySQL round-trip per statement
+        self.rows = {}
+        self.stats = {"reads": 0, "writes": 0, "bytes_read": 0, "bytes_written": 0}
+
+    def add_room(self, room_id: str, game_mode: str = "1", guild_id: Optional[str] = "bench",
+                 channel_id: Optional[str] = None, game_state: Optional[dict] = None,
+                 room_name: str = "", room_type: str = "texas_hold_em", initiator: str = "bench"):
+        self.rows[str(room_id)] = {
+            "room_id": str(room_id),
+            "room_name": room_name or str(room_id),
+            "room_type": room_type,
+            "initiator": initiator,
+            "game_mode": str(game_mode),
+            "guild_id": guild_id,
+            "channel_id": channel_id,
+            "game_state": json.dumps(game_state) if game_state is not None else None,
+        }
+
+    def config_row(self, room_id: str) -> Optional[dict]:
+        row = self.rows.get(str(room_id))
+        if not row:
+            return None
+        return {"game_mode": row["game_mode"], "guild_id": row["guild_id"], "channel_id": row["channel_id"]}
+
+    def peek_state(self, room_id: str) -> Optional[dict]:
+        """Decoded game_state without touching the stats (for bot decisions)."""
+        row = self.rows.get(str(room_id))
+        return json.loads(row["game_state"]) if row and row.get("game_state") else None
+
+
+_SELECT_STATE = re.compile(r"^\s*SELECT\s+game_state\s+FROM\s+bot_game_rooms\s+WHERE\s+room_id\s*=\s*%s", re.I)
+_UPDATE_STATE = re.compile(r"^\s*UPDATE\s+bot_game_rooms\s+SET\s+game_state\s*=\s*%s\s+WHERE\s+room_id\s*=\s*%s", re.I)
+_SELECT_CONFIG = re.compile(r"^\s*SELECT\s+game_mode\s*,\s*guild_id\s*,\s*channel_id\s+FROM\s+bot_game_rooms", re.I)
+_SELECT_ALL = re.compile(r"^\s*SELECT\s+room_id\s*,.*\s+FROM\s+bot_game_rooms\s*$", re.I | re.S)
+_DELETE_ROOM = re.compile(r"^\s*DELETE\s+FROM\s+bot_game_rooms\s+WHERE\s+room_id\s*=\s*%s", re.I)
+
+
+class FakeCursor:
+    def __init__(self, rooms: MemoryRooms):
+        self.rooms = rooms
+        self._result = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql: str, params=()):
+        if self.rooms.latency > 0:
+            await asyncio.sleep(self.rooms.latency)
+        if _SELECT_STATE.match(sql):
+            row = self.rooms.rows.get(str(params[0]))
+            self.rooms.stats["reads"] += 1
+            if row and row.get("game_state"):
+                self.rooms.stats["bytes_read"] += len(row["game_state"])
+            self._result = {"game_state": row.get("game_state")} if row else None
+            return 1 if row else 0
+        if _UPDATE_STATE.match(sql):
+            row = self.rooms.rows.get(str(params[1]))
+            if not row:
+                return 0
+            row["game_state"] = params[0]
+            self.rooms.stats["writes"] += 1
+            self.rooms.stats["bytes_written"] += len(params[0])
+            return 1
+        if _SELECT_CONFIG.match(sql):
+            self._result = self.rooms.config_row(params[0])
+            return 1 if self._result else 0
+        if _SELECT_ALL.match(sql):
+            self.rooms.stats["reads"] += len(self.rooms.rows)
+            self._result = [dict(row) for row in self.rooms.rows.values()]
+            return len(self._result)
+        if _DELETE_ROOM.match(sql):
+            return 1 if self.rooms.rows.pop(str(params[0]), None) else 0
+        raise NotImplementedError(f"MemoryRooms does not emulate: {sql.strip()[:80]}")
+
+    async def fetchone(self):
+        if isinstance(self._result, list):
+            return self._result[0] if self._result else None
+        return self._result
+
+    async def fetchall(self):
+        if self._result is None:
+            return []
+        return self._result if isinstance(self._result, list) else [self._result]
+
+
+class FakeConnection:
+    def __init__(self, rooms: MemoryRooms):
+        self.rooms = rooms
+
+    def cursor(self):
+        return FakeCursor(self.rooms)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# ---------------- sockets / clock / payouts ----------------
+
+class FakeWS:
+    """Counts what the server would have written to this client."""
+
+    def __init__(self, player_id: Optional[str] = None):
+        self._player_id = player_id
+        self.closed = False
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_str(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+
+    async def send_json(self, obj, dumps=json.dumps):
+        await self.send_str(dumps(obj))
+
+    async def close(self, *args, **kwargs):
+        self.closed = True
+
+
+class VirtualClock:
+    """
+    Drop-in for the `time` module inside the engine modules: time.time() is
+    simulated (advance() once per 1s tick), perf_counter/monotonic stay real
+    so the engines' own latency metrics are still meaningful.
+    """
+    perf_counter = staticmethod(time.perf_counter)
+    monotonic = staticmethod(time.monotonic)
+    sleep = staticmethod(time.sleep)
+
+    def __init__(self, start: Optional[float] = None):
+        self.now = float(start if start is not None else time.time())
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float = 1.0):
+        self.now += seconds
+
+    def install(self, *modules):
+        for m in modules:
+            m.time = self
+
+
+class FakePayouts:
+    """Stands in for withdraw_kekchipz.php; optional latency simulates the HTTP hop."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = float(latency)
+        self.calls = 0
+        self.total = 0
+
+    async def credit(self, guild_id, discord_id, amount: int):
+        if amount <= 0:
+            return
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        self.calls += 1
+        self.total += int(amount)
+
+
+class FakeBot(SimpleNamespace):
+    """Enough of commands.Bot for the mechanics cogs' __init__."""
+
+    def __init__(self):
+        super().__init__(db_user="memory", db_password="", db_host="memory", ws_rooms={})
+
+    async def wait_until_ready(self):
+        # the cogs' own 1s timer loop parks here forever; harnesses drive ticks themselves
+        await asyncio.Event().wait()
+
+
+def headless(cog_cls, rooms: MemoryRooms, payouts: FakePayouts, bot: Optional[FakeBot] = None):
+    """
+    A real mechanics cog with DB, config and payouts redirected to the fakes.
+    Must be called inside a running event loop (the cog starts its timer task).
+    Drive it with `await cog.check_game_timers()`; call cog.cog_unload() when done.
+    """
+    # keep the cog name so bot.get_cog("MechanicsMain") still finds it when added to a real bot
+    class Headless(cog_cls, name=getattr(cog_cls, "__cog_name__", cog_cls.__name__)):
+        async def _get_db_connection(self):
+            return FakeConnection(rooms)
+
+        async def _fetch_room_config_row(self, room_id: str):
+            return rooms.config_row(room_id)
+
+        async def _credit_kekchipz(self, guild_id, discord_id, amount):
+            await payouts.credit(guild_id, discord_id, int(amount))
+
+    Headless.__name__ = Headless.__qualname__ = f"Headless{cog_cls.__name__}"
+    return Headless(bot or FakeBot())
@@ -0,0 +1,54 @@
+"""
+Build / extend the local Jeopardy question bank used by /serene game jeopardy.
+
+  python -m tools.import_jeopardy JEOPARDY_QUESTIONS1.json
+  python -m tools.import_jeopardy clues.jsonl --db /srv/data/jeopardy.sqlite --replace
+  python -m tools.import_jeopardy --check                 # build one board from the bank and print it
+
+Accepts .json (array) or .jsonl dumps, either flat clue rows
+({"category", "value", "question", "answer", "round", "show_number"}) or
+grouped ({"category", "questions": [...]}). The bot reads JEOPARDY_BANK_PATH
+(default data/jeopardy.sqlite).
+"""
+import sys
+import time
+import argparse
+
+from cogs.utils.jeopardy_bank import JEOPARDY_BANK_PATH, JeopardyBank, import_rows, iter_source_rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("sources", nargs="*", help=".json / .jsonl clue dumps")
+    ap.add_argument("--db", default=JEOPARDY_BANK_PATH, help="SQLite bank path (default: %(default)s)")
+    ap.add_argument("--replace", action="store_true", help="drop existing clues first")
+    ap.add_argument("--check", action="store_true", help="build one board from the bank and print it")
+    args = ap.parse_args(argv)
+
+    if not args.sources and not args.check:
+        ap.error("give at least one source file, or --check")
+
+    for i, path in enumerate(args.sources):
+        t0 = time.perf_counter()
+        n = import_rows(args.db, iter_source_rows(path), replace=args.replace and i == 0)
+        print(f"{path}: {n} clues in {time.perf_counter() - t0:.1f}s -> {args.db}")
+
+    if args.check:
+        bank = JeopardyBank(args.db, prefetch=0)
+        t0 = time.perf_counter()
+        board = bank.build_board()
+        if board is None:
+            print(f"{args.db}: no usable board (missing file or too few complete categories)")
+            return 1
+        print(f"board built in {(time.perf_counter() - t0) * 1000:.1f}ms")
+        for label, cats in (("Jeopardy", board["normal"]), ("Double Jeopardy", board["double"])):
+            print(f"{label}:")
+            for cat in cats:
+                values = " ".join(f"{q['value']}{'*' if q.get('daily_double') else ''}" for q in cat["questions"])
+                print(f"  {cat['category'][:40]:<40} {values}")
+        print(f"Final: {board['final']['category']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+"""
+Load generator for the aiohttp WebSocket endpoints.
+
+  # offline: start the real web app on an in-memory bot_game_rooms, then hit it
+  python -m tools.loadtest run --spawn --chat 2000 --holdem 300 --blackjack 200 --gamelist 100 --duration 60
+
+  # or run the two halves separately (e.g. server pinned to its own core)
+  python -m tools.loadtest serve --port 8089 --tables 40
+  python -m tools.loadtest run --url http://127.0.0.1:8089 --chat 2000 --duration 60
+
+Clients speak the real protocols:
+  /chat_ws        {"room_id","displayName"} handshake, chat lines, "ping", room rebinds
+  /game_was       {"room_id","sender_id"} handshake, {"action":"ping"}, player_sit / player_leave
+  /blackjack_ws   same as /game_was
+  /gamelist_info  snapshot on connect, {"type":"ping"}, {"op":"get_rooms"}
+
+Reported per endpoint: connect latency, ping round-trip, fan-out latency
+(send -> every other room member's receipt; clients share one clock), frame
+counts. Server event-loop lag and the worst stalls come from the app's own
+/loop_health route (cogs/utils/loop_monitor.py, authorized with --bot-entry) and
+are printed at the end. `serve` uses BOT_ENTRY from the environment, or "loadtest".
+
+Thousands of sockets need a raised open-file limit (ulimit -n) on both halves.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from collections import defaultdict, deque
+
+import aiohttp
+
+from tools.harness import MemoryRooms, FakeConnection, FakePayouts, headless, percentiles, fmt_ms
+
+logger = logging.getLogger(__name__)
+
+
+
+# ---------------- serve: the real app on an in-memory store ----------------
+
+async def serve(args):
+    import bot as app
+    from cogs.mechanics_main import MechanicsMain
+    from cogs.mechanics_main2 import MechanicsMain2
+
+    rooms = MemoryRooms()
+    for i in range(args.tables):
+        rooms.add_room(f"lt-holdem-{i}", room_type="texas_hold_em", game_mode=str(1 + i % 4))
+        rooms.add_room(f"lt-blackjack-{i}", room_type="blackjack", game_mode=str(1 + i % 4))
+
+    async def memory_connect():
+        return FakeConnection(rooms)
+
+    # bot.py talks to MySQL through _db_connect_dict and skips DB work without credentials
+    app._db_connect_dict = memory_connect
+    app.DB_USER = app.DB_PASSWORD = app.DB_HOST = "memory"
+    bot = app.bot
+    bot.db_user, bot.db_password, bot.db_host = "memory", "", "memory"
+
+    payouts = FakePayouts(latency=args.payout_ms / 1000.0)
+    engines = []
+    for cog_cls in (MechanicsMain, MechanicsMain2):
+        cog = headless(cog_cls, rooms, payouts, bot=bot)
+        cog.check_game_timers.cancel()      # its loop waits for a Discord login; ticked below instead
+        if hasattr(cog, "hand_log"):
+            cog.hand_log.directory = None
+        await bot.add_cog(cog)
+        engines.append(cog)
+
+    async def ticker():
+        while True:
+            await asyncio.sleep(1.0)
+            for cog in engines:
+                try:
+                    await cog.check_game_timers()
+                except Exception:
+                    logger.exception("tick failed")
+
+    if not app.BOT_ENTRY:
+        app.BOT_ENTRY = "loadtest"
+    app.LOOP_MONITOR.start()
+    os.environ["PORT"] = str(args.port)
+    await app.start_web_server()
+    app.gamelist_refresh_loop.start()
+    tasks = [asyncio.create_task(ticker())]
+    print(f"serving on :{args.port} ({len(rooms.rows)} rooms in memory)", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+# ---------------- run: clients ----------------
+
+class Stats:
+    def __init__(self):
+        self.connect = defaultdict(list)
+        self.rtt = defaultdict(list)
+        self.fanout = defaultdict(list)
+        self.counts = defaultdict(lambda: defaultdict(int))
+
+    def inc(self, endpoint: str, key: str, n: int = 1):
+        self.counts[endpoint][key] += n
+
+
+class RoomMarks:
+    """Last action sent per room, so every receiver can time its own copy of the fan-out."""
+
+    def __init__(self):
+        self._marks = {}
+        self._seq = 0
+
+    def mark(self, room: str) -> int:
+        self._seq += 1
+        self._marks[room] = (self._seq, time.perf_counter())
+        return self._seq
+
+    def get(self, room: str):
+        return self._marks.get(room)
+
+
+async def _read_frames(ws, endpoint, stats, pings: deque, on_frame):
+    async for msg in ws:
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            continue
+        stats.inc(endpoint, "frames_in")
+        on_frame(msg.data, pings)
+
+
+async def chat_client(i, session, args, stats, marks, stop):
+    endpoint = "/chat_ws"
+    rooms = [f"lt-chat-{r}" for r in range(args.chat_rooms)]
+    room = rooms[i % len(rooms)]
+    name = f"lt{i}"
+    t0 = time.perf_counter()
+    try:
+        ws = await session.ws_connect(args.url + endpoint, heartbeat=None)
+        await ws.send_str(json.dumps({"room_id": room, "displayName": name}))
+    except Exception:
+        stats.inc(endpoint, "connect_failed")
+        return
+    stats.connect[endpoint].append(time.perf_counter() - t0)
+    stats.inc(endpoint, "connected")
+    pings = deque()
+    state = {"room": room}
+
+    def on_frame(raw, pings):
+        now = time.perf_counter()
+        if raw.startswith('{"type": "pong"') or raw.startswith('{"type":"pong"'):
+            if pings:
+                stats.rtt[endpoint].append(now - pings.popleft())
+            return
+        if '"new_message"' in raw:
+            try:
+                text = json.loads(raw).get("message") or ""
+            except Exception:
+                return
+            if text.startswith("lt "):
+                _, sender, t_send = text.split(" ", 2)
+                if sender != name:
+                    stats.fanout[endpoint].append(now - float(t_send))
+
+    reader = asyncio.create_task(_read_frames(ws, endpoint, stats, pings, on_frame))
+    rng = random.Random(i)
+    try:
+        while not stop.is_set():
+            await asyncio.sleep(rng.expovariate(args.rate))
+            r = rng.random()
+            if r < 0.7:
+                await ws.send_str(json.dumps({"message": f"lt {name} {time.perf_counter():.6f}"}))
+            elif r < 0.9:
+                pings.append(time.perf_counter())
+                await ws.send_str("ping")
+            else:
+                state["room"] = rng.choice(rooms)
+                await ws.send_str(json.dumps({"room_id": state["room"], "displayName": name}))
+                stats.inc(endpoint, "rebinds")
+            stats.inc(endpoint, "frames_out")
+    except Exception:
+        stats.inc(endpoint, "errors")
+    finally:
+        reader.cancel()
+        await ws.close()
+
+
+async def game_client(i, session, args, stats, marks, stop, endpoint: str, prefix: str):
+    room = f"lt-{prefix}-{i % args.tables}"
+    pid = f"lt-{prefix}-{i}"
+    seat = (i // args.tables) % 6 + 1
+    t0 = time.perf_counter()
+    try:
+        ws = await session.ws_connect(args.url + endpoint, heartbeat=None)
+        await ws.send_str(json.dumps({"room_id": room, "sender_id": pid, "guild_id": "loadtest"}))
+    except Exception:
+        stats.inc(endpoint, "connect_failed")
+        return
+    stats.connect[endpoint].append(time.perf_counter() - t0)
+    stats.inc(endpoint, "connected")
+    pings = deque()
+    last_seen = {"seq": 0}
+
+    def on_frame(raw, pings):
+        now = time.perf_counter()
+        if raw == '{"action":"pong"}':
+            if pings:
+                stats.rtt[endpoint].append(now - pings.popleft())
+            return
+        if raw.startswith('{"type": "state"'):
+            mark = marks.get(room)
+            if mark and mark[0] > last_seen["seq"]:
+                last_seen["seq"] = mark[0]
+                stats.fanout[endpoint].append(now - mark[1])
+
+    reader = asyncio.create_task(_read_frames(ws, endpoint, stats, pings, on_frame))
+    rng = random.Random(i)
+    seated = False
+    try:
+        while not stop.is_set():
+            await asyncio.sleep(rng.expovariate(args.rate))
+            if rng.random() < 0.8:
+                pings.append(time.perf_counter())
+                await ws.send_str('{"action":"ping"}')
+            elif not seated:
+                marks.mark(room)
+                await ws.send_str(json.dumps({"action": "player_sit", "player_data": {
+                    "seat_id": f"seat_{seat}", "discord_id": pid, "name": pid}}))
+                seated = True
+            else:
+                marks.mark(room)
+                await ws.send_str(json.dumps({"action": "player_leave"}))
+                seated = False
+            stats.inc(endpoint, "frames_out")
+    except Exception:
+        stats.inc(endpoint, "errors")
+    finally:
+        reader.cancel()
+        await ws.close()
+
+
+async def gamelist_client(i, session, args, stats, marks, stop):
+    endpoint = "/gamelist_info"
+    t0 = time.perf_counter()
+    try:
+        ws = await session.ws_connect(args.url + endpoint, heartbeat=None)
+        await ws.receive(timeout=30)        # snapshot arrives right after the upgrade
+    except Exception:
+        stats.inc(endpoint, "connect_failed")
+        return
+    stats.connect[endpoint].append(time.perf_counter() - t0)
+    stats.inc(endpoint, "connected")
+    pings = deque()
+
+    def on_frame(raw, pings):
+        if '"pong"' in raw and pings:
+            stats.rtt[endpoint].append(time.perf_counter() - pings.popleft())
+
+    reader = asyncio.create_task(_read_frames(ws, endpoint, stats, pings, on_frame))
+    rng = random.Random(i)
+    try:
+        while not stop.is_set():
+            await asyncio.sleep(rng.expovariate(args.rate / 4))
+            if rng.random() < 0.8:
+                pings.append(time.perf_counter())
+                await ws.send_str(json.dumps({"type": "ping"}))
+            else:
+                await ws.send_str(json.dumps({"op": "get_rooms"}))
+            stats.inc(endpoint, "frames_out")
+    except Exception:
+        stats.inc(endpoint, "errors")
+    finally:
+        reader.cancel()
+        await ws.close()
+
+
+async def _wait_healthy(url: str, timeout: float = 30.0) -> bool:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url + "/healthz") as resp:
+                    if resp.status == 200:
+                        return True
+            except Exception:
+                pass
+            await asyncio.sleep(0.25)
+    return False
+
+
+async def run(args) -> int:
+    server = None
+    if args.spawn:
+        port = args.url.rsplit(":", 1)[-1].strip("/")
+        server = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "tools.loadtest", "serve", "--port", port, "--tables", str(args.tables))
+        if not await _wait_healthy(args.url):
+            print("server did not come up")
+            server.terminate()
+            return 1
+
+    stats = Stats()
+    marks = RoomMarks()
+    stop = asyncio.Event()
+    admin = {"X-Bot-Entry": args.bot_entry}
+    connector = aiohttp.TCPConnector(limit=0)
+    plan = ([(chat_client, ())] * args.chat
+            + [(game_client, ("/game_was", "holdem"))] * args.holdem
+            + [(game_client, ("/blackjack_ws", "blackjack"))] * args.blackjack
+            + [(gamelist_client, ())] * args.gamelist)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            try:
+                async with session.get(args.url + "/loop_health?reset=1", headers=admin):
+                    pass
+            except Exception:
+                pass
+            clients = []
+            for i, (fn, extra) in enumerate(plan):
+                clients.append(asyncio.create_task(fn(i, session, args, stats, marks, stop, *extra)))
+                if args.ramp and plan:
+                    await asyncio.sleep(args.ramp / len(plan))
+            await asyncio.sleep(args.duration)
+            stop.set()
+            await asyncio.gather(*clients, return_exceptions=True)
+
+            lag = None
+            try:
+                async with session.get(args.url + "/loop_health?n=5", headers=admin) as resp:
+                    if resp.status == 200:
+                        lag = await resp.json()
+            except Exception:
+                pass
+    finally:
+        if server is not None:
+            server.terminate()
+            await server.wait()
+
+    for endpoint in ("/chat_ws", "/game_was", "/blackjack_ws", "/gamelist_info"):
+        c = stats.counts.get(endpoint)
+        if not c:
+            continue
+        print(f"{endpoint}: {c['connected']} connected, {c['connect_failed']} failed, "
+              f"{c['frames_out']:,} frames out, {c['frames_in']:,} frames in, {c['errors']} errors"
+              + (f", {c['rebinds']} rebinds" if c.get("rebinds") else ""))
+        print(f"  connect   {fmt_ms(percentiles(stats.connect[endpoint]))}")
+        print(f"  ping rtt  {fmt_ms(percentiles(stats.rtt[endpoint]))}")
+        if stats.fanout[endpoint]:
+            print(f"  fan-out   {fmt_ms(percentiles(stats.fanout[endpoint]))}")
+    if lag:
+        print(f"server loop lag ({lag.get('lag_samples', 0)} samples): {fmt_ms(lag.get('lag') or {})}")
+        for o in lag.get("top") or []:
+            print(f"  stall {o['what']} [{o['where']}] x{o['count']}, max {o['max_secs'] * 1000:.0f}ms")
+    else:
+        print("server loop lag: n/a (no /loop_health on the target)")
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("serve", help="run the web app on an in-memory bot_game_rooms")
+    sp.add_argument("--port", type=int, default=8089)
+    sp.add_argument("--tables", type=int, default=40, help="hold'em and blackjack rooms to create (each)")
+    sp.add_argument("--payout-ms", type=float, default=0.0)
+
+    rp = sub.add_parser("run", help="open clients against a running app")
+    rp.add_argument("--url", default="http://127.0.0.1:8089")
+    rp.add_argument("--spawn", action="store_true", help="start `serve` as a subprocess on --url's port")
+    rp.add_argument("--chat", type=int, default=500)
+    rp.add_argument("--chat-rooms", type=int, default=20)
+    rp.add_argument("--holdem", type=int, default=100)
+    rp.add_argument("--blackjack", type=int, default=100)
+    rp.add_argument("--gamelist", type=int, default=50)
+    rp.add_argument("--tables", type=int, default=40, help="game rooms clients spread across (match serve)")
+    rp.add_argument("--rate", type=float, default=0.5, help="frames/sec per client (Poisson)")
+    rp.add_argument("--ramp", type=float, default=5.0, help="seconds over which clients connect")
+    rp.add_argument("--duration", type=float, default=30.0, help="seconds of traffic after ramp-up")
+    rp.add_argument("--bot-entry", default=os.getenv("BOT_ENTRY") or "loadtest", help="BOT_ENTRY for /loop_health")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.cmd == "serve":
+        asyncio.run(serve(args))
+        return 0
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
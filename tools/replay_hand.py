@@ -0,0 +1,147 @@
+"""
+Rebuild logged hold'em hands through MechanicsMain's own transition functions.
+
+  python -m tools.replay_hand data/hand_logs/<room_id>.jsonl              # verify every hand in the file
+  python -m tools.replay_hand data/hand_logs/<room_id>.jsonl --hand <id>  # one hand, step by step
+  python -m tools.replay_hand data/hand_logs/*.jsonl --bench 20           # replay the corpus 20x for throughput
+
+Rotated files (<room_id>~1.jsonl, ...) hold older hands and replay the same way.
+
+Each hand starts from its hand_start snapshot, is re-dealt from the logged
+seed and then has the logged events applied in order. The replayed showdown
+(board + payouts) is compared with the logged one.
+"""
+import sys
+import copy
+import time
+import asyncio
+import logging
+import argparse
+from types import SimpleNamespace
+
+from cogs.mechanics_main import MechanicsMain, BETTING_ROUNDS
+from cogs.utils.hand_log import read_hands, take_staged
+from cogs.utils.presence import PresenceIndex
+
+
+class ReplayEngine(MechanicsMain):
+    """MechanicsMain without the bot: no DB, no sockets, no timer loop, no chip credits."""
+
+    def __init__(self):
+        # MechanicsMain.__init__ starts the timer loop and reads DB credentials; skip it
+        self.bot = SimpleNamespace(ws_rooms={}, ws_presence=PresenceIndex())
+        self.rooms_with_active_timers = set()
+
+    async def _credit_kekchipz(self, guild_id, discord_id, amount):
+        return
+
+
+async def apply_event(engine: MechanicsMain, room_id: str, state: dict, rec: dict):
+    """Re-apply one logged event the same way the live code path did."""
+    kind = rec.get("t")
+    if kind == "leave":
+        outcome = engine._remove_player_by_id(state, rec.get("pid"))
+        if outcome == "advance_phase" and state.get("current_round") in BETTING_ROUNDS:
+            await engine._finish_betting_round_and_advance(state)
+    elif kind == "advance":
+        if state.get("current_round") in BETTING_ROUNDS:
+            await engine._finish_betting_round_and_advance(state)
+    elif kind == "action":
+        if rec.get("auto"):
+            if str(state.get("current_bettor")) == str(rec.get("pid")):
+                await engine._auto_fold_current_bettor(state)
+        elif rec.get("action") == "advance_phase" and rec.get("phase") == "post_showdown":
+            return  # deals the next hand, which has its own hand_start
+        else:
+            await engine._apply_action(room_id, state, {
+                "action": rec.get("action"),
+                "move": rec.get("move"),
+                "amount": rec.get("amount"),
+                "sender_id": rec.get("pid"),
+            })
+
+
+async def replay_hand(engine: MechanicsMain, hand: dict, verbose: bool = False) -> dict:
+    start = hand["start"]
+    state = copy.deepcopy(start["table"])
+    room_id = str(state.get("room_id") or "replay")
+
+    await engine._to_pre_flop(state, seed=start["seed"])
+    take_staged(state)
+    if verbose:
+        print(f"hand {hand['hand']}  seed={start['seed']}")
+        for p in state.get("players") or []:
+            print(f"  seat {p.get('seat_id')}  {p.get('name')}: {p.get('hand')}")
+        print(f"  dealer: {state.get('dealer_hand')}")
+
+    logged_showdown = None
+    replayed_showdown = None
+    applied = 0
+    for rec in hand["events"]:
+        if rec.get("t") == "showdown":
+            logged_showdown = rec
+            continue
+        await apply_event(engine, room_id, state, rec)
+        applied += 1
+        for staged in take_staged(state):
+            if staged.get("t") == "showdown":
+                replayed_showdown = staged
+        if verbose:
+            what = rec.get("move") or rec.get("action") or rec["t"]
+            print(f"  rev {rec.get('rev')}: seat {rec.get('seat')} {what} {rec.get('amount') or ''}".rstrip()
+                  + f"  -> {state.get('current_round')} board={state.get('board_cards')} pot={state.get('pot')}")
+
+    mismatches = []
+    if logged_showdown is not None:
+        if replayed_showdown is None:
+            mismatches.append("hand did not reach showdown on replay")
+        else:
+            for key in ("board", "payouts"):
+                if logged_showdown.get(key) != replayed_showdown.get(key):
+                    mismatches.append(f"{key}: logged={logged_showdown.get(key)} replayed={replayed_showdown.get(key)}")
+    return {"hand": hand["hand"], "events": applied, "complete": logged_showdown is not None,
+            "mismatches": mismatches, "state": state}
+
+
+async def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("logs", nargs="+", help="hand log files (data/hand_logs/<room_id>.jsonl)")
+    ap.add_argument("--hand", help="only replay this hand id (prints every step)")
+    ap.add_argument("--bench", type=int, default=0, metavar="N", help="replay the whole corpus N times and report throughput")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    engine = ReplayEngine()
+    hands = [h for path in args.logs for h in read_hands(path, args.hand)]
+    if not hands:
+        print("no hands found")
+        return 1
+
+    if args.bench:
+        events = sum(len(h["events"]) for h in hands)
+        t0 = time.perf_counter()
+        for _ in range(args.bench):
+            for h in hands:
+                await replay_hand(engine, h)
+        elapsed = time.perf_counter() - t0
+        n = len(hands) * args.bench
+        print(f"{n} hands / {events * args.bench} events in {elapsed:.3f}s "
+              f"({n / elapsed:,.0f} hands/s, {events * args.bench / elapsed:,.0f} events/s)")
+        return 0
+
+    failed = 0
+    for h in hands:
+        res = await replay_hand(engine, h, verbose=bool(args.hand))
+        status = "ok" if not res["mismatches"] else "MISMATCH"
+        if not res["complete"]:
+            status += " (no showdown logged)"
+        print(f"{res['hand']}: {res['events']} events, {status}")
+        for m in res["mismatches"]:
+            print(f"    {m}")
+        failed += bool(res["mismatches"])
+    print(f"{len(hands)} hand(s), {failed} mismatch(es)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))